@@ -0,0 +1,357 @@
+"""
+Feed de alterações em Server-Sent Events (GET /eventos).
+
+Pessoas salvas e relacionamentos criados (app/eventos.py) viram eventos SSE
+com id sequencial, guardados num histórico circular de FEED_HISTORICO itens.
+Cada cliente conectado tem um buffer limitado: um evento ainda não enviado da
+mesma pessoa ou do mesmo par é substituído pelo mais recente, e quem acumula
+mais de FEED_BUFFER eventos perde o buffer e recebe "reset" (refaz as leituras)
+em vez de atrasar a publicação para os demais. Os eventos são enviados em lotes
+a cada FEED_JANELA_MS, e cada lote termina com o resumo das estatísticas.
+
+Na reconexão o navegador manda Last-Event-ID e o feed continua do histórico;
+um id de outro processo (reinício, outro worker) ou que já saiu do histórico
+recebe "reset".
+
+Com vários workers (WEB_CONCURRENCY > 1) as escritas de cada um chegam aos
+outros pelo pub/sub do redis (FEED_REDIS_URL, requer o pacote redis). Quem
+recebe republica no app/eventos.py local, então o feed, as estatísticas e os
+caches em memória daquele worker também as veem. Sem o redis, o feed só
+enxergaria as escritas do próprio worker e GET /eventos responde 503.
+"""
+import asyncio
+import os
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Deque, Hashable, List, NamedTuple, Optional, Set
+
+import orjson
+
+from . import estatisticas, eventos
+
+HISTORICO = int(os.getenv("FEED_HISTORICO", "1000"))
+BUFFER = int(os.getenv("FEED_BUFFER", "256"))
+MAX_CLIENTES = int(os.getenv("FEED_MAX_CLIENTES", "1000"))
+JANELA_S = float(os.getenv("FEED_JANELA_MS", "100")) / 1000
+# comentário enviado sem eventos para proxies não fecharem a conexão
+HEARTBEAT_S = float(os.getenv("FEED_HEARTBEAT_S", "15"))
+# espera sugerida ao navegador antes de reconectar
+RETRY_MS = int(os.getenv("FEED_RETRY_MS", "3000"))
+
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1") or "1")
+REDIS_URL = os.getenv("FEED_REDIS_URL", "")
+CANAL = os.getenv("FEED_REDIS_CANAL", "feed:alteracoes")
+# um feed por worker, sem canal entre eles, perderia as escritas dos outros
+ATIVO = WORKERS <= 1 or bool(REDIS_URL)
+
+# ids "<época>-<seq>": a época muda a cada processo, então ids de outro processo não são retomados
+EPOCA = os.urandom(4).hex()
+
+
+class FeedLotado(Exception):
+    def __init__(self, maximo: int):
+        super().__init__(f"Limite de {maximo} clientes do feed atingido")
+
+
+class FeedIndisponivel(Exception):
+    def __init__(self):
+        super().__init__("Feed desligado: com vários workers ele requer FEED_REDIS_URL")
+
+
+class Evento(NamedTuple):
+    seq: int
+    tipo: str
+    # eventos pendentes com a mesma chave são coalescidos
+    chave: Hashable
+    dados: dict
+
+
+class Cliente:
+    def __init__(self, capacidade: int = BUFFER):
+        self.capacidade = capacidade
+        self.pendentes: "OrderedDict[Hashable, Evento]" = OrderedDict()
+        self.sinal = asyncio.Event()
+        self.reset = False
+        self.coalescidos = 0
+
+    def enfileirar(self, evento: Evento):
+        if self.reset:
+            return
+        # o mais recente vai para o fim: os ids enviados continuam crescentes
+        if self.pendentes.pop(evento.chave, None) is not None:
+            self.coalescidos += 1
+        self.pendentes[evento.chave] = evento
+        if len(self.pendentes) > self.capacidade:
+            self.pedir_reset()
+        self.sinal.set()
+
+    def pedir_reset(self):
+        self.pendentes.clear()
+        self.reset = True
+        self.sinal.set()
+
+    def retirar(self):
+        """
+        (reset, eventos) acumulados desde a última retirada
+        """
+        reset, pendentes = self.reset, list(self.pendentes.values())
+        self.reset = False
+        self.pendentes.clear()
+        self.sinal.clear()
+        return reset, pendentes
+
+
+def _seq(ultimo_id: str) -> Optional[int]:
+    epoca, _, seq = ultimo_id.partition("-")
+    if epoca != EPOCA or not seq.isdigit():
+        return None
+    return int(seq)
+
+
+class Difusor:
+    """
+    Fan-out síncrono: publicar só enfileira nos buffers; cada conexão envia no seu ritmo
+    """
+    def __init__(self, historico: int = HISTORICO, buffer: int = BUFFER, max_clientes: int = MAX_CLIENTES):
+        self.historico: Deque[Evento] = deque(maxlen=historico)
+        self.buffer = buffer
+        self.max_clientes = max_clientes
+        self.clientes: Set[Cliente] = set()
+        self.seq = 0
+        self.publicados = 0
+        self.enviados = 0
+        self.resets = 0
+        self.retomadas = 0
+        self.recusados = 0
+
+    def id_atual(self) -> str:
+        return f"{EPOCA}-{self.seq}"
+
+    def publicar(self, tipo: str, chave: Hashable, dados: dict):
+        self.seq += 1
+        self.publicados += 1
+        evento = Evento(self.seq, tipo, chave, dados)
+        self.historico.append(evento)
+        for cliente in self.clientes:
+            cliente.enfileirar(evento)
+
+    def conectar(self, ultimo_id: Optional[str] = None) -> Cliente:
+        if len(self.clientes) >= self.max_clientes:
+            self.recusados += 1
+            raise FeedLotado(self.max_clientes)
+        cliente = Cliente(self.buffer)
+        if ultimo_id:
+            seq = _seq(ultimo_id)
+            # o próximo evento que o cliente precisa (seq + 1) ainda tem que estar no histórico
+            primeiro = self.historico[0].seq if self.historico else self.seq + 1
+            if seq is None or seq > self.seq or seq + 1 < primeiro:
+                cliente.pedir_reset()
+            else:
+                self.retomadas += 1
+                for evento in self.historico:
+                    if evento.seq > seq:
+                        cliente.enfileirar(evento)
+        self.clientes.add(cliente)
+        return cliente
+
+    def desconectar(self, cliente: Cliente):
+        self.clientes.discard(cliente)
+
+    def resetar(self):
+        """
+        Eventos podem ter se perdido (ex.: canal entre workers caiu): todos os clientes relêem
+        """
+        for cliente in self.clientes:
+            cliente.pedir_reset()
+
+    def stats(self) -> dict:
+        return {
+            "clientes": len(self.clientes),
+            "max_clientes": self.max_clientes,
+            "ultimo_id": self.id_atual(),
+            "historico": len(self.historico),
+            "publicados": self.publicados,
+            "enviados": self.enviados,
+            "coalescidos": sum(cliente.coalescidos for cliente in self.clientes),
+            "pendentes": sum(len(cliente.pendentes) for cliente in self.clientes),
+            "resets": self.resets,
+            "retomadas": self.retomadas,
+            "recusados": self.recusados,
+        }
+
+
+difusor = Difusor()
+
+
+def conectar(ultimo_id: Optional[str] = None) -> Cliente:
+    if not ATIVO:
+        raise FeedIndisponivel()
+    return difusor.conectar(ultimo_id)
+
+
+def _mensagem(tipo: str, dados, id_evento: Optional[str] = None) -> str:
+    linhas = f"id: {id_evento}\n" if id_evento is not None else ""
+    return f"{linhas}event: {tipo}\ndata: {orjson.dumps(dados).decode()}\n\n"
+
+
+def _lote(reset: bool, pendentes: List[Evento]) -> str:
+    partes = []
+    if reset:
+        # depois de reler tudo, o cliente continua a partir do evento mais recente
+        difusor.resets += 1
+        partes.append(_mensagem("reset", {}, difusor.id_atual()))
+    for evento in pendentes:
+        partes.append(_mensagem(evento.tipo, evento.dados, f"{EPOCA}-{evento.seq}"))
+    difusor.enviados += len(pendentes)
+    if estatisticas.estatisticas.reconciliado_em is not None:
+        partes.append(_mensagem("estatisticas", estatisticas.estatisticas.resumo()))
+    return "".join(partes)
+
+
+async def transmitir(cliente: Cliente) -> AsyncIterator[str]:
+    """
+    Corpo text/event-stream de uma conexão; o cliente sai do difusor quando ela fecha
+    """
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            try:
+                await asyncio.wait_for(cliente.sinal.wait(), HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            # rajadas de escrita dentro da janela saem num lote só, já coalescidas
+            await asyncio.sleep(JANELA_S)
+            yield _lote(*cliente.retirar())
+    finally:
+        difusor.desconectar(cliente)
+
+
+def serializar(evento: str, dados: dict) -> bytes:
+    return orjson.dumps({"origem": EPOCA, "evento": evento, "dados": dados})
+
+
+# True enquanto um evento de outro worker é republicado: ele não volta para o canal
+_repassando = False
+
+
+def repassar(bruto: bytes) -> bool:
+    """
+    Republica no barramento local um evento recebido do canal; False se ele é deste worker
+    """
+    global _repassando
+    mensagem = orjson.loads(bruto)
+    if mensagem["origem"] == EPOCA:
+        return False
+    _repassando = True
+    try:
+        eventos.publicar(mensagem["evento"], **mensagem["dados"])
+    finally:
+        _repassando = False
+    return True
+
+
+class CanalRedis:
+    """
+    Pub/sub entre os workers: envia as escritas deste e republica as dos outros
+    """
+    def __init__(self, url: str = REDIS_URL, canal: str = CANAL):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise Exception("FEED_REDIS_URL requer o pacote redis (pip install redis)")
+        self.redis = redis.from_url(url)
+        self.canal = canal
+        self._tarefas: Set[asyncio.Task] = set()
+        self._escuta: Optional[asyncio.Task] = None
+        self.enviados = 0
+        self.recebidos = 0
+        self.erros = 0
+
+    def enviar(self, evento: str, dados: dict):
+        # chamado por um assinante síncrono de app/eventos.py: o publish vai numa tarefa
+        tarefa = asyncio.get_running_loop().create_task(self._enviar(serializar(evento, dados)))
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _enviar(self, bruto: bytes):
+        try:
+            await self.redis.publish(self.canal, bruto)
+            self.enviados += 1
+        except Exception as e:
+            self.erros += 1
+            print(f"❌ Feed: falha ao enviar evento aos outros workers: {e}")
+
+    async def _escutar(self):
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.canal)
+                    async for mensagem in pubsub.listen():
+                        if mensagem["type"] == "message" and repassar(mensagem["data"]):
+                            self.recebidos += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.erros += 1
+                print(f"❌ Feed: canal entre workers caiu ({e}); reconectando")
+                # o que passou pelo canal enquanto ele estava fora não chega mais
+                difusor.resetar()
+                await asyncio.sleep(1)
+
+    def iniciar(self):
+        self._escuta = asyncio.get_running_loop().create_task(self._escutar())
+
+    async def parar(self):
+        if self._escuta is not None:
+            self._escuta.cancel()
+            try:
+                await self._escuta
+            except asyncio.CancelledError:
+                pass
+            self._escuta = None
+        await self.redis.aclose()
+
+    def stats(self) -> dict:
+        return {"canal": self.canal, "enviados": self.enviados, "recebidos": self.recebidos, "erros": self.erros}
+
+
+canal: Optional[CanalRedis] = None
+
+
+def _ao_salvar_pessoa(pessoa: dict):
+    difusor.publicar("pessoa", ("pessoa", pessoa["id"]), pessoa)
+    if canal is not None and not _repassando:
+        canal.enviar(eventos.PESSOA_SALVA, {"pessoa": pessoa})
+
+
+def _ao_criar_relacionamento(pessoa_id1: int, pessoa_id2: int):
+    difusor.publicar("relacionamento", ("relacionamento", pessoa_id1, pessoa_id2),
+                     {"pessoa_id1": pessoa_id1, "pessoa_id2": pessoa_id2})
+    if canal is not None and not _repassando:
+        canal.enviar(eventos.RELACIONAMENTO_CRIADO, {"pessoa_id1": pessoa_id1, "pessoa_id2": pessoa_id2})
+
+
+def iniciar():
+    global canal
+    eventos.assinar(eventos.PESSOA_SALVA, _ao_salvar_pessoa)
+    eventos.assinar(eventos.RELACIONAMENTO_CRIADO, _ao_criar_relacionamento)
+    if REDIS_URL and canal is None:
+        canal = CanalRedis()
+        canal.iniciar()
+        print(f"✅ Feed: canal entre workers no redis ({CANAL})")
+    elif not ATIVO:
+        print(f"⚠️ Feed desligado: {WORKERS} workers sem FEED_REDIS_URL")
+
+
+async def parar():
+    global canal
+    eventos.cancelar(eventos.PESSOA_SALVA, _ao_salvar_pessoa)
+    eventos.cancelar(eventos.RELACIONAMENTO_CRIADO, _ao_criar_relacionamento)
+    if canal is not None:
+        await canal.parar()
+        canal = None
+
+
+def stats() -> dict:
+    return {"ativo": ATIVO, "workers": WORKERS, "janela_ms": JANELA_S * 1000, "buffer": BUFFER,
+            "canal": canal.stats() if canal is not None else None, **difusor.stats()}
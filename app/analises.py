@@ -0,0 +1,353 @@
+"""
+Análises do grafo fora do caminho das requisições: PageRank, comunidades
+(propagação de rótulos) e centralidade de grau.
+
+A execução lê a adjacência CONHECE em lotes por pessoa_id (ou de um snapshot
+de app/snapshot.py), monta um CSR em arrays numpy e calcula tudo com operações
+vetorizadas sobre as arestas (np.bincount faz o papel do produto matriz-vetor
+esparso), numa thread para não bloquear o loop. Os resultados voltam ao banco
+em lotes UNWIND como propriedades das pessoas (pagerank, comunidade, grau,
+centralidade_grau) e o resumo da execução, com a duração de cada fase, fica no
+nó (:Analise {nome: 'grafo'}). Os endpoints /analises/* só leem esses valores.
+
+O mesmo nó guarda a trava da execução (em_execucao): só um worker ou job
+executa por vez, e /analises/ mostra o estado de qualquer um deles.
+
+    POST /analises/executar                   # em segundo plano
+    python -m app.analises                    # job avulso (cron), lendo do Neo4j
+    python -m app.analises --snapshot grafo.snap
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .backends import crud
+from .database import sessao
+
+AMORTECIMENTO = float(os.getenv("ANALISES_AMORTECIMENTO", "0.85"))
+# diferença L1 entre duas iterações (os scores somam 1) abaixo da qual o PageRank para
+TOLERANCIA = float(os.getenv("ANALISES_TOLERANCIA", "1e-6"))
+MAX_ITERACOES_PAGERANK = int(os.getenv("ANALISES_MAX_ITERACOES_PAGERANK", "100"))
+MAX_ITERACOES_COMUNIDADES = int(os.getenv("ANALISES_MAX_ITERACOES_COMUNIDADES", "30"))
+LOTE_LEITURA = int(os.getenv("ANALISES_LOTE_LEITURA", "10000"))
+LOTE_ESCRITA = int(os.getenv("ANALISES_LOTE_ESCRITA", "5000"))
+# 0 desliga a execução periódica (com vários workers, prefira um job avulso)
+INTERVALO_S = float(os.getenv("ANALISES_INTERVALO_S", "0"))
+# trava mais velha que isso é de uma execução que morreu sem soltá-la
+TRAVA_VALIDADE_S = float(os.getenv("ANALISES_TRAVA_VALIDADE_S", "3600"))
+# comunidades guardadas no resumo da execução, para /analises/comunidades
+TOP_COMUNIDADES = 50
+SEED = 42
+
+_execucao: Optional[asyncio.Task] = None
+_periodica: Optional[asyncio.Task] = None
+
+
+class AnaliseEmExecucao(Exception):
+    def __init__(self):
+        super().__init__("Já existe uma análise em execução")
+
+
+def _origens(offsets: np.ndarray) -> np.ndarray:
+    return np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+
+
+def pagerank(offsets: np.ndarray, alvos: np.ndarray, amortecimento: float = AMORTECIMENTO,
+             tolerancia: float = TOLERANCIA, max_iteracoes: int = MAX_ITERACOES_PAGERANK) -> Tuple[np.ndarray, int]:
+    """
+    PageRank sobre (p)-[:CONHECE]->(q): q recebe parte do score de quem a conhece.
+    Pessoas sem arestas de saída distribuem o score igualmente entre todas.
+    """
+    n = len(offsets) - 1
+    if n == 0:
+        return np.zeros(0), 0
+    grau_saida = np.diff(offsets).astype(np.float64)
+    sem_saida = grau_saida == 0
+    divisor = np.where(sem_saida, 1.0, grau_saida)
+    origens = _origens(offsets)
+    scores = np.full(n, 1.0 / n)
+    for iteracao in range(1, max_iteracoes + 1):
+        recebido = np.bincount(alvos, weights=(scores / divisor)[origens], minlength=n)
+        novos = amortecimento * (recebido + scores[sem_saida].sum() / n) + (1 - amortecimento) / n
+        erro = np.abs(novos - scores).sum()
+        scores = novos
+        if erro < tolerancia:
+            break
+    return scores, iteracao
+
+
+def comunidades(offsets: np.ndarray, alvos: np.ndarray, max_iteracoes: int = MAX_ITERACOES_COMUNIDADES,
+                seed: int = SEED) -> Tuple[np.ndarray, int]:
+    """
+    Propagação de rótulos sem direção: cada pessoa adota o rótulo mais frequente entre os vizinhos
+    (empate: mantém o atual, senão o menor). Só metade das pessoas, sorteada, muda por iteração,
+    o que evita a oscilação da versão síncrona. Comunidades numeradas da maior (0) para a menor.
+    """
+    n = len(offsets) - 1
+    if n == 0:
+        return np.zeros(0, dtype=np.int32), 0
+    origens = _origens(offsets)
+    # pessoa * n: somada ao rótulo do vizinho forma uma chave que ordena por (pessoa, rótulo)
+    fonte = np.concatenate([origens, alvos]).astype(np.int64) * n
+    vizinho = np.concatenate([alvos, origens])
+    rotulos = np.arange(n, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    iteracao = 0
+    for iteracao in range(1, max_iteracoes + 1):
+        # pares (pessoa, rótulo do vizinho) ordenados: cada grupo contíguo é um rótulo candidato
+        chaves = np.sort(fonte + rotulos[vizinho])
+        if len(chaves) == 0:
+            break
+        inicios = np.flatnonzero(np.r_[True, chaves[1:] != chaves[:-1]])
+        contagens = np.diff(np.r_[inicios, len(chaves)])
+        pessoa, rotulo = np.divmod(chaves[inicios], n)
+        pontos = contagens * 2 + (rotulo == rotulos[pessoa])
+        ordem = np.lexsort((rotulo, -pontos, pessoa))
+        pessoa, rotulo = pessoa[ordem], rotulo[ordem]
+        melhor = np.r_[True, pessoa[1:] != pessoa[:-1]]
+        pessoa, rotulo = pessoa[melhor], rotulo[melhor]
+        instaveis = rotulo != rotulos[pessoa]
+        if not instaveis.any():
+            break
+        mudam = instaveis & (rng.random(len(pessoa)) < 0.5)
+        rotulos[pessoa[mudam]] = rotulo[mudam]
+
+    _, comunidade, tamanhos = np.unique(rotulos, return_inverse=True, return_counts=True)
+    posicao = np.empty(len(tamanhos), dtype=np.int32)
+    posicao[np.argsort(-tamanhos, kind="stable")] = np.arange(len(tamanhos), dtype=np.int32)
+    return posicao[comunidade], iteracao
+
+
+def graus(offsets: np.ndarray, alvos: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Grau (entrada + saída) e centralidade de grau normalizada por n - 1
+    """
+    n = len(offsets) - 1
+    grau = np.diff(offsets) + np.bincount(alvos, minlength=n)
+    return grau, grau / max(n - 1, 1)
+
+
+def calcular(ids: np.ndarray, offsets: np.ndarray, alvos: np.ndarray) -> Tuple[Dict[str, np.ndarray], dict]:
+    """
+    Todas as métricas para o CSR dado (índices das pessoas em `ids`), com a duração de cada uma
+    """
+    resumo = {"pessoas": len(ids), "relacionamentos": len(alvos)}
+    inicio = time.perf_counter()
+    scores, resumo["iteracoes_pagerank"] = pagerank(offsets, alvos)
+    resumo["duracao_pagerank_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+
+    inicio = time.perf_counter()
+    comunidade, resumo["iteracoes_comunidades"] = comunidades(offsets, alvos)
+    resumo["duracao_comunidades_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+
+    inicio = time.perf_counter()
+    grau, centralidade = graus(offsets, alvos)
+    resumo["duracao_grau_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+
+    tamanhos = np.bincount(comunidade) if len(comunidade) else np.zeros(0, dtype=np.int64)
+    resumo["total_comunidades"] = len(tamanhos)
+    resumo["tamanhos_comunidades"] = tamanhos[:TOP_COMUNIDADES].tolist()
+    metricas = {"pagerank": scores, "comunidade": comunidade, "grau": grau, "centralidade_grau": centralidade}
+    return metricas, resumo
+
+
+async def ler_adjacencia(tamanho_lote: int = LOTE_LEITURA) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (ids, offsets, alvos) lidos do banco em lotes por pessoa_id
+    """
+    from .snapshot import csr_por_ids
+
+    ids, origens, destinos = [], [], []
+    after_id = -1
+    async with sessao(leitura=True) as db:
+        while True:
+            lote = await crud.get_adjacencia(db, after_id=after_id, limite=tamanho_lote)
+            for pessoa in lote:
+                ids.append(pessoa["id"])
+                origens.extend([pessoa["id"]] * len(pessoa["destinos"]))
+                destinos.extend(pessoa["destinos"])
+            if len(lote) < tamanho_lote:
+                break
+            after_id = lote[-1]["id"]
+    ids = np.array(ids, dtype=np.int64)
+    offsets, alvos = csr_por_ids(ids, np.array(origens, dtype=np.int64), np.array(destinos, dtype=np.int64))
+    return ids, offsets, alvos
+
+
+def calcular_snapshot(caminho: str) -> Tuple[np.ndarray, Dict[str, np.ndarray], dict]:
+    """
+    calcular() direto sobre as colunas mapeadas do snapshot, sem copiar a adjacência. Nenhum array
+    aponta para o arquivo depois do cálculo (ids vai copiado), então o mmap fecha na saída do with
+    """
+    from .snapshot import Snapshot
+
+    inicio = time.perf_counter()
+    with Snapshot(caminho) as snap:
+        duracao_leitura_ms = round((time.perf_counter() - inicio) * 1000, 1)
+        metricas, resumo = calcular(snap.ids, snap.arestas_offsets, snap.arestas)
+        resumo["duracao_leitura_ms"] = duracao_leitura_ms
+        return snap.ids.copy(), metricas, resumo
+
+
+async def gravar(ids: np.ndarray, metricas: Dict[str, np.ndarray], tamanho_lote: int = LOTE_ESCRITA) -> int:
+    """
+    Grava as métricas como propriedades das pessoas, um lote UNWIND por transação
+    """
+    escritas = 0
+    colunas = {
+        "id": ids,
+        "pagerank": metricas["pagerank"],
+        "comunidade": metricas["comunidade"],
+        "grau": metricas["grau"],
+        "centralidade_grau": metricas["centralidade_grau"],
+    }
+    for inicio in range(0, len(ids), tamanho_lote):
+        fatias = {nome: valores[inicio:inicio + tamanho_lote].tolist() for nome, valores in colunas.items()}
+        linhas = [dict(zip(fatias, valores)) for valores in zip(*fatias.values())]
+        async with sessao() as db:
+            escritas += await crud.gravar_analises_em_lote(db, linhas)
+    return escritas
+
+
+async def _calcular_e_gravar(snapshot: Optional[str]) -> dict:
+    """
+    Lê a adjacência, calcula as métricas e grava nas pessoas; devolve o resumo da execução
+    """
+    inicio_total = time.perf_counter()
+    # numpy libera o GIL na maior parte do cálculo
+    if snapshot:
+        ids, metricas, resumo = await asyncio.to_thread(calcular_snapshot, snapshot)
+    else:
+        inicio = time.perf_counter()
+        ids, offsets, alvos = await ler_adjacencia()
+        duracao_leitura_ms = round((time.perf_counter() - inicio) * 1000, 1)
+        metricas, resumo = await asyncio.to_thread(calcular, ids, offsets, alvos)
+        resumo["duracao_leitura_ms"] = duracao_leitura_ms
+
+    inicio = time.perf_counter()
+    resumo["pessoas_gravadas"] = await gravar(ids, metricas)
+    resumo["duracao_gravacao_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    resumo["duracao_total_ms"] = round((time.perf_counter() - inicio_total) * 1000, 1)
+    resumo["origem"] = snapshot or "banco"
+    resumo["executado_em"] = datetime.now(timezone.utc).isoformat()
+    return resumo
+
+
+async def _travar():
+    async with sessao() as db:
+        if not await crud.iniciar_execucao_analise(db, validade_s=TRAVA_VALIDADE_S):
+            raise AnaliseEmExecucao()
+
+
+async def _executar_travado(snapshot: Optional[str]) -> dict:
+    """
+    Executa com a trava já tomada e a solta no fim, gravando o resumo ou o erro
+    """
+    try:
+        resumo = await _calcular_e_gravar(snapshot)
+    except (Exception, asyncio.CancelledError) as e:
+        async with sessao() as db:
+            await crud.finalizar_execucao_analise(db, erro=str(e) or type(e).__name__)
+        raise
+    async with sessao() as db:
+        await crud.finalizar_execucao_analise(db, resumo=resumo)
+    print(f"✅ Análises do grafo: {resumo['pessoas']} pessoas, {resumo['total_comunidades']} comunidades, "
+          f"PageRank em {resumo['iteracoes_pagerank']} iterações ({resumo['duracao_total_ms']} ms no total)")
+    return resumo
+
+
+async def executar(snapshot: Optional[str] = None) -> dict:
+    """
+    Executa agora, se nenhum outro worker ou job estiver executando (senão AnaliseEmExecucao)
+    """
+    await _travar()
+    return await _executar_travado(snapshot)
+
+
+async def _executar_em_segundo_plano():
+    try:
+        await _executar_travado(None)
+    except Exception as e:
+        print(f"❌ Análises do grafo falharam: {e}")
+
+
+async def disparar() -> asyncio.Task:
+    """
+    Toma a trava no banco e executa em segundo plano neste worker
+    """
+    global _execucao
+    await _travar()
+    _execucao = asyncio.create_task(_executar_em_segundo_plano())
+    return _execucao
+
+
+async def _executar_periodicamente():
+    while True:
+        await asyncio.sleep(INTERVALO_S)
+        try:
+            await disparar()
+        except AnaliseEmExecucao:
+            # outro worker (ou job) está executando: fica para o próximo intervalo
+            pass
+
+
+def iniciar():
+    global _periodica
+    if _periodica is None and INTERVALO_S > 0:
+        _periodica = asyncio.create_task(_executar_periodicamente())
+
+
+async def parar():
+    global _periodica, _execucao
+    for tarefa in (_periodica, _execucao):
+        if tarefa is not None and not tarefa.done():
+            tarefa.cancel()
+            try:
+                await tarefa
+            except asyncio.CancelledError:
+                pass
+    _periodica = _execucao = None
+
+
+async def get_execucao(db) -> dict:
+    estado = await crud.get_estado_analise(db=db, validade_s=TRAVA_VALIDADE_S)
+    return {**estado, "ultima_execucao": await crud.get_execucao_analise(db=db)}
+
+
+async def get_comunidades(db) -> Optional[list]:
+    """
+    Maiores comunidades da última execução (tamanhos guardados no resumo, sem varrer as pessoas)
+    """
+    resumo = await crud.get_execucao_analise(db=db)
+    if resumo is None:
+        return None
+    # comunidades numeradas por tamanho: a posição na lista é o número da comunidade
+    return [{"comunidade": comunidade, "tamanho": tamanho}
+            for comunidade, tamanho in enumerate(resumo["tamanhos_comunidades"])]
+
+
+async def _main(argv):
+    from .database import BACKEND, database
+
+    parser = argparse.ArgumentParser(prog="python -m app.analises", description="PageRank, comunidades e grau")
+    parser.add_argument("--snapshot", help="lê a adjacência deste snapshot em vez do banco")
+    args = parser.parse_args(argv)
+    if BACKEND == "memoria":
+        raise SystemExit("❌ O job avulso grava no Neo4j: rode sem GRAFO_BACKEND=memoria")
+    await database.connect()
+    try:
+        await executar(args.snapshot)
+    except AnaliseEmExecucao as e:
+        raise SystemExit(f"❌ {e}")
+    finally:
+        await database.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1:]))
@@ -0,0 +1,119 @@
+"""
+Aquecimento dos planos de execução do Neo4j na inicialização.
+
+Cada função do crud é chamada uma vez com uma sessão que prefixa as queries
+com EXPLAIN: o servidor planeja e guarda o plano em cache sem executar nada
+(escritas inclusive), e as primeiras requisições depois de um deploy não pagam
+o planejamento. As funções recebem resultados vazios; erros decorrentes disso
+são ignorados.
+"""
+import time
+from typing import Optional
+
+from . import crud, filtros, schemas
+from .paginacao import codificar_cursor
+
+# (função do crud, argumentos): uma chamada por query distinta
+CONSULTAS = [
+    (crud.get_pessoas, {}),
+    (crud.get_pessoas, {"after": codificar_cursor({"id": 0})}),
+    (crud.iter_pessoas, {}),
+    (crud.get_pessoa, {"pessoa_id": 0}),
+    (crud.get_pessoas_por_ids, {"pessoa_ids": [0]}),
+    (crud.buscar_pessoas, {"termos": ["a"]}),
+    (crud.get_conexoes_ids, {"pessoa_id": 0}),
+    (crud.get_amigos, {"pessoa_id": 0}),
+    (crud.get_amigos_em_lote, {"pessoa_ids": [0]}),
+    (crud.iter_amigos, {"pessoa_id": 0}),
+    (crud.get_recomendacoes_pontuadas, {"pessoa_id": 0}),
+    (crud.get_pessoas_por_interesse, {"interesse": ""}),
+    (crud.iter_pessoas_por_interesse, {"interesse": ""}),
+    (crud.get_vizinhos_em_lote, {"pessoa_ids": [0]}),
+    (crud.get_estatisticas_rede, {}),
+    (crud.get_contagens_rede, {}),
+    # formas de filtro mais comuns; as demais são planejadas no primeiro uso
+    (crud.filtrar_pessoas, {"filtro": filtros.Filtro()}),
+    (crud.filtrar_pessoas, {"filtro": filtros.Filtro(cidade="")}),
+    (crud.filtrar_pessoas, {"filtro": filtros.Filtro(interesses=("",))}),
+    (crud.filtrar_pessoas, {"filtro": filtros.Filtro(cidade="", interesses=("",), ordenar="-grau")}),
+    (crud.get_pessoas_para_snapshot, {"after_id": 0, "limite": 1}),
+    (crud.get_adjacencia, {"after_id": 0, "limite": 1}),
+    (crud.get_execucao_analise, {}),
+    (crud.get_estado_analise, {"validade_s": 0}),
+    (crud.get_influenciadores, {}),
+    (crud.get_analise_pessoa, {"pessoa_id": 0}),
+    (crud.get_membros_comunidade, {"comunidade": 0}),
+    (crud.criar_pessoa, {"pessoa": schemas.PessoaCreate(nome="", idade=0, interesses=[])}),
+    (crud.criar_relacionamento, {"pessoa_id1": 0, "pessoa_id2": 0}),
+    (crud.criar_pessoas_em_lote, {"pessoas": []}),
+    (crud.criar_relacionamentos_em_lote, {"relacionamentos": []}),
+    (crud.gravar_analises_em_lote, {"linhas": []}),
+]
+
+
+class _TransacaoExplain:
+    def __init__(self, tx, sessao: "SessaoExplain"):
+        self._tx = tx
+        self._sessao = sessao
+
+    async def run(self, query: str, parameters: Optional[dict] = None, **kwargs):
+        resultado = await self._tx.run("EXPLAIN " + query, parameters, **kwargs)
+        self._sessao.queries += 1
+        return resultado
+
+
+class SessaoExplain:
+    """
+    Sessão do driver em que toda query roda como EXPLAIN (nada é lido nem gravado)
+    """
+    def __init__(self, sessao):
+        self._sessao = sessao
+        self.queries = 0
+
+    async def run(self, query: str, parameters: Optional[dict] = None, **kwargs):
+        resultado = await self._sessao.run("EXPLAIN " + query, parameters, **kwargs)
+        self.queries += 1
+        return resultado
+
+    async def execute_read(self, funcao, *args, **kwargs):
+        return await self._sessao.execute_read(lambda tx: funcao(_TransacaoExplain(tx, self)), *args, **kwargs)
+
+    async def execute_write(self, funcao, *args, **kwargs):
+        return await self._sessao.execute_write(lambda tx: funcao(_TransacaoExplain(tx, self)), *args, **kwargs)
+
+    async def close(self):
+        await self._sessao.close()
+
+
+async def _chamar(funcao, db, argumentos: dict):
+    retorno = funcao(db=db, **argumentos)
+    if hasattr(retorno, "__aiter__"):
+        async for _ in retorno:
+            pass
+    else:
+        await retorno
+
+
+async def aquecer(driver) -> dict:
+    """
+    Planeja todas as queries do crud; retorna quantas foram planejadas e quanto tempo levou
+    """
+    inicio = time.perf_counter()
+    # sessão direta do driver: o EXPLAIN não entra nas métricas de queries
+    sessao = SessaoExplain(driver.session())
+    erros = 0
+    try:
+        for funcao, argumentos in CONSULTAS:
+            queries = sessao.queries
+            try:
+                await _chamar(funcao, sessao, argumentos)
+            except Exception as e:
+                # resultado vazio do EXPLAIN (ex.: criar_pessoa sem registro) não é falha de planejamento
+                if sessao.queries == queries:
+                    erros += 1
+                    print(f"❌ Aquecimento de {funcao.__name__} falhou: {e}")
+    finally:
+        await sessao.close()
+    duracao_ms = round((time.perf_counter() - inicio) * 1000, 1)
+    print(f"✅ Planos aquecidos: {sessao.queries} queries em {duracao_ms} ms")
+    return {"queries": sessao.queries, "erros": erros, "duracao_ms": duracao_ms}
@@ -0,0 +1,13 @@
+"""
+Seleciona a implementação das operações de grafo conforme GRAFO_BACKEND
+"""
+from .database import BACKEND
+
+if BACKEND == "memoria":
+    from . import crud_memoria as crud
+elif BACKEND == "replica":
+    from . import crud_replica as crud
+else:
+    from . import crud
+
+__all__ = ["crud", "BACKEND"]
@@ -0,0 +1,65 @@
+"""
+Typeahead de pessoas por nome (GET /pessoas/busca).
+
+A consulta é quebrada em termos normalizados (app/texto.py: sem acentos e em
+minúsculas); cada termo casa por prefixo com algum termo do nome. No Neo4j a
+busca usa o índice full-text pessoa_nome_busca, no grafo em memória o índice
+de prefixos de GrafoMemoria. Os prefixos mais digitados ficam num LRU pequeno
+por processo, com o resultado para MAX_LIMITE pessoas; pessoas salvas
+descartam as entradas que podem ter mudado.
+"""
+import os
+from typing import List, Tuple
+
+from . import eventos
+from .backends import crud
+from .cache import LRUCache
+from .texto import termos
+
+MAX_LIMITE = 50
+# termos além deste número são ignorados
+MAX_TERMOS = int(os.getenv("BUSCA_MAX_TERMOS", "5"))
+CAPACIDADE_CACHE = int(os.getenv("BUSCA_CACHE_TAMANHO", "1000"))
+TTL_CACHE = float(os.getenv("BUSCA_CACHE_TTL_S", "30"))
+
+cache = LRUCache(CAPACIDADE_CACHE, ttl=TTL_CACHE or None)
+
+
+def chave(q: str) -> Tuple[str, ...]:
+    """
+    "  José  SIL" -> ("jose", "sil"): consultas equivalentes dividem a entrada do cache
+    """
+    return tuple(termos(q)[:MAX_TERMOS])
+
+
+async def buscar(db, q: str, limite: int = 10) -> List[dict]:
+    termos_consulta = chave(q)
+    if not termos_consulta:
+        return []
+    resultado = cache.get(termos_consulta)
+    if resultado is None:
+        resultado = await crud.buscar_pessoas(db=db, termos=list(termos_consulta), limite=MAX_LIMITE)
+        cache.set(termos_consulta, resultado)
+    return resultado[:limite]
+
+
+def _ao_salvar_pessoa(pessoa: dict):
+    # entradas que já traziam a pessoa (nome antigo) e as que o nome novo passa a satisfazer
+    termos_nome = termos(pessoa.get("nome") or "")
+    for termos_consulta, resultado in cache.itens():
+        casa = all(any(t.startswith(termo) for t in termos_nome) for termo in termos_consulta)
+        if casa or any(item["id"] == pessoa["id"] for item in resultado):
+            cache.pop(termos_consulta)
+
+
+def iniciar():
+    eventos.assinar(eventos.PESSOA_SALVA, _ao_salvar_pessoa)
+
+
+def parar():
+    eventos.cancelar(eventos.PESSOA_SALVA, _ao_salvar_pessoa)
+    cache.clear()
+
+
+def stats() -> dict:
+    return {"max_termos": MAX_TERMOS, "ttl_s": TTL_CACHE, **cache.stats()}
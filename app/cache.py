@@ -0,0 +1,100 @@
+"""
+Caches em memória do processo
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_AUSENTE = object()
+
+
+class LRUCache:
+    """
+    Cache LRU limitado por quantidade de entradas e, opcionalmente, pela soma dos tamanhos
+    informados em set (max_bytes), com expiração opcional (ttl em segundos).
+    ao_remover(chave, valor) é chamado quando uma entrada sai por despejo, expiração ou pop.
+    """
+    def __init__(self, capacidade: int = 1024, ttl: Optional[float] = None,
+                 ao_remover: Optional[Callable[[Hashable, Any], None]] = None,
+                 max_bytes: Optional[int] = None):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self.ao_remover = ao_remover
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._dados: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._dados)
+
+    def __contains__(self, chave):
+        return self.get(chave, _AUSENTE) is not _AUSENTE
+
+    def get(self, chave: Hashable, padrao: Any = None) -> Any:
+        item = self._dados.get(chave)
+        if item is None:
+            self.misses += 1
+            return padrao
+        valor, expira_em, tamanho = item
+        if expira_em is not None and expira_em < time.monotonic():
+            del self._dados[chave]
+            self.bytes -= tamanho
+            self._removido(chave, valor)
+            self.misses += 1
+            return padrao
+        self._dados.move_to_end(chave)
+        self.hits += 1
+        return valor
+
+    def set(self, chave: Hashable, valor: Any, ttl: Optional[float] = None, tamanho: int = 0):
+        ttl = self.ttl if ttl is None else ttl
+        expira_em = time.monotonic() + ttl if ttl else None
+        anterior = self._dados.get(chave)
+        if anterior is not None:
+            self.bytes -= anterior[2]
+        self._dados[chave] = (valor, expira_em, tamanho)
+        self._dados.move_to_end(chave)
+        self.bytes += tamanho
+        while len(self._dados) > self.capacidade or (
+                self.max_bytes is not None and self.bytes > self.max_bytes and len(self._dados) > 1):
+            antiga, (valor_antigo, _, tamanho_antigo) = self._dados.popitem(last=False)
+            self.bytes -= tamanho_antigo
+            self._removido(antiga, valor_antigo)
+
+    def pop(self, chave: Hashable, padrao: Any = None) -> Any:
+        item = self._dados.pop(chave, None)
+        if item is None:
+            return padrao
+        self.bytes -= item[2]
+        self._removido(chave, item[0])
+        return item[0]
+
+    def itens(self) -> list:
+        """
+        (chave, valor) das entradas válidas, sem mexer na ordem do LRU nem em hits/misses
+        """
+        agora = time.monotonic()
+        return [(chave, valor) for chave, (valor, expira_em, _) in self._dados.items()
+                if expira_em is None or expira_em >= agora]
+
+    def clear(self):
+        for chave in list(self._dados):
+            self.pop(chave)
+
+    def _removido(self, chave, valor):
+        if self.ao_remover is not None:
+            self.ao_remover(chave, valor)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entradas": len(self._dados),
+            "capacidade": self.capacidade,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_acerto": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,315 @@
+"""
+Cache de respostas das rotas de leitura, com ETag e invalidação por tags.
+
+O middleware guarda o corpo JSON das respostas 200 das rotas listadas em
+ROTAS, junto com um ETag e os headers de paginação. Cada entrada recebe tags
+(por exemplo "pessoa:42" para cada pessoa presente no corpo); os eventos de
+escrita do crud invalidam as tags afetadas, antes de a escrita responder.
+If-None-Match com o ETag atual responde 304 sem corpo. Leituras com
+X-Neo4j-Bookmarks não passam pelo cache: a entrada de outro worker pode ser
+anterior à escrita que o cliente quer ler.
+
+O armazenamento é plugável (CACHE_RESPOSTAS_BACKEND): "memoria", um LRU por
+processo limitado em entradas e bytes, ou "redis", compartilhado entre os
+workers (requer o pacote redis e CACHE_RESPOSTAS_REDIS_URL).
+"""
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import re
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from . import eventos
+from .cache import LRUCache
+from .database import bookmarks_da_requisicao
+
+ATIVO = os.getenv("CACHE_RESPOSTAS", "true").lower() in ("1", "true", "yes", "sim")
+BACKEND = os.getenv("CACHE_RESPOSTAS_BACKEND", "memoria")
+TTL = float(os.getenv("CACHE_RESPOSTAS_TTL_S", "60"))
+CAPACIDADE = int(os.getenv("CACHE_RESPOSTAS_TAMANHO", "10000"))
+MAX_BYTES = int(os.getenv("CACHE_RESPOSTAS_MAX_MB", "64")) * 1024 * 1024
+# respostas maiores que isto não são guardadas
+MAX_BYTES_ENTRADA = MAX_BYTES // 16
+REDIS_URL = os.getenv("CACHE_RESPOSTAS_REDIS_URL", "redis://localhost:6379/0")
+
+# headers da resposta original que voltam junto com o corpo em cache
+HEADERS_GUARDADOS = ("content-type", "x-next-cursor", "link", "x-rede-truncada")
+
+
+def _ids(corpo) -> List[str]:
+    itens = corpo if isinstance(corpo, list) else [corpo]
+    return [f"pessoa:{item['id']}" for item in itens if isinstance(item, dict) and "id" in item]
+
+
+# (padrão do path, tags(match, corpo)): todas as rotas de leitura em cache
+ROTAS: List[Tuple[re.Pattern, Callable]] = [
+    (re.compile(r"^/pessoas/?$"), lambda m, corpo: ["pessoas"]),
+    (re.compile(r"^/pessoas/(\d+)$"), lambda m, corpo: [f"pessoa:{m.group(1)}"]),
+    (re.compile(r"^/pessoas/(\d+)/amigos$"), lambda m, corpo: [f"amigos:{m.group(1)}"] + _ids(corpo)),
+    (re.compile(r"^/pessoas/interesse/([^/]+)$"), lambda m, corpo: [f"interesse:{m.group(1)}"] + _ids(corpo)),
+    (re.compile(r"^/estatisticas/?$"), lambda m, corpo: ["estatisticas"]),
+    (re.compile(r"^/pessoas/filtro$"), lambda m, corpo: ["filtro"]),
+]
+
+
+def calcular_etag(corpo: bytes) -> str:
+    return '"' + hashlib.blake2b(corpo, digest_size=12).hexdigest() + '"'
+
+
+def etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidatos = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidatos or etag in candidatos or f"W/{etag}" in candidatos
+
+
+class CacheMemoria:
+    """
+    LRU por processo com índice tag -> chaves
+    """
+    nome = "memoria"
+
+    def __init__(self, capacidade: int = CAPACIDADE, ttl: float = TTL, max_bytes: int = MAX_BYTES):
+        self.lru = LRUCache(capacidade, ttl=ttl or None, ao_remover=self._ao_remover, max_bytes=max_bytes)
+        self.por_tag: Dict[str, Set[str]] = {}
+        self.invalidacoes = 0
+
+    def _ao_remover(self, chave: str, entrada: dict):
+        for tag in entrada["tags"]:
+            chaves = self.por_tag.get(tag)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self.por_tag[tag]
+
+    def get(self, chave: str) -> Optional[dict]:
+        return self.lru.get(chave)
+
+    def set(self, chave: str, entrada: dict):
+        self.lru.pop(chave)
+        self.lru.set(chave, entrada, tamanho=len(entrada["corpo"]))
+        for tag in entrada["tags"]:
+            self.por_tag.setdefault(tag, set()).add(chave)
+
+    def invalidar(self, tags: Iterable[str]):
+        for tag in tags:
+            for chave in list(self.por_tag.get(tag, ())):
+                self.lru.pop(chave)
+                self.invalidacoes += 1
+
+    def stats(self) -> dict:
+        return {**self.lru.stats(), "tags": len(self.por_tag), "invalidacoes": self.invalidacoes}
+
+
+class CacheRedis:
+    """
+    Entradas compartilhadas entre workers; cada tag é um SET com as chaves que a usam
+    """
+    nome = "redis"
+    PREFIXO = "cache_respostas:"
+
+    def __init__(self, url: str = REDIS_URL, ttl: float = TTL):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise Exception("CACHE_RESPOSTAS_BACKEND=redis requer o pacote redis (pip install redis)")
+        self.redis = redis.from_url(url)
+        self.ttl = int(ttl) or None
+        self.hits = 0
+        self.misses = 0
+        self.invalidacoes = 0
+
+    async def get(self, chave: str) -> Optional[dict]:
+        bruto = await self.redis.get(self.PREFIXO + chave)
+        if bruto is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        meta, corpo = bruto.split(b"\n", 1)
+        return {**json.loads(meta), "corpo": corpo}
+
+    async def set(self, chave: str, entrada: dict):
+        meta = {"etag": entrada["etag"], "headers": entrada["headers"], "tags": entrada["tags"]}
+        bruto = json.dumps(meta).encode() + b"\n" + entrada["corpo"]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(self.PREFIXO + chave, bruto, ex=self.ttl)
+            for tag in entrada["tags"]:
+                pipe.sadd(self.PREFIXO + "tag:" + tag, chave)
+                if self.ttl:
+                    pipe.expire(self.PREFIXO + "tag:" + tag, self.ttl)
+            await pipe.execute()
+
+    async def invalidar(self, tags: Iterable[str]):
+        for tag in tags:
+            chave_tag = self.PREFIXO + "tag:" + tag
+            chaves = await self.redis.smembers(chave_tag)
+            if chaves:
+                await self.redis.delete(*(self.PREFIXO + c.decode() for c in chaves))
+                self.invalidacoes += len(chaves)
+            await self.redis.delete(chave_tag)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_acerto": round(self.hits / total, 4) if total else 0.0,
+            "invalidacoes": self.invalidacoes,
+        }
+
+
+BACKENDS = {"memoria": CacheMemoria, "redis": CacheRedis}
+if BACKEND not in BACKENDS:
+    raise Exception(f"CACHE_RESPOSTAS_BACKEND inválido: {BACKEND!r} (use {', '.join(BACKENDS)})")
+
+armazenamento = None
+_tarefas: Set[asyncio.Task] = set()
+# invalidações assíncronas disparadas pela requisição atual; o middleware as espera antes de responder
+_pendentes: ContextVar[Optional[List[asyncio.Task]]] = ContextVar("cache_respostas_pendentes", default=None)
+# incrementada a cada invalidação: uma resposta calculada enquanto houve escrita não é guardada
+_geracao = 0
+# leituras com bookmarks, que foram direto ao banco
+com_bookmarks = 0
+
+
+async def _aguardar(resultado):
+    return await resultado if inspect.isawaitable(resultado) else resultado
+
+
+def invalidar(tags: List[str]):
+    """
+    No backend em memória a invalidação acontece na hora; no redis ela é agendada
+    no loop e, dentro de uma requisição, o middleware a espera antes de responder
+    """
+    global _geracao
+    if armazenamento is None:
+        return
+    _geracao += 1
+    resultado = armazenamento.invalidar(tags)
+    if inspect.isawaitable(resultado):
+        tarefa = asyncio.get_running_loop().create_task(resultado)
+        _tarefas.add(tarefa)
+        tarefa.add_done_callback(_tarefas.discard)
+        pendentes = _pendentes.get()
+        if pendentes is not None:
+            pendentes.append(tarefa)
+
+
+async def _esperar_invalidacoes(pendentes: List[asyncio.Task]):
+    for resultado in await asyncio.gather(*pendentes, return_exceptions=True):
+        if isinstance(resultado, Exception):
+            print(f"❌ Erro ao invalidar o cache de respostas: {resultado}")
+
+
+def _ao_salvar_pessoa(pessoa: dict):
+    tags = [f"pessoa:{pessoa['id']}", "pessoas", "estatisticas", "filtro"]
+    tags += [f"interesse:{i}" for i in pessoa.get("interesses") or ()]
+    invalidar(tags)
+
+
+def _ao_criar_relacionamento(pessoa_id1: int, pessoa_id2: int):
+    invalidar([f"amigos:{pessoa_id1}", "estatisticas", "filtro"])
+
+
+def iniciar():
+    global armazenamento
+    if not ATIVO or armazenamento is not None:
+        return
+    armazenamento = BACKENDS[BACKEND]()
+    eventos.assinar(eventos.PESSOA_SALVA, _ao_salvar_pessoa)
+    eventos.assinar(eventos.RELACIONAMENTO_CRIADO, _ao_criar_relacionamento)
+    print(f"✅ Cache de respostas: {BACKEND} (ttl {TTL:g}s)")
+
+
+def parar():
+    global armazenamento
+    eventos.cancelar(eventos.PESSOA_SALVA, _ao_salvar_pessoa)
+    eventos.cancelar(eventos.RELACIONAMENTO_CRIADO, _ao_criar_relacionamento)
+    armazenamento = None
+
+
+def stats() -> dict:
+    if armazenamento is None:
+        return {"ativo": False}
+    return {"ativo": True, "backend": armazenamento.nome, "ttl_s": TTL, "com_bookmarks": com_bookmarks,
+            **armazenamento.stats()}
+
+
+def _rota(path: str):
+    for padrao, tags in ROTAS:
+        m = padrao.match(path)
+        if m:
+            return m, tags
+    return None, None
+
+
+def _resposta(entrada: dict, if_none_match: Optional[str], origem: str) -> Response:
+    headers = {"ETag": entrada["etag"], "Cache-Control": "no-cache", "X-Cache": origem}
+    if etag_confere(if_none_match, entrada["etag"]):
+        return Response(status_code=304, headers=headers)
+    headers.update(entrada["headers"])
+    return Response(content=entrada["corpo"], status_code=200, headers=headers)
+
+
+class MiddlewareCache(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        if armazenamento is None:
+            return await call_next(request)
+        if request.method != "GET":
+            return await self._escrita(request, call_next)
+        path = request.scope["path"]
+        m, tags = _rota(path)
+        if m is None:
+            return await call_next(request)
+        if bookmarks_da_requisicao(request):
+            # read-your-writes: nem lê nem guarda, como as leituras com bookmarks no coalescedor
+            global com_bookmarks
+            com_bookmarks += 1
+            return await call_next(request)
+
+        chave = path + "?" + request.url.query
+        if_none_match = request.headers.get("if-none-match")
+        entrada = await _aguardar(armazenamento.get(chave))
+        if entrada is not None:
+            return _resposta(entrada, if_none_match, "HIT")
+
+        geracao = _geracao
+        resposta = await call_next(request)
+        # só JSON completo: NDJSON em streaming e erros passam direto
+        if resposta.status_code != 200 or resposta.headers.get("content-type") != "application/json":
+            return resposta
+        corpo = b"".join([parte async for parte in resposta.body_iterator])
+        entrada = {
+            "corpo": corpo,
+            "etag": calcular_etag(corpo),
+            "headers": {k: v for k, v in resposta.headers.items() if k in HEADERS_GUARDADOS},
+            "tags": [],
+        }
+        if len(corpo) <= MAX_BYTES_ENTRADA and geracao == _geracao:
+            try:
+                entrada["tags"] = tags(m, json.loads(corpo))
+            except ValueError:
+                entrada["tags"] = None
+            if entrada["tags"] is not None:
+                await _aguardar(armazenamento.set(chave, entrada))
+        return _resposta(entrada, if_none_match, "MISS")
+
+    async def _escrita(self, request: Request, call_next):
+        # o app roda numa cópia deste contexto e registra na mesma lista
+        pendentes: List[asyncio.Task] = []
+        token = _pendentes.set(pendentes)
+        try:
+            resposta = await call_next(request)
+        finally:
+            _pendentes.reset(token)
+        # a escrita só responde depois de o redis descartar as entradas: a próxima leitura não vê a resposta antiga
+        if pendentes:
+            await _esperar_invalidacoes(pendentes)
+        return resposta
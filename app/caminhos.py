@@ -0,0 +1,142 @@
+"""
+Busca de caminhos entre pessoas para /caminho/{id1}/{id2}.
+
+BFS bidirecional por níveis: a cada passo expande a menor das duas fronteiras,
+buscando os vizinhos do nível inteiro numa única consulta. A busca é limitada
+por profundidade máxima e por um orçamento de nós visitados. Os pais de cada
+nó são guardados em lista, o que permite devolver todos os caminhos mínimos.
+Resultados de pares consultados com frequência ficam em cache até a próxima
+escrita no grafo feita por este processo; escritas de outros workers só são
+vistas quando a entrada expira (CAMINHO_CACHE_TTL_S).
+"""
+import os
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+
+from . import eventos
+from .backends import crud
+from .cache import LRUCache
+
+PROFUNDIDADE_MAXIMA = int(os.getenv("CAMINHO_PROFUNDIDADE_MAXIMA", "6"))
+LIMITE_VISITADOS = int(os.getenv("CAMINHO_LIMITE_VISITADOS", "100000"))
+MAXIMO_CAMINHOS = int(os.getenv("CAMINHO_MAXIMO_CAMINHOS", "100"))
+
+TTL_CACHE = float(os.getenv("CAMINHO_CACHE_TTL_S", "30"))
+
+cache = LRUCache(int(os.getenv("CAMINHO_CACHE_TAMANHO", "10000")), ttl=TTL_CACHE or None)
+# incrementada a cada escrita deste processo: entradas de versões anteriores são descartadas na leitura
+_versao = 0
+
+
+class LimiteVisitadosExcedido(Exception):
+    def __init__(self, visitados: int, limite: int):
+        super().__init__(f"Busca interrompida após visitar {visitados} pessoas (limite {limite})")
+        self.visitados = visitados
+
+
+def _invalidar(**_dados):
+    global _versao
+    _versao += 1
+
+
+def iniciar():
+    eventos.assinar(eventos.RELACIONAMENTO_CRIADO, _invalidar)
+    # nomes fazem parte da resposta
+    eventos.assinar(eventos.PESSOA_SALVA, _invalidar)
+
+
+def parar():
+    eventos.cancelar(eventos.RELACIONAMENTO_CRIADO, _invalidar)
+    eventos.cancelar(eventos.PESSOA_SALVA, _invalidar)
+    cache.clear()
+
+
+def _ate_raiz(pais: Dict[int, List[int]], no: int) -> Iterator[List[int]]:
+    """
+    Todos os caminhos mínimos de `no` até a raiz da árvore de busca (no primeiro)
+    """
+    if not pais[no]:
+        yield [no]
+        return
+    for pai in pais[no]:
+        for resto in _ate_raiz(pais, pai):
+            yield [no] + resto
+
+
+def _caminhos(pais_origem, pais_destino, encontros) -> Iterator[List[int]]:
+    for meio in sorted(encontros):
+        for ida in _ate_raiz(pais_origem, meio):
+            for volta in _ate_raiz(pais_destino, meio):
+                yield ida[::-1] + volta[1:]
+
+
+async def buscar(db, origem: int, destino: int, k: int = 1,
+                 profundidade_maxima: int = PROFUNDIDADE_MAXIMA,
+                 limite_visitados: Optional[int] = None) -> Optional[dict]:
+    """
+    Até k caminhos mínimos (listas de pessoa_id) entre origem e destino, ou None
+    se não houver caminho com até profundidade_maxima arestas
+    """
+    if origem == destino:
+        return None
+    limite_visitados = limite_visitados or LIMITE_VISITADOS
+    pais = ({origem: []}, {destino: []})
+    fronteiras = [[origem], [destino]]
+    profundidades = [0, 0]
+    visitados = 2
+
+    while fronteiras[0] and fronteiras[1] and sum(profundidades) < profundidade_maxima:
+        lado = 0 if len(fronteiras[0]) <= len(fronteiras[1]) else 1
+        meus_pais, outros_pais = pais[lado], pais[1 - lado]
+
+        vizinhos = await crud.get_vizinhos_em_lote(db=db, pessoa_ids=fronteiras[lado])
+        proxima: Dict[int, List[int]] = {}
+        for no in fronteiras[lado]:
+            for vizinho in vizinhos.get(no, ()):
+                if vizinho not in meus_pais:
+                    proxima.setdefault(vizinho, []).append(no)
+        meus_pais.update(proxima)
+        # nós que o outro lado já tinha descoberto (inclusive a outra semente) já foram contados
+        visitados += sum(1 for no in proxima if no not in outros_pais)
+        if visitados > limite_visitados:
+            raise LimiteVisitadosExcedido(visitados, limite_visitados)
+        fronteiras[lado] = list(proxima)
+        profundidades[lado] += 1
+
+        encontros = [no for no in proxima if no in outros_pais]
+        if encontros:
+            caminhos = list(islice(_caminhos(pais[0], pais[1], encontros), k))
+            return {"caminhos": caminhos, "graus_separacao": sum(profundidades), "visitados": visitados}
+    return None
+
+
+async def get_caminho(db, pessoa_id1: int, pessoa_id2: int, k: int = 1,
+                      profundidade_maxima: int = PROFUNDIDADE_MAXIMA) -> Optional[dict]:
+    """
+    Resposta de /caminho: o primeiro caminho (nomes e ids) e, com k > 1, a lista de caminhos mínimos
+    """
+    chave = (pessoa_id1, pessoa_id2, k, profundidade_maxima)
+    em_cache = cache.get(chave)
+    if em_cache is not None and em_cache[0] == _versao:
+        return em_cache[1]
+
+    versao = _versao
+    encontrado = await buscar(db, pessoa_id1, pessoa_id2, k=k, profundidade_maxima=profundidade_maxima)
+    resultado = None
+    if encontrado is not None:
+        ids = {pessoa_id for caminho in encontrado["caminhos"] for pessoa_id in caminho}
+        nomes = {p["id"]: p["nome"] for p in await crud.get_pessoas_por_ids(db=db, pessoa_ids=list(ids))}
+        caminhos = [
+            {"ids": caminho, "nomes": [nomes.get(pessoa_id) for pessoa_id in caminho]}
+            for caminho in encontrado["caminhos"]
+        ]
+        resultado = {
+            "caminho": caminhos[0]["nomes"],
+            "ids": caminhos[0]["ids"],
+            "graus_separacao": encontrado["graus_separacao"],
+            "visitados": encontrado["visitados"],
+        }
+        if k > 1:
+            resultado["caminhos"] = caminhos
+    cache.set(chave, (versao, resultado))
+    return resultado
@@ -0,0 +1,132 @@
+"""
+Ciclo de vida da aplicação: inicialização única, prontidão e encerramento.
+
+Conexão, migrações, aquecimento dos planos e carga dos índices em memória
+rodam numa tarefa própria. O lifespan espera por ela no máximo
+INICIALIZACAO_ESPERA_S: se o banco demorar, o servidor sobe mesmo assim
+respondendo /healthz, e /readyz só passa a 200 quando a inicialização
+termina. Uma inicialização que falha é refeita até o banco responder.
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from . import (
+    alteracoes, analises, aquecimento, busca, cache_respostas, caminhos, estatisticas, fila_relacionamentos,
+    recomendacoes, similaridade,
+)
+from .database import BACKEND, database, init_db
+
+ESPERA_S = float(os.getenv("INICIALIZACAO_ESPERA_S", "5"))
+NOVA_TENTATIVA_S = float(os.getenv("INICIALIZACAO_NOVA_TENTATIVA_S", "30"))
+AQUECER_PLANOS = os.getenv("AQUECER_PLANOS", "true").lower() in ("1", "true", "yes", "sim")
+# tempo máximo do RETURN 1 feito a cada /readyz
+PRONTIDAO_TIMEOUT_S = float(os.getenv("PRONTIDAO_TIMEOUT_S", "2"))
+
+estado = {
+    "fase": "parado",
+    "pronto": False,
+    "erro": None,
+    "tentativas": 0,
+    "aquecimento": None,
+    "iniciado_em": None,
+    "pronto_em": None,
+}
+_tarefa: Optional[asyncio.Task] = None
+
+
+async def _inicializar():
+    estado["fase"] = "conectando"
+    await init_db()
+    if AQUECER_PLANOS and BACKEND != "memoria":
+        estado["fase"] = "aquecendo planos"
+        estado["aquecimento"] = await aquecimento.aquecer(database.driver)
+    estado["fase"] = "carregando índices"
+    await similaridade.iniciar()
+    recomendacoes.iniciar()
+    caminhos.iniciar()
+    cache_respostas.iniciar()
+    busca.iniciar()
+    await estatisticas.iniciar()
+    analises.iniciar()
+    alteracoes.iniciar()
+
+
+async def _executar():
+    estado["iniciado_em"] = time.time()
+    while True:
+        estado["tentativas"] += 1
+        try:
+            await _inicializar()
+            break
+        except Exception as e:
+            estado["fase"] = "falhou"
+            estado["erro"] = str(e)
+            print(f"❌ Inicialização falhou: {e}; nova tentativa em {NOVA_TENTATIVA_S:g}s")
+            await asyncio.sleep(NOVA_TENTATIVA_S)
+    estado.update(fase="pronto", pronto=True, erro=None, pronto_em=time.time())
+    print(f"✅ Aplicação pronta em {estado['pronto_em'] - estado['iniciado_em']:.2f}s")
+
+
+async def aguardar_pronto(timeout: Optional[float] = None):
+    """
+    Para scripts que usam o lifespan em processo (benchmark): espera a inicialização em segundo plano
+    """
+    if _tarefa is not None:
+        await asyncio.wait_for(asyncio.shield(_tarefa), timeout)
+
+
+async def _finalizar():
+    global _tarefa
+    if _tarefa is not None and not _tarefa.done():
+        _tarefa.cancel()
+        try:
+            await _tarefa
+        except asyncio.CancelledError:
+            pass
+    _tarefa = None
+    # relacionamentos aceitos pela fila write-behind são gravados antes de o driver fechar
+    await fila_relacionamentos.parar()
+    await analises.parar()
+    await similaridade.parar()
+    await estatisticas.parar()
+    recomendacoes.parar()
+    caminhos.parar()
+    cache_respostas.parar()
+    busca.parar()
+    await alteracoes.parar()
+    await database.close()
+    estado.update(fase="parado", pronto=False)
+    print("👋 Conexões encerradas")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global _tarefa
+    _tarefa = asyncio.create_task(_executar())
+    try:
+        await asyncio.wait_for(asyncio.shield(_tarefa), ESPERA_S)
+    except asyncio.TimeoutError:
+        print(f"🕐 Inicialização continua em segundo plano (fase: {estado['fase']}); /readyz indica quando terminar")
+    try:
+        yield
+    finally:
+        await _finalizar()
+
+
+async def prontidao() -> dict:
+    """
+    Estado para /readyz: pronto só com a inicialização concluída e o banco respondendo agora
+    """
+    resposta = {k: estado[k] for k in ("fase", "erro", "tentativas", "aquecimento")}
+    banco = estado["pronto"]
+    if banco and BACKEND != "memoria":
+        try:
+            await asyncio.wait_for(database.verify_connection(), PRONTIDAO_TIMEOUT_S)
+        except Exception as e:
+            banco = False
+            resposta["erro"] = f"Neo4j indisponível: {e or type(e).__name__}"
+    resposta["pronto"] = banco
+    return resposta
@@ -0,0 +1,149 @@
+"""
+Agrupamento de leituras por id no estilo DataLoader.
+
+Leituras concorrentes de ids individuais que chegam dentro de uma janela curta
+viram uma única consulta em lote, e pedidos pelo mesmo id enquanto o lote está
+em andamento aguardam o mesmo resultado. Cada lote usa sua própria sessão, já
+que as sessões do Neo4j não podem ser compartilhadas entre requisições
+concorrentes. Requisições com bookmarks (X-Neo4j-Bookmarks) não entram nos
+lotes: leem na própria sessão, que espera pelas escritas do cliente.
+"""
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from .backends import crud
+from .database import BACKEND, sessao
+from .paginacao import pagina
+
+JANELA_S = float(os.getenv("COALESCEDOR_JANELA_MS", "2")) / 1000
+TAMANHO_MAXIMO_LOTE = int(os.getenv("COALESCEDOR_TAMANHO_LOTE", "500"))
+# no grafo em memória (e na réplica) a leitura já é local: agrupar só acrescentaria a janela
+ATIVO = BACKEND == "neo4j" and JANELA_S > 0
+
+
+class Coalescedor:
+    """
+    carregar_lote(chaves) -> {chave: valor}; chaves ausentes do resultado resolvem para None
+    """
+    def __init__(self, carregar_lote: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+                 janela: float = JANELA_S, tamanho_maximo: int = TAMANHO_MAXIMO_LOTE):
+        self.carregar_lote = carregar_lote
+        self.janela = janela
+        self.tamanho_maximo = tamanho_maximo
+        # aguardando o próximo lote ou em um lote em andamento
+        self._futuros: Dict[Hashable, asyncio.Future] = {}
+        self._fila: List[Hashable] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tarefas: Set[asyncio.Task] = set()
+        self.pedidos = 0
+        self.lotes = 0
+        self.chaves_carregadas = 0
+
+    async def carregar(self, chave: Hashable) -> Any:
+        self.pedidos += 1
+        futuro = self._futuros.get(chave)
+        if futuro is None:
+            loop = asyncio.get_running_loop()
+            futuro = loop.create_future()
+            self._futuros[chave] = futuro
+            self._fila.append(chave)
+            if len(self._fila) >= self.tamanho_maximo:
+                self._disparar()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.janela, self._disparar)
+        # shield: uma requisição cancelada não cancela o resultado dos demais
+        return await asyncio.shield(futuro)
+
+    def _disparar(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        chaves, self._fila = self._fila, []
+        if chaves:
+            tarefa = asyncio.get_running_loop().create_task(self._executar(chaves))
+            self._tarefas.add(tarefa)
+            tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _executar(self, chaves: List[Hashable]):
+        self.lotes += 1
+        self.chaves_carregadas += len(chaves)
+        try:
+            resultados = await self.carregar_lote(chaves)
+        except Exception as e:
+            for chave in chaves:
+                futuro = self._futuros.pop(chave)
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        for chave in chaves:
+            futuro = self._futuros.pop(chave)
+            if not futuro.done():
+                futuro.set_result(resultados.get(chave))
+
+    def stats(self) -> dict:
+        return {
+            "pedidos": self.pedidos,
+            "lotes": self.lotes,
+            "chaves_carregadas": self.chaves_carregadas,
+            "pedidos_por_lote": round(self.pedidos / self.lotes, 2) if self.lotes else 0.0,
+        }
+
+
+async def _carregar_pessoas(pessoa_ids: List[int]) -> Dict[int, dict]:
+    async with sessao(leitura=True) as db:
+        return {p["id"]: p for p in await crud.get_pessoas_por_ids(db=db, pessoa_ids=pessoa_ids)}
+
+
+async def _carregar_amigos(chaves: List[Tuple[int, int]]) -> Dict[Tuple[int, int], List[dict]]:
+    """
+    Chaves (pessoa_id, limit): o lote busca o maior limit pedido + 1 (para a página saber se há próxima)
+    e cada chave fica só com o seu
+    """
+    pessoa_ids = list(dict.fromkeys(pessoa_id for pessoa_id, _ in chaves))
+    limite = max(limit for _, limit in chaves) + 1
+    async with sessao(leitura=True) as db:
+        por_id = await crud.get_amigos_em_lote(db=db, pessoa_ids=pessoa_ids, limite=limite)
+    return {(pessoa_id, limit): por_id.get(pessoa_id, [])[:limit + 1] for pessoa_id, limit in chaves}
+
+
+pessoas = Coalescedor(_carregar_pessoas)
+amigos = Coalescedor(_carregar_amigos)
+
+
+# leituras que pularam os lotes por trazerem bookmarks
+com_bookmarks = 0
+
+
+def _direto(bookmarks: Optional[List[str]]) -> bool:
+    """
+    A sessão de um lote não tem os bookmarks de ninguém: quem os enviou lê na sessão da requisição
+    """
+    global com_bookmarks
+    if not ATIVO:
+        return True
+    if bookmarks:
+        com_bookmarks += 1
+        return True
+    return False
+
+
+async def get_pessoa(db, pessoa_id: int, bookmarks: Optional[List[str]] = None) -> Optional[dict]:
+    if _direto(bookmarks):
+        return await crud.get_pessoa(db=db, pessoa_id=pessoa_id)
+    return await pessoas.carregar(pessoa_id)
+
+
+async def get_amigos(db, pessoa_id: int, limit: int, bookmarks: Optional[List[str]] = None):
+    """
+    Primeira página de /pessoas/{id}/amigos, no mesmo formato de crud.get_amigos
+    """
+    if _direto(bookmarks):
+        return await crud.get_amigos(db=db, pessoa_id=pessoa_id, limit=limit)
+    lista = await amigos.carregar((pessoa_id, limit)) or []
+    return pagina(lista, limit, lambda p: {"id": p["id"]})
+
+
+def stats() -> dict:
+    return {"ativo": ATIVO, "janela_ms": JANELA_S * 1000, "com_bookmarks": com_bookmarks,
+            "pessoas": pessoas.stats(), "amigos": amigos.stats()}
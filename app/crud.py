@@ -1,262 +1,651 @@
-from typing import List, Optional
-from . import schemas
+from typing import AsyncIterator, Dict, List, Optional
+from . import eventos, filtros, schemas
+from .paginacao import LIMITE_PADRAO, decodificar_cursor, pagina
+from .metricas import nomear_query
+
+# Leituras e escritas rodam em transações gerenciadas (execute_read / execute_write): o driver refaz a
+# transação em falhas transitórias e, com NEO4J_URI neo4j://, envia as leituras para seguidores e réplicas.
+# Só as listagens em streaming (iter_*) usam db.run direto, numa sessão aberta em modo leitura.
+# Cada query recebe o nome da função que a executa, usado nas métricas de /metrics.
+
+async def _ler(db, rotulo: str, query: str, **parametros) -> list:
+    """
+    rotulo nomeia a query nas métricas (ex.: "crud.get_amigos")
+    """
+    async def _tx(tx):
+        result = await tx.run(query, parametros)
+        return [record async for record in result]
+    with nomear_query(rotulo):
+        return await db.execute_read(_tx)
+
+async def _ler_coluna(db, rotulo: str, query: str, **parametros) -> list:
+    """
+    Primeira coluna de cada registro, sem passar pelo Record (projeções de mapa já chegam como dict)
+    """
+    async def _tx(tx):
+        result = await tx.run(query, parametros)
+        return await result.value()
+    with nomear_query(rotulo):
+        return await db.execute_read(_tx)
+
+async def _ler_um(db, rotulo: str, query: str, **parametros):
+    records = await _ler(db, rotulo, query, **parametros)
+    return records[0] if records else None
+
+async def _escrever_um(db, rotulo: str, query: str, **parametros):
+    async def _tx(tx):
+        result = await tx.run(query, parametros)
+        return await result.single()
+    with nomear_query(rotulo):
+        return await db.execute_write(_tx)
+
+async def _executar(db, rotulo: str, query: str, **parametros):
+    """
+    db.run direto, para os iter_*: quem chamou consome o resultado em streaming
+    """
+    with nomear_query(rotulo):
+        return await db.run(query, parametros)
+
+# Projeção de mapa compartilhada: o Cypher devolve cada pessoa já no formato de schemas.Pessoa,
+# sem montar o dict campo a campo no Python
+def _projecao_pessoa(var: str, cidade_padrao: Optional[str] = None, **extras: str) -> str:
+    cidade = f"coalesce({var}.cidade, '{cidade_padrao}')" if cidade_padrao else f"{var}.cidade"
+    campos = "".join(f", {nome}: {expressao}" for nome, expressao in extras.items())
+    return f"{var} {{id: {var}.pessoa_id, .nome, .idade, .interesses, cidade: {cidade}{campos}}}"
+
+PESSOA_P = _projecao_pessoa("p")
+PESSOA_AMIGO = _projecao_pessoa("amigo")
+PESSOA_INTERESSE = _projecao_pessoa("p", cidade_padrao="Não informada")
+# pessoa com os resultados gravados por app/analises.py
+PESSOA_ANALISE = _projecao_pessoa("p", pagerank="p.pagerank", comunidade="p.comunidade", grau="p.grau",
+                                  centralidade_grau="p.centralidade_grau")
+
 
 async def criar_pessoa(db, pessoa: schemas.PessoaCreate):
-    query = """
-    CREATE (p:Pessoa {nome: $nome, idade: $idade, interesses: $interesses})
-    RETURN p, id(p) as id
+    query = f"""
+    MERGE (seq:Sequencia {{nome: 'Pessoa'}})
+    ON CREATE SET seq.valor = 0
+    SET seq.valor = seq.valor + 1
+    WITH seq.valor AS pessoa_id
+    CREATE (p:Pessoa {{pessoa_id: pessoa_id, nome: $nome, idade: $idade,
+                       interesses: $interesses, cidade: $cidade}})
+    FOREACH (nome IN $interesses |
+        MERGE (i:Interesse {{nome: nome}})
+        MERGE (p)-[:GOSTA_DE]->(i))
+    RETURN {PESSOA_P} as pessoa
     """
     
-    result = await db.run(query, nome=pessoa.nome, idade=pessoa.idade, interesses=pessoa.interesses)
-    record = await result.single()
+    record = await _escrever_um(db, "crud.criar_pessoa", query, nome=pessoa.nome, idade=pessoa.idade,
+                                interesses=pessoa.interesses, cidade=pessoa.cidade)
     
-    return {
-        "id": record["id"],
-        "nome": record["p"]["nome"],
-        "idade": record["p"]["idade"],
-        "interesses": record["p"]["interesses"]
-    }
+    criada = record["pessoa"]
+    eventos.pessoa_salva(criada)
+    return criada
 
-async def get_pessoas(db) -> List[schemas.Pessoa]:
-    query = "MATCH (p:Pessoa) RETURN p, id(p) as id"
+async def get_pessoas(db, after: Optional[str] = None, limit: int = LIMITE_PADRAO):
+    """
+    Lista pessoas por pessoa_id usando o índice único (keyset), devolvendo (página, próximo cursor)
+    """
+    cursor = decodificar_cursor(after, id=int)
+    if cursor is None:
+        query = f"""
+        MATCH (p:Pessoa) WHERE p.pessoa_id IS NOT NULL
+        RETURN {PESSOA_P}
+        ORDER BY p.pessoa_id
+        LIMIT $limit
+        """
+    else:
+        query = f"""
+        MATCH (p:Pessoa) WHERE p.pessoa_id > $after_id
+        RETURN {PESSOA_P}
+        ORDER BY p.pessoa_id
+        LIMIT $limit
+        """
+    
+    pessoas = await _ler_coluna(db, "crud.get_pessoas", query, limit=limit + 1,
+                                after_id=cursor and cursor.get("id"))
+    
+    return pagina(pessoas, limit, lambda p: {"id": p["id"]})
+
+async def iter_pessoas(db) -> AsyncIterator[dict]:
+    """
+    Percorre todas as pessoas à medida que os registros chegam do banco
+    """
+    # o filtro IS NOT NULL deixa o índice único de pessoa_id entregar a ordem, sem sort
+    query = f"MATCH (p:Pessoa) WHERE p.pessoa_id IS NOT NULL RETURN {PESSOA_P} ORDER BY p.pessoa_id"
     
-    result = await db.run(query)
-    records = await result.values()
+    result = await _executar(db, "crud.iter_pessoas", query)
+    async for record in result:
+        yield record[0]
+
+async def get_pessoas_para_snapshot(db, after_id: int, limite: int) -> list:
+    """
+    Lote de pessoas por pessoa_id crescente (keyset), cada uma com os pessoa_id que ela CONHECE
+    """
+    query = f"""
+    MATCH (p:Pessoa)
+    WHERE p.pessoa_id > $after_id
+    WITH p ORDER BY p.pessoa_id LIMIT $limite
+    RETURN {_projecao_pessoa("p", destinos="[(p)-[:CONHECE]->(b:Pessoa) WHERE b.pessoa_id IS NOT NULL | b.pessoa_id]")}
+    """
+
+    return await _ler_coluna(db, "crud.get_pessoas_para_snapshot", query, after_id=after_id, limite=limite)
+
+async def buscar_pessoas(db, termos: List[str], limite: int = 10) -> List[dict]:
+    """
+    Typeahead por nome no índice full-text pessoa_nome_busca (termos já normalizados por app/texto.py).
+    Todos os termos são obrigatórios; o termo exato pesa mais que o prefixo ("ana" antes de "anabela").
+    """
+    query = f"""
+    CALL db.index.fulltext.queryNodes('pessoa_nome_busca', $consulta, {{limit: $limite}})
+    YIELD node AS p, score
+    RETURN {PESSOA_P}
+    ORDER BY score DESC, size(p.nome), p.nome
+    """
+    # termos de app/texto.py só têm letras, dígitos e "_": nada a escapar na sintaxe do Lucene
+    consulta = " ".join(f"+({termo}^2 OR {termo}*)" for termo in termos)
+
+    return await _ler_coluna(db, "crud.buscar_pessoas", query, consulta=consulta, limite=limite)
+
+async def get_pessoa(db, pessoa_id: int) -> Optional[schemas.Pessoa]:
+    query = f"MATCH (p:Pessoa {{pessoa_id: $pessoa_id}}) RETURN {PESSOA_P}"
     
-    pessoas = []
-    for record in records:
-        pessoas.append({
-            "id": record[1],
-            "nome": record[0]["nome"],
-            "idade": record[0]["idade"],
-            "interesses": record[0]["interesses"]
-        })
+    pessoas = await _ler_coluna(db, "crud.get_pessoa", query, pessoa_id=pessoa_id)
     
-    return pessoas
+    return pessoas[0] if pessoas else None
 
-async def get_pessoa(db, pessoa_id: int) -> Optional[schemas.Pessoa]:
-    query = "MATCH (p:Pessoa) WHERE id(p) = $pessoa_id RETURN p, id(p) as id"
+async def get_pessoas_por_ids(db, pessoa_ids: List[int]) -> List[dict]:
+    """
+    Busca várias pessoas em uma única consulta, na ordem dos ids (ids inexistentes são omitidos)
+    """
+    query = f"""
+    UNWIND $pessoa_ids AS pessoa_id
+    MATCH (p:Pessoa {{pessoa_id: pessoa_id}})
+    RETURN {PESSOA_P}
+    """
+    
+    return await _ler_coluna(db, "crud.get_pessoas_por_ids", query, pessoa_ids=list(pessoa_ids))
+
+async def get_conexoes_ids(db, pessoa_id: int) -> set:
+    """
+    pessoa_id de todos que a pessoa conhece ou que a conhecem
+    """
+    query = """
+    MATCH (p:Pessoa {pessoa_id: $pessoa_id})-[:CONHECE]-(outra:Pessoa)
+    RETURN collect(DISTINCT outra.pessoa_id) as ids
+    """
     
-    result = await db.run(query, pessoa_id=pessoa_id)
-    record = await result.single()
+    record = await _ler_um(db, "crud.get_conexoes_ids", query, pessoa_id=pessoa_id)
     
-    if record:
-        return {
-            "id": record["id"],
-            "nome": record["p"]["nome"],
-            "idade": record["p"]["idade"],
-            "interesses": record["p"]["interesses"]
-        }
-    return None
+    return set(record["ids"]) if record else set()
 
 async def criar_relacionamento(db, pessoa_id1: int, pessoa_id2: int) -> bool:
+    """
+    MERGE: repetir a chamada não duplica a aresta. True se as duas pessoas existem.
+    """
     query = """
-    MATCH (p1:Pessoa), (p2:Pessoa)
-    WHERE id(p1) = $pessoa_id1 AND id(p2) = $pessoa_id2
-    CREATE (p1)-[:CONHECE]->(p2)
-    RETURN p1, p2
+    MATCH (p1:Pessoa {pessoa_id: $pessoa_id1})
+    MATCH (p2:Pessoa {pessoa_id: $pessoa_id2})
+    OPTIONAL MATCH (p1)-[existente:CONHECE]->(p2)
+    WITH p1, p2, count(existente) = 0 AS nova
+    MERGE (p1)-[:CONHECE]->(p2)
+    RETURN nova
     """
     
-    result = await db.run(query, pessoa_id1=pessoa_id1, pessoa_id2=pessoa_id2)
-    record = await result.single()
+    record = await _escrever_um(db, "crud.criar_relacionamento", query,
+                                pessoa_id1=pessoa_id1, pessoa_id2=pessoa_id2)
     
-    return record is not None
+    if record is None:
+        return False
+    if record["nova"]:
+        eventos.relacionamento_criado(pessoa_id1, pessoa_id2)
+    return True
+
+async def criar_pessoas_em_lote(db, pessoas: List[dict]) -> int:
+    """
+    Grava um lote de pessoas com UNWIND + MERGE por pessoa_id em uma única transação
+    """
+    query = """
+    UNWIND $rows AS row
+    MERGE (p:Pessoa {pessoa_id: row.id})
+    SET p.nome = row.nome, p.idade = row.idade,
+        p.interesses = row.interesses, p.cidade = row.cidade
+    WITH p, row
+    CALL {
+        WITH p, row
+        MATCH (p)-[g:GOSTA_DE]->(antigo:Interesse)
+        WHERE NOT antigo.nome IN row.interesses
+        DELETE g
+    }
+    FOREACH (nome IN row.interesses |
+        MERGE (i:Interesse {nome: nome})
+        MERGE (p)-[:GOSTA_DE]->(i))
+    WITH count(p) AS escritas, max(row.id) AS maior_id
+    MERGE (seq:Sequencia {nome: 'Pessoa'})
+    ON CREATE SET seq.valor = 0
+    SET seq.valor = CASE WHEN seq.valor < maior_id THEN maior_id ELSE seq.valor END
+    RETURN escritas
+    """
 
-async def get_amigos(db, pessoa_id: int) -> List[schemas.Pessoa]:
+    async def _tx(tx):
+        result = await tx.run(query, rows=pessoas)
+        record = await result.single()
+        return record["escritas"] if record else 0
+
+    with nomear_query("crud.criar_pessoas_em_lote"):
+        escritas = await db.execute_write(_tx)
+    for pessoa in pessoas:
+        eventos.pessoa_salva(pessoa)
+    return escritas
+
+async def criar_relacionamentos_em_lote(db, relacionamentos: List[dict]) -> int:
+    """
+    Grava um lote de relacionamentos CONHECE com MERGE (reexecutar não duplica arestas).
+    Linhas cujas pessoas não existem são ignoradas.
+    """
     query = """
-    MATCH (p:Pessoa)-[:CONHECE]->(amigo:Pessoa)
-    WHERE id(p) = $pessoa_id
-    RETURN amigo, id(amigo) as id
+    UNWIND $rows AS row
+    MATCH (p1:Pessoa {pessoa_id: row.pessoa_id1})
+    MATCH (p2:Pessoa {pessoa_id: row.pessoa_id2})
+    // só as arestas que ainda não existiam contam como escritas
+    OPTIONAL MATCH (p1)-[existente:CONHECE]->(p2)
+    WITH p1, p2, row, existente IS NULL AS nova
+    MERGE (p1)-[:CONHECE]->(p2)
+    WITH row WHERE nova
+    RETURN collect(DISTINCT [row.pessoa_id1, row.pessoa_id2]) AS escritos
+    """
+
+    async def _tx(tx):
+        result = await tx.run(query, rows=relacionamentos)
+        record = await result.single()
+        return record["escritos"] if record else []
+
+    with nomear_query("crud.criar_relacionamentos_em_lote"):
+        escritos = await db.execute_write(_tx)
+    for pessoa_id1, pessoa_id2 in escritos:
+        eventos.relacionamento_criado(pessoa_id1, pessoa_id2)
+    return len(escritos)
+
+async def get_amigos(db, pessoa_id: int, after: Optional[str] = None, limit: int = LIMITE_PADRAO):
+    cursor = decodificar_cursor(after, id=int)
+    query = f"""
+    MATCH (p:Pessoa {{pessoa_id: $pessoa_id}})-[:CONHECE]->(amigo:Pessoa)
+    WHERE $after_id IS NULL OR amigo.pessoa_id > $after_id
+    RETURN {PESSOA_AMIGO}
+    ORDER BY amigo.pessoa_id
+    LIMIT $limit
     """
     
-    result = await db.run(query, pessoa_id=pessoa_id)
-    records = await result.values()
+    amigos = await _ler_coluna(db, "crud.get_amigos", query, pessoa_id=pessoa_id, limit=limit + 1,
+                               after_id=cursor and cursor.get("id"))
     
-    amigos = []
-    for record in records:
-        amigos.append({
-            "id": record[1],
-            "nome": record[0]["nome"],
-            "idade": record[0]["idade"],
-            "interesses": record[0]["interesses"]
-        })
+    return pagina(amigos, limit, lambda p: {"id": p["id"]})
+
+async def get_amigos_em_lote(db, pessoa_ids: List[int], limite: int = LIMITE_PADRAO) -> Dict[int, List[dict]]:
+    """
+    Primeiros `limite` amigos (por pessoa_id) de várias pessoas em uma única consulta
+    """
+    query = f"""
+    UNWIND $pessoa_ids AS pessoa_id
+    MATCH (p:Pessoa {{pessoa_id: pessoa_id}})
+    CALL {{
+        WITH p
+        MATCH (p)-[:CONHECE]->(amigo:Pessoa)
+        RETURN amigo ORDER BY amigo.pessoa_id LIMIT $limite
+    }}
+    RETURN pessoa_id, collect({PESSOA_AMIGO}) as amigos
+    """
     
+    amigos = {pessoa_id: [] for pessoa_id in pessoa_ids}
+    for record in await _ler(db, "crud.get_amigos_em_lote", query, pessoa_ids=list(pessoa_ids), limite=limite):
+        lista = record["amigos"]
+        lista.sort(key=lambda p: p["id"])
+        amigos[record["pessoa_id"]] = lista
     return amigos
 
-async def recomendar_amigos(db, pessoa_id: int) -> List[schemas.Pessoa]:
-    query = """
-    MATCH (p:Pessoa)-[:CONHECE]->(amigo:Pessoa)-[:CONHECE]->(recomendacao:Pessoa)
-    WHERE id(p) = $pessoa_id AND NOT (p)-[:CONHECE]->(recomendacao) AND p <> recomendacao
-    RETURN DISTINCT recomendacao, id(recomendacao) as id
-    LIMIT 5
+async def iter_amigos(db, pessoa_id: int) -> AsyncIterator[dict]:
+    query = f"""
+    MATCH (p:Pessoa {{pessoa_id: $pessoa_id}})-[:CONHECE]->(amigo:Pessoa)
+    RETURN {PESSOA_AMIGO}
+    ORDER BY amigo.pessoa_id
     """
     
-    result = await db.run(query, pessoa_id=pessoa_id)
-    records = await result.values()
-    
-    recomendacoes = []
-    for record in records:
-        recomendacoes.append({
-            "id": record[1],
-            "nome": record[0]["nome"],
-            "idade": record[0]["idade"],
-            "interesses": record[0]["interesses"]
-        })
-    
-    return recomendacoes
+    result = await _executar(db, "crud.iter_amigos", query, pessoa_id=pessoa_id)
+    async for record in result:
+        yield record[0]
 
-async def get_rede_social(db, pessoa_id: int, profundidade: int = 2):
+async def get_recomendacoes_pontuadas(db, pessoa_id: int, limite: int = 50,
+                                      peso_interesses: float = 0.0, peso_cidade: float = 0.0):
     """
-    Mostra toda a rede social de uma pessoa até uma profundidade específica
+    Amigos de amigos ordenados por score = amigos em comum + pesos de interesses e cidade em comum.
+    Retorna (ids dos amigos diretos, candidatos pontuados).
     """
-    query = """
-    MATCH (p:Pessoa)-[:CONHECE*1..$profundidade]-(conexao:Pessoa)
-    WHERE id(p) = $pessoa_id AND p <> conexao
-    RETURN DISTINCT conexao, id(conexao) as id
-    ORDER BY conexao.nome
+    query = f"""
+    MATCH (p:Pessoa {{pessoa_id: $pessoa_id}})
+    OPTIONAL MATCH (p)-[:CONHECE]->(amigo:Pessoa)
+    WITH p, collect(DISTINCT amigo) as amigos
+    CALL {{
+        WITH p, amigos
+        UNWIND amigos as amigo
+        MATCH (amigo)-[:CONHECE]->(rec:Pessoa)
+        WHERE rec <> p AND NOT rec IN amigos
+        WITH p, rec, count(DISTINCT amigo) as amigos_em_comum
+        WITH rec, amigos_em_comum,
+             size([i IN coalesce(rec.interesses, []) WHERE i IN p.interesses]) as interesses_em_comum,
+             CASE WHEN rec.cidade IS NOT NULL AND rec.cidade = p.cidade THEN 1 ELSE 0 END as mesma_cidade
+        WITH rec, amigos_em_comum, interesses_em_comum,
+             amigos_em_comum + $peso_interesses * interesses_em_comum + $peso_cidade * mesma_cidade as score
+        ORDER BY score DESC, amigos_em_comum DESC, rec.pessoa_id
+        LIMIT $limite
+        RETURN collect({_projecao_pessoa("rec", amigos_em_comum="amigos_em_comum",
+                                          interesses_em_comum="interesses_em_comum",
+                                          score="score")}) as candidatos
+    }}
+    RETURN [a IN amigos | a.pessoa_id] as amigos_ids, candidatos
     """
     
-    result = await db.run(query, pessoa_id=pessoa_id, profundidade=profundidade)
-    records = await result.values()
+    record = await _ler_um(db, "crud.get_recomendacoes_pontuadas", query, pessoa_id=pessoa_id, limite=limite,
+                           peso_interesses=float(peso_interesses), peso_cidade=float(peso_cidade))
     
-    conexoes = []
-    for record in records:
-        conexoes.append({
-            "id": record[1],
-            "nome": record[0]["nome"],
-            "idade": record[0]["idade"],
-            "interesses": record[0]["interesses"],
-            "cidade": record[0].get("cidade", "Não informada")
-        })
-    
-    return conexoes
+    if record is None:
+        return [], []
+    return record["amigos_ids"], record["candidatos"]
 
-async def get_pessoas_por_interesse(db, interesse: str):
+async def get_pessoas_por_interesse(db, interesse: str, after: Optional[str] = None,
+                                    limit: int = LIMITE_PADRAO):
     """
-    Encontra pessoas por interesse em comum
+    Encontra pessoas por interesse em comum, paginando por (nome, pessoa_id)
     """
-    query = """
-    MATCH (p:Pessoa)
-    WHERE $interesse IN p.interesses
-    RETURN p, id(p) as id
-    ORDER BY p.nome
+    cursor = decodificar_cursor(after, nome=str, id=int) or {}
+    query = f"""
+    MATCH (:Interesse {{nome: $interesse}})<-[:GOSTA_DE]-(p:Pessoa)
+    WHERE ($after_nome IS NULL
+           OR p.nome > $after_nome
+           OR (p.nome = $after_nome AND p.pessoa_id > $after_id))
+    RETURN {PESSOA_INTERESSE}
+    ORDER BY p.nome, p.pessoa_id
+    LIMIT $limit
     """
     
-    result = await db.run(query, interesse=interesse)
-    records = await result.values()
+    pessoas = await _ler_coluna(db, "crud.get_pessoas_por_interesse", query, interesse=interesse,
+                                limit=limit + 1, after_nome=cursor.get("nome"), after_id=cursor.get("id"))
     
-    pessoas = []
-    for record in records:
-        pessoas.append({
-            "id": record[1],
-            "nome": record[0]["nome"],
-            "idade": record[0]["idade"],
-            "interesses": record[0]["interesses"],
-            "cidade": record[0].get("cidade", "Não informada")
-        })
+    return pagina(pessoas, limit, lambda p: {"nome": p["nome"], "id": p["id"]})
+
+async def iter_pessoas_por_interesse(db, interesse: str) -> AsyncIterator[dict]:
+    query = f"""
+    MATCH (:Interesse {{nome: $interesse}})<-[:GOSTA_DE]-(p:Pessoa)
+    RETURN {PESSOA_INTERESSE}
+    ORDER BY p.nome, p.pessoa_id
+    """
     
-    return pessoas
+    result = await _executar(db, "crud.iter_pessoas_por_interesse", query, interesse=interesse)
+    async for record in result:
+        yield record[0]
 
-async def get_caminho_entre_pessoas(db, pessoa_id1: int, pessoa_id2: int):
+async def get_vizinhos_em_lote(db, pessoa_ids: List[int]) -> Dict[int, List[int]]:
     """
-    Encontra o caminho mais curto entre duas pessoas
+    Vizinhos (CONHECE em qualquer direção) de várias pessoas numa única consulta
     """
     query = """
-    MATCH path = shortestPath((p1:Pessoa)-[:CONHECE*]-(p2:Pessoa))
-    WHERE id(p1) = $pessoa_id1 AND id(p2) = $pessoa_id2
-    RETURN [node IN nodes(path) | node.nome] as caminho,
-           length(path) as graus_separacao
+    UNWIND $pessoa_ids AS pessoa_id
+    MATCH (p:Pessoa {pessoa_id: pessoa_id})-[:CONHECE]-(v:Pessoa)
+    RETURN pessoa_id, collect(DISTINCT v.pessoa_id) as vizinhos
     """
     
-    result = await db.run(query, pessoa_id1=pessoa_id1, pessoa_id2=pessoa_id2)
-    record = await result.single()
-    
-    if record and record["caminho"]:
-        return {
-            "caminho": record["caminho"],
-            "graus_separacao": record["graus_separacao"]
-        }
-    return None
+    records = await _ler(db, "crud.get_vizinhos_em_lote", query, pessoa_ids=list(pessoa_ids))
+    return {record["pessoa_id"]: record["vizinhos"] for record in records}
 
 async def get_estatisticas_rede(db):
     """
-    Estatísticas gerais da rede social
+    Estatísticas gerais da rede social, calculadas direto no banco
     """
     query = """
-    // Total de pessoas
-    MATCH (p:Pessoa)
-    WITH count(p) as total_pessoas
-    
-    // Total de relacionamentos
-    MATCH ()-[r:CONHECE]->()
-    WITH total_pessoas, count(r) as total_relacionamentos
-    
-    // Pessoas por cidade
-    MATCH (p:Pessoa)
-    WHERE p.cidade IS NOT NULL
-    WITH total_pessoas, total_relacionamentos,
-         p.cidade as cidade, count(p) as count
-    ORDER BY count DESC
-    WITH total_pessoas, total_relacionamentos,
-         collect({cidade: cidade, quantidade: count})[0..5] as top_cidades
+    // Contagens servidas pelo count store, sem varrer o grafo
+    CALL { MATCH (p:Pessoa) RETURN count(p) as total_pessoas }
+    CALL { MATCH ()-[r:CONHECE]->() RETURN count(r) as total_relacionamentos }
+    
+    // Pessoas por cidade (índice pessoa_cidade)
+    CALL {
+        MATCH (p:Pessoa)
+        WHERE p.cidade IS NOT NULL
+        WITH p.cidade as cidade, count(p) as quantidade
+        ORDER BY quantidade DESC, cidade
+        LIMIT 5
+        RETURN collect({cidade: cidade, quantidade: quantidade}) as top_cidades
+    }
     
-    // Interesses mais comuns
-    MATCH (p:Pessoa)
-    UNWIND p.interesses AS interesse
-    WITH total_pessoas, total_relacionamentos, top_cidades,
-         interesse, count(*) as count
-    ORDER BY count DESC
-    WITH total_pessoas, total_relacionamentos, top_cidades,
-         collect({interesse: interesse, quantidade: count})[0..5] as top_interesses
+    // Interesses mais comuns: grau de entrada de cada nó :Interesse
+    CALL {
+        MATCH (i:Interesse)
+        WITH i.nome as interesse, COUNT { (i)<-[:GOSTA_DE]-(:Pessoa) } as quantidade
+        WHERE quantidade > 0
+        ORDER BY quantidade DESC, interesse
+        LIMIT 5
+        RETURN collect({interesse: interesse, quantidade: quantidade}) as top_interesses
+    }
     
     RETURN total_pessoas, total_relacionamentos, top_cidades, top_interesses
     """
     
-    result = await db.run(query)
-    record = await result.single()
+    record = await _ler_um(db, "crud.get_estatisticas_rede", query)
     
+    total_pessoas = record["total_pessoas"]
     return {
-        "total_pessoas": record["total_pessoas"],
+        "total_pessoas": total_pessoas,
         "total_relacionamentos": record["total_relacionamentos"],
-        "densidade_rede": round(record["total_relacionamentos"] / record["total_pessoas"], 2),
+        "densidade_rede": round(record["total_relacionamentos"] / total_pessoas, 2) if total_pessoas else 0.0,
         "top_cidades": record["top_cidades"],
         "top_interesses": record["top_interesses"]
     }
 
-async def get_pessoas_similares(db, pessoa_id: int):
+async def get_contagens_rede(db) -> dict:
     """
-    Encontra pessoas com interesses similares (não necessariamente conectadas)
+    Totais e contagens completas por cidade e por interesse, só com agregações (para app/estatisticas.py)
+    """
+    query = """
+    CALL { MATCH (p:Pessoa) RETURN count(p) as total_pessoas }
+    CALL { MATCH ()-[r:CONHECE]->() RETURN count(r) as total_relacionamentos }
+    // todo pessoa_id já atribuído é <= o valor da sequência
+    CALL { OPTIONAL MATCH (seq:Sequencia {nome: 'Pessoa'}) RETURN coalesce(seq.valor, 0) as maior_id }
+    CALL {
+        MATCH (p:Pessoa)
+        WHERE p.cidade IS NOT NULL
+        WITH p.cidade as cidade, count(p) as quantidade
+        RETURN collect([cidade, quantidade]) as cidades
+    }
+    CALL {
+        MATCH (i:Interesse)
+        WITH i.nome as interesse, COUNT { (i)<-[:GOSTA_DE]-(:Pessoa) } as quantidade
+        WHERE quantidade > 0
+        RETURN collect([interesse, quantidade]) as interesses
+    }
+    RETURN total_pessoas, total_relacionamentos, maior_id, cidades, interesses
+    """
+
+    record = await _ler_um(db, "crud.get_contagens_rede", query)
+    return {
+        "total_pessoas": record["total_pessoas"],
+        "total_relacionamentos": record["total_relacionamentos"],
+        "maior_id": record["maior_id"],
+        "cidades": dict(record["cidades"]),
+        "interesses": dict(record["interesses"]),
+    }
+
+async def get_adjacencia(db, after_id: int, limite: int) -> list:
+    """
+    Lote de {id, destinos} por pessoa_id crescente (keyset) para as análises do grafo
     """
     query = """
     MATCH (p:Pessoa)
-    WHERE id(p) = $pessoa_id
-    
-    // Encontrar pessoas com pelo menos 2 interesses em comum
-    MATCH (similar:Pessoa)
-    WHERE id(similar) <> $pessoa_id 
-      AND size([interest IN p.interesses WHERE interest IN similar.interesses]) >= 2
-      AND NOT (p)-[:CONHECE]-(similar)
-    
-    RETURN similar, id(similar) as id,
-           [interest IN p.interesses WHERE interest IN similar.interesses] as interesses_comuns,
-           size([interest IN p.interesses WHERE interest IN similar.interesses]) as qtd_interesses_comuns
-    ORDER BY qtd_interesses_comuns DESC
-    LIMIT 5
+    WHERE p.pessoa_id > $after_id
+    WITH p ORDER BY p.pessoa_id LIMIT $limite
+    RETURN {id: p.pessoa_id, destinos: [(p)-[:CONHECE]->(b:Pessoa) WHERE b.pessoa_id IS NOT NULL | b.pessoa_id]}
     """
-    
-    result = await db.run(query, pessoa_id=pessoa_id)
-    records = await result.values()
-    
-    similares = []
-    for record in records:
-        similares.append({
-            "id": record[1],
-            "nome": record[0]["nome"],
-            "idade": record[0]["idade"],
-            "interesses": record[0]["interesses"],
-            "cidade": record[0].get("cidade", "Não informada"),
-            "interesses_comuns": record[2],
-            "score_similaridade": record[3]
-        })
-    
-    return similares
\ No newline at end of file
+
+    return await _ler_coluna(db, "crud.get_adjacencia", query, after_id=after_id, limite=limite)
+
+async def gravar_analises_em_lote(db, linhas: List[dict]) -> int:
+    """
+    Grava pagerank, comunidade, grau e centralidade_grau de um lote de pessoas em uma única transação
+    """
+    query = """
+    UNWIND $rows AS row
+    MATCH (p:Pessoa {pessoa_id: row.id})
+    SET p.pagerank = row.pagerank, p.comunidade = row.comunidade,
+        p.grau = row.grau, p.centralidade_grau = row.centralidade_grau
+    RETURN count(p) AS escritas
+    """
+
+    record = await _escrever_um(db, "crud.gravar_analises_em_lote", query, rows=linhas)
+    return record["escritas"] if record else 0
+
+# propriedades do nó (:Analise) que não fazem parte do resumo da execução
+CAMPOS_TRAVA_ANALISE = ("nome", "em_execucao", "em_execucao_desde", "erro")
+
+async def iniciar_execucao_analise(db, validade_s: float) -> bool:
+    """
+    Toma a trava da análise no nó (:Analise); False se outra execução a tem há menos de validade_s
+    """
+    query = """
+    MERGE (a:Analise {nome: 'grafo'})
+    // a primeira escrita pega o lock do nó: quem chega junto espera e lê o em_execucao já gravado
+    SET a.em_execucao = coalesce(a.em_execucao, false)
+    WITH a
+    WHERE NOT a.em_execucao OR a.em_execucao_desde < timestamp() - $validade_ms
+    SET a.em_execucao = true, a.em_execucao_desde = timestamp(), a.erro = null
+    RETURN true AS travada
+    """
+    record = await _escrever_um(db, "crud.iniciar_execucao_analise", query, validade_ms=int(validade_s * 1000))
+    return record is not None
+
+async def finalizar_execucao_analise(db, resumo: Optional[dict] = None, erro: Optional[str] = None):
+    """
+    Solta a trava; com resumo, ele substitui o da execução anterior, senão só o erro é gravado
+    """
+    if resumo is None:
+        await _escrever_um(db, "crud.finalizar_execucao_analise",
+                           "MATCH (a:Analise {nome: 'grafo'}) SET a.em_execucao = false, a.erro = $erro", erro=erro)
+    else:
+        await _escrever_um(db, "crud.finalizar_execucao_analise",
+                           "MERGE (a:Analise {nome: 'grafo'}) SET a = $resumo, a.nome = 'grafo', a.em_execucao = false",
+                           resumo=resumo)
+
+async def get_estado_analise(db, validade_s: float) -> dict:
+    query = """
+    MATCH (a:Analise {nome: 'grafo'})
+    RETURN coalesce(a.em_execucao, false) AND a.em_execucao_desde >= timestamp() - $validade_ms AS em_execucao,
+           a.erro AS erro
+    """
+    record = await _ler_um(db, "crud.get_estado_analise", query, validade_ms=int(validade_s * 1000))
+    if record is None:
+        return {"em_execucao": False, "erro": None}
+    return {"em_execucao": bool(record["em_execucao"]), "erro": record["erro"]}
+
+async def get_execucao_analise(db) -> Optional[dict]:
+    record = await _ler_um(db, "crud.get_execucao_analise",
+                           "MATCH (a:Analise {nome: 'grafo'}) RETURN properties(a) AS resumo")
+    if record is None:
+        return None
+    resumo = dict(record["resumo"])
+    for campo in CAMPOS_TRAVA_ANALISE:
+        resumo.pop(campo, None)
+    # só a trava, antes da primeira execução terminar
+    return resumo or None
+
+async def get_influenciadores(db, limite: int = 10) -> List[dict]:
+    query = f"""
+    MATCH (p:Pessoa) WHERE p.pagerank IS NOT NULL
+    RETURN {PESSOA_ANALISE}
+    ORDER BY p.pagerank DESC
+    LIMIT $limite
+    """
+
+    return await _ler_coluna(db, "crud.get_influenciadores", query, limite=limite)
+
+async def get_analise_pessoa(db, pessoa_id: int) -> Optional[dict]:
+    query = f"MATCH (p:Pessoa {{pessoa_id: $pessoa_id}}) RETURN {PESSOA_ANALISE}"
+
+    pessoas = await _ler_coluna(db, "crud.get_analise_pessoa", query, pessoa_id=pessoa_id)
+    return pessoas[0] if pessoas else None
+
+async def get_membros_comunidade(db, comunidade: int, limite: int = 50) -> List[dict]:
+    """
+    Membros de uma comunidade, do maior para o menor PageRank
+    """
+    query = f"""
+    MATCH (p:Pessoa {{comunidade: $comunidade}})
+    RETURN {PESSOA_ANALISE}
+    ORDER BY p.pagerank DESC
+    LIMIT $limite
+    """
+
+    return await _ler_coluna(db, "crud.get_membros_comunidade", query, comunidade=comunidade, limite=limite)
+
+# grau = pessoas que ela CONHECE, como em /pessoas/{id}/amigos
+GRAU = "COUNT { (p)-[:CONHECE]->(:Pessoa) }"
+PESSOA_FILTRO = _projecao_pessoa("p", grau="grau")
+
+def _compilar_filtro(forma: tuple) -> str:
+    """
+    Cypher de uma forma de filtro. Com interesses a busca parte do índice de Interesse.nome; sem eles,
+    de Pessoa.cidade/Pessoa.idade. O grau só é contado antes do LIMIT quando filtra ou ordena.
+    """
+    tem_cidade, tem_interesses, modo, tem_idade_min, tem_idade_max, tem_grau_min, ordenar = forma
+    condicoes = ["p.pessoa_id IS NOT NULL"]
+    if tem_cidade:
+        condicoes.append("p.cidade = $cidade")
+    if tem_idade_min:
+        condicoes.append("p.idade >= $idade_min")
+    if tem_idade_max:
+        condicoes.append("p.idade <= $idade_max")
+
+    if tem_interesses:
+        partes = ["MATCH (p:Pessoa)-[:GOSTA_DE]->(i:Interesse)",
+                  "WHERE " + " AND ".join(["i.nome IN $interesses"] + condicoes)]
+        if modo == "all":
+            partes.append("WITH p, count(DISTINCT i) AS casados WHERE casados = size($interesses)")
+        else:
+            partes.append("WITH DISTINCT p")
+    else:
+        partes = ["MATCH (p:Pessoa)", "WHERE " + " AND ".join(condicoes)]
+
+    campo = ordenar.lstrip("-")
+    grau_antes = tem_grau_min or campo == "grau"
+    if grau_antes:
+        partes.append(f"WITH p, {GRAU} AS grau")
+        if tem_grau_min:
+            partes.append("WHERE grau >= $grau_min")
+    ordem = filtros.ORDENACOES[campo] + (" DESC" if ordenar.startswith("-") else "")
+    # desempate por pessoa_id: a mesma consulta devolve sempre a mesma ordem
+    if campo != "id":
+        ordem += ", p.pessoa_id"
+    partes.append(f"WITH p{', grau' if grau_antes else ''} ORDER BY {ordem} LIMIT $limite")
+    if not grau_antes:
+        partes.append(f"WITH p, {GRAU} AS grau")
+    partes.append(f"RETURN {PESSOA_FILTRO}")
+    return "\n".join(partes)
+
+def _query_filtro(filtro: filtros.Filtro) -> str:
+    forma = filtro.forma()
+    query = filtros.formas.get(forma)
+    if query is None:
+        query = _compilar_filtro(forma)
+        filtros.formas.set(forma, query)
+    return query
+
+async def filtrar_pessoas(db, filtro: filtros.Filtro, limite: int = LIMITE_PADRAO) -> List[dict]:
+    """
+    Pessoas que atendem ao filtro, cada uma com o grau, já ordenadas e limitadas no banco
+    """
+    return await _ler_coluna(db, "crud.filtrar_pessoas", _query_filtro(filtro), limite=limite,
+                             **filtro.parametros())
+
+async def iter_filtrar_pessoas(db, filtro: filtros.Filtro, limite: int = filtros.MAX_LINHAS) -> AsyncIterator[dict]:
+    """
+    O mesmo filtro em streaming, até limite pessoas
+    """
+    result = await _executar(db, "crud.iter_filtrar_pessoas", _query_filtro(filtro), limite=limite,
+                             **filtro.parametros())
+    async for record in result:
+        yield record[0]
@@ -0,0 +1,289 @@
+"""
+Implementação das operações de crud.py sobre o GrafoMemoria.
+
+As funções têm as mesmas assinaturas de crud.py; aqui `db` é o GrafoMemoria.
+"""
+import time
+from collections import Counter
+from heapq import nlargest, nsmallest
+from typing import AsyncIterator, Dict, List, Optional
+
+from . import eventos, filtros, schemas
+from .grafo_memoria import GrafoMemoria, No
+from .paginacao import LIMITE_PADRAO, decodificar_cursor, pagina
+from .texto import termos as termos_do_nome
+
+CIDADE_PADRAO = "Não informada"
+
+
+def _pessoa_com_cidade(no: No) -> dict:
+    pessoa = no.como_dict()
+    if pessoa["cidade"] is None:
+        pessoa["cidade"] = CIDADE_PADRAO
+    return pessoa
+
+
+async def criar_pessoa(db: GrafoMemoria, pessoa: schemas.PessoaCreate):
+    no = db.adicionar_pessoa(pessoa.nome, pessoa.idade, pessoa.interesses, pessoa.cidade)
+    criada = no.como_dict()
+    eventos.pessoa_salva(criada)
+    return criada
+
+async def get_pessoas(db: GrafoMemoria, after: Optional[str] = None, limit: int = LIMITE_PADRAO):
+    cursor = decodificar_cursor(after, id=int)
+    ids = db.ids_a_partir(cursor and cursor["id"], limit + 1)
+    pessoas = [db.no(pessoa_id).como_dict() for pessoa_id in ids]
+    return pagina(pessoas, limit, lambda p: {"id": p["id"]})
+
+async def iter_pessoas(db: GrafoMemoria) -> AsyncIterator[dict]:
+    for pessoa_id in list(db.ids_ordenados):
+        yield db.no(pessoa_id).como_dict()
+
+async def get_pessoa(db: GrafoMemoria, pessoa_id: int) -> Optional[dict]:
+    no = db.no(pessoa_id)
+    return no.como_dict() if no else None
+
+async def get_pessoas_por_ids(db: GrafoMemoria, pessoa_ids: List[int]) -> List[dict]:
+    return [no.como_dict() for no in map(db.no, pessoa_ids) if no is not None]
+
+async def buscar_pessoas(db: GrafoMemoria, termos: List[str], limite: int = 10) -> List[dict]:
+    candidatos = None
+    for termo in termos:
+        encontrados = db.com_prefixo(termo)
+        candidatos = encontrados if candidatos is None else candidatos & encontrados
+        if not candidatos:
+            return []
+
+    # mesma ordem do índice full-text: mais termos exatos, depois nomes mais curtos
+    def chave(i: int):
+        no = db.nos[i]
+        exatos = len(set(termos) & set(termos_do_nome(no.nome)))
+        return -exatos, len(no.nome), no.nome, no.pessoa_id
+
+    return [db.nos[i].como_dict() for i in nsmallest(limite, candidatos or (), key=chave)]
+
+async def get_conexoes_ids(db: GrafoMemoria, pessoa_id: int) -> set:
+    i = db.indice.get(pessoa_id)
+    if i is None:
+        return set()
+    return {db.nos[j].pessoa_id for j in db.vizinhos(i)}
+
+async def criar_relacionamento(db: GrafoMemoria, pessoa_id1: int, pessoa_id2: int) -> bool:
+    nova = db.adicionar_aresta(pessoa_id1, pessoa_id2)
+    if nova is None:
+        return False
+    # como no MERGE do crud.py: repetir o par responde sucesso, mas só a aresta nova é publicada
+    if nova:
+        eventos.relacionamento_criado(pessoa_id1, pessoa_id2)
+    return True
+
+async def criar_pessoas_em_lote(db: GrafoMemoria, pessoas: List[dict]) -> int:
+    for p in pessoas:
+        no = db.adicionar_pessoa(p["nome"], p["idade"], p.get("interesses"), p.get("cidade"),
+                                 pessoa_id=p["id"])
+        eventos.pessoa_salva(no.como_dict())
+    return len(pessoas)
+
+async def criar_relacionamentos_em_lote(db: GrafoMemoria, relacionamentos: List[dict]) -> int:
+    escritos = 0
+    for r in relacionamentos:
+        if db.adicionar_aresta(r["pessoa_id1"], r["pessoa_id2"]):
+            eventos.relacionamento_criado(r["pessoa_id1"], r["pessoa_id2"])
+            escritos += 1
+    return escritos
+
+def _amigos_ordenados(db: GrafoMemoria, pessoa_id: int) -> List[No]:
+    i = db.indice.get(pessoa_id)
+    if i is None:
+        return []
+    return sorted((db.nos[j] for j in db.saida(i)), key=lambda no: no.pessoa_id)
+
+async def get_amigos(db: GrafoMemoria, pessoa_id: int, after: Optional[str] = None,
+                     limit: int = LIMITE_PADRAO):
+    cursor = decodificar_cursor(after, id=int)
+    after_id = cursor and cursor["id"]
+    amigos = [no.como_dict() for no in _amigos_ordenados(db, pessoa_id)
+              if after_id is None or no.pessoa_id > after_id]
+    return pagina(amigos[:limit + 1], limit, lambda p: {"id": p["id"]})
+
+async def get_amigos_em_lote(db: GrafoMemoria, pessoa_ids: List[int],
+                             limite: int = LIMITE_PADRAO) -> Dict[int, List[dict]]:
+    return {
+        pessoa_id: [no.como_dict() for no in _amigos_ordenados(db, pessoa_id)[:limite]]
+        for pessoa_id in pessoa_ids
+    }
+
+async def iter_amigos(db: GrafoMemoria, pessoa_id: int) -> AsyncIterator[dict]:
+    for no in _amigos_ordenados(db, pessoa_id):
+        yield no.como_dict()
+
+async def get_recomendacoes_pontuadas(db: GrafoMemoria, pessoa_id: int, limite: int = 50,
+                                      peso_interesses: float = 0.0, peso_cidade: float = 0.0):
+    i = db.indice.get(pessoa_id)
+    if i is None:
+        return [], []
+    no = db.nos[i]
+    amigos = list(dict.fromkeys(db.saida(i)))
+    diretos = set(amigos)
+    em_comum = Counter()
+    for amigo in amigos:
+        em_comum.update(c for c in set(db.saida(amigo)) if c != i and c not in diretos)
+
+    meus_interesses = set(no.interesses)
+    pontuados = []
+    for j, amigos_em_comum in em_comum.items():
+        candidato = db.nos[j]
+        interesses_em_comum = sum(1 for x in candidato.interesses if x in meus_interesses)
+        mesma_cidade = 1 if candidato.cidade is not None and candidato.cidade == no.cidade else 0
+        score = amigos_em_comum + peso_interesses * interesses_em_comum + peso_cidade * mesma_cidade
+        pontuados.append((-score, -amigos_em_comum, candidato.pessoa_id, j, amigos_em_comum, interesses_em_comum))
+    pontuados.sort()
+
+    candidatos = []
+    for neg_score, _, _, j, amigos_em_comum, interesses_em_comum in pontuados[:limite]:
+        candidato = db.nos[j].como_dict()
+        candidato["amigos_em_comum"] = amigos_em_comum
+        candidato["interesses_em_comum"] = interesses_em_comum
+        candidato["score"] = -neg_score
+        candidatos.append(candidato)
+    return [db.nos[a].pessoa_id for a in amigos], candidatos
+
+def _por_interesse_ordenados(db: GrafoMemoria, interesse: str) -> List[dict]:
+    pessoas = [_pessoa_com_cidade(db.nos[j]) for j in db.por_interesse.get(interesse, ())]
+    pessoas.sort(key=lambda p: (p["nome"], p["id"]))
+    return pessoas
+
+async def get_pessoas_por_interesse(db: GrafoMemoria, interesse: str, after: Optional[str] = None,
+                                    limit: int = LIMITE_PADRAO):
+    cursor = decodificar_cursor(after, nome=str, id=int)
+    pessoas = _por_interesse_ordenados(db, interesse)
+    if cursor:
+        chave = (cursor["nome"], cursor["id"])
+        pessoas = [p for p in pessoas if (p["nome"], p["id"]) > chave]
+    return pagina(pessoas[:limit + 1], limit, lambda p: {"nome": p["nome"], "id": p["id"]})
+
+async def iter_pessoas_por_interesse(db: GrafoMemoria, interesse: str) -> AsyncIterator[dict]:
+    for pessoa in _por_interesse_ordenados(db, interesse):
+        yield pessoa
+
+async def get_vizinhos_em_lote(db: GrafoMemoria, pessoa_ids: List[int]) -> Dict[int, List[int]]:
+    vizinhos = {}
+    for pessoa_id in pessoa_ids:
+        i = db.indice.get(pessoa_id)
+        if i is not None:
+            vizinhos[pessoa_id] = [db.nos[j].pessoa_id for j in db.vizinhos(i)]
+    return vizinhos
+
+async def get_estatisticas_rede(db: GrafoMemoria):
+    total_pessoas = len(db.nos)
+    total_relacionamentos = db.total_relacionamentos
+    cidades = Counter({cidade: len(ids) for cidade, ids in db.por_cidade.items() if ids})
+    interesses = Counter({interesse: len(ids) for interesse, ids in db.por_interesse.items() if ids})
+    return {
+        "total_pessoas": total_pessoas,
+        "total_relacionamentos": total_relacionamentos,
+        "densidade_rede": round(total_relacionamentos / total_pessoas, 2) if total_pessoas else 0.0,
+        "top_cidades": [{"cidade": c, "quantidade": q} for c, q in cidades.most_common(5)],
+        "top_interesses": [{"interesse": i, "quantidade": q} for i, q in interesses.most_common(5)],
+    }
+
+async def get_contagens_rede(db: GrafoMemoria) -> dict:
+    return {
+        "total_pessoas": len(db.nos),
+        "total_relacionamentos": db.total_relacionamentos,
+        "maior_id": db.sequencia,
+        "cidades": {cidade: len(ids) for cidade, ids in db.por_cidade.items() if ids},
+        "interesses": {interesse: len(ids) for interesse, ids in db.por_interesse.items() if ids},
+    }
+
+def _candidatos_filtro(db: GrafoMemoria, filtro: filtros.Filtro):
+    if filtro.interesses:
+        listas = sorted((db.por_interesse.get(i, ()) for i in filtro.interesses), key=len)
+        if filtro.modo == "all":
+            comuns = set(listas[0])
+            for lista in listas[1:]:
+                comuns.intersection_update(lista)
+            return comuns
+        return set().union(*listas)
+    if filtro.cidade is not None:
+        return db.por_cidade.get(filtro.cidade, ())
+    return range(len(db.nos))
+
+async def filtrar_pessoas(db: GrafoMemoria, filtro: filtros.Filtro, limite: int = LIMITE_PADRAO) -> List[dict]:
+    resultados = []
+    for i in _candidatos_filtro(db, filtro):
+        no = db.nos[i]
+        if filtro.cidade is not None and no.cidade != filtro.cidade:
+            continue
+        if filtro.idade_min is not None and no.idade < filtro.idade_min:
+            continue
+        if filtro.idade_max is not None and no.idade > filtro.idade_max:
+            continue
+        grau = len(db.saida(i))
+        if filtro.grau_min is not None and grau < filtro.grau_min:
+            continue
+        resultados.append({**no.como_dict(), "grau": grau})
+
+    # mesma ordem do Cypher: o campo pedido e, no empate, pessoa_id crescente
+    resultados.sort(key=lambda r: r["id"])
+    if filtro.campo != "id" or filtro.decrescente:
+        resultados.sort(key=lambda r: r[filtro.campo], reverse=filtro.decrescente)
+    return resultados[:limite]
+
+async def iter_filtrar_pessoas(db: GrafoMemoria, filtro: filtros.Filtro,
+                               limite: int = filtros.MAX_LINHAS) -> AsyncIterator[dict]:
+    for pessoa in await filtrar_pessoas(db, filtro, limite):
+        yield pessoa
+
+async def get_adjacencia(db: GrafoMemoria, after_id: int, limite: int) -> list:
+    lote = []
+    for pessoa_id in db.ids_a_partir(after_id, limite):
+        i = db.indice[pessoa_id]
+        lote.append({"id": pessoa_id, "destinos": [db.nos[j].pessoa_id for j in db.saida(i)]})
+    return lote
+
+async def gravar_analises_em_lote(db: GrafoMemoria, linhas: List[dict]) -> int:
+    escritas = 0
+    for linha in linhas:
+        if linha["id"] in db.indice:
+            db.analises[linha["id"]] = {k: v for k, v in linha.items() if k != "id"}
+            escritas += 1
+    return escritas
+
+async def iniciar_execucao_analise(db: GrafoMemoria, validade_s: float) -> bool:
+    desde = db.trava_analise["em_execucao_desde"]
+    if desde is not None and time.time() - desde < validade_s:
+        return False
+    db.trava_analise.update(em_execucao_desde=time.time(), erro=None)
+    return True
+
+async def finalizar_execucao_analise(db: GrafoMemoria, resumo: Optional[dict] = None, erro: Optional[str] = None):
+    db.trava_analise.update(em_execucao_desde=None, erro=erro)
+    if resumo is not None:
+        db.execucao_analise = dict(resumo)
+
+async def get_estado_analise(db: GrafoMemoria, validade_s: float) -> dict:
+    desde = db.trava_analise["em_execucao_desde"]
+    return {"em_execucao": desde is not None and time.time() - desde < validade_s,
+            "erro": db.trava_analise["erro"]}
+
+async def get_execucao_analise(db: GrafoMemoria) -> Optional[dict]:
+    return db.execucao_analise
+
+def _pessoa_analise(db: GrafoMemoria, pessoa_id: int) -> dict:
+    analise = db.analises.get(pessoa_id, {})
+    return {**db.no(pessoa_id).como_dict(), "pagerank": analise.get("pagerank"),
+            "comunidade": analise.get("comunidade"), "grau": analise.get("grau"),
+            "centralidade_grau": analise.get("centralidade_grau")}
+
+async def get_influenciadores(db: GrafoMemoria, limite: int = 10) -> List[dict]:
+    maiores = nlargest(limite, db.analises.items(), key=lambda a: a[1]["pagerank"])
+    return [_pessoa_analise(db, pessoa_id) for pessoa_id, _ in maiores]
+
+async def get_analise_pessoa(db: GrafoMemoria, pessoa_id: int) -> Optional[dict]:
+    return _pessoa_analise(db, pessoa_id) if pessoa_id in db.indice else None
+
+async def get_membros_comunidade(db: GrafoMemoria, comunidade: int, limite: int = 50) -> List[dict]:
+    membros = ((pessoa_id, a) for pessoa_id, a in db.analises.items() if a["comunidade"] == comunidade)
+    maiores = nlargest(limite, membros, key=lambda a: a[1]["pagerank"])
+    return [_pessoa_analise(db, pessoa_id) for pessoa_id, _ in maiores]
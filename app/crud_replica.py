@@ -0,0 +1,101 @@
+"""
+Backend réplica: escritas vão para o Neo4j e são aplicadas também no grafo em
+memória; as leituras sensíveis a latência são servidas pela réplica.
+
+A réplica é carregada do Neo4j na inicialização e recebe as escritas feitas por
+este processo. Escritas de outros processos só aparecem após recarregar.
+Funções não redefinidas aqui caem para crud.py.
+"""
+from typing import List
+
+from . import crud, crud_memoria, schemas
+from .database import database
+from .grafo_memoria import GrafoMemoria
+from .metricas import nomear_query
+
+
+def __getattr__(nome):
+    return getattr(crud, nome)
+
+
+async def carregar_replica(db) -> GrafoMemoria:
+    """
+    Lê todas as pessoas e relacionamentos do Neo4j em streaming para um GrafoMemoria
+    """
+    with nomear_query("crud_replica.carregar_replica"):
+        return await _carregar(db)
+
+
+async def _carregar(db) -> GrafoMemoria:
+    grafo = GrafoMemoria()
+    result = await db.run("""
+    MATCH (p:Pessoa) WHERE p.pessoa_id IS NOT NULL
+    RETURN p.pessoa_id as id, p.nome as nome, p.idade as idade,
+           p.interesses as interesses, p.cidade as cidade
+    ORDER BY p.pessoa_id
+    """)
+    async for record in result:
+        grafo.adicionar_pessoa(record["nome"], record["idade"], record["interesses"],
+                               record["cidade"], pessoa_id=record["id"])
+
+    result = await db.run("""
+    MATCH (a:Pessoa)-[:CONHECE]->(b:Pessoa)
+    RETURN a.pessoa_id as origem, b.pessoa_id as destino
+    """)
+    async for record in result:
+        grafo.adicionar_aresta(record["origem"], record["destino"])
+    grafo.compactar()
+
+    print(f"✅ Réplica em memória carregada: {len(grafo.nos)} pessoas, "
+          f"{grafo.total_relacionamentos} relacionamentos")
+    return grafo
+
+# Escritas: Neo4j primeiro, depois a réplica
+
+async def criar_pessoa(db, pessoa: schemas.PessoaCreate):
+    criada = await crud.criar_pessoa(db=db, pessoa=pessoa)
+    database.grafo.adicionar_pessoa(criada["nome"], criada["idade"], criada["interesses"],
+                                    criada["cidade"], pessoa_id=criada["id"])
+    return criada
+
+async def criar_relacionamento(db, pessoa_id1: int, pessoa_id2: int) -> bool:
+    criado = await crud.criar_relacionamento(db=db, pessoa_id1=pessoa_id1, pessoa_id2=pessoa_id2)
+    if criado:
+        database.grafo.adicionar_aresta(pessoa_id1, pessoa_id2)
+    return criado
+
+async def criar_pessoas_em_lote(db, pessoas: List[dict]) -> int:
+    escritas = await crud.criar_pessoas_em_lote(db, pessoas)
+    for p in pessoas:
+        database.grafo.adicionar_pessoa(p["nome"], p["idade"], p.get("interesses"), p.get("cidade"),
+                                        pessoa_id=p["id"])
+    return escritas
+
+async def criar_relacionamentos_em_lote(db, relacionamentos: List[dict]) -> int:
+    escritos = await crud.criar_relacionamentos_em_lote(db, relacionamentos)
+    for r in relacionamentos:
+        database.grafo.adicionar_aresta(r["pessoa_id1"], r["pessoa_id2"])
+    return escritos
+
+# Leituras servidas pela réplica
+
+async def get_pessoa(db, pessoa_id: int):
+    return await crud_memoria.get_pessoa(database.grafo, pessoa_id=pessoa_id)
+
+async def get_pessoas_por_ids(db, pessoa_ids: List[int]):
+    return await crud_memoria.get_pessoas_por_ids(database.grafo, pessoa_ids)
+
+async def get_conexoes_ids(db, pessoa_id: int):
+    return await crud_memoria.get_conexoes_ids(database.grafo, pessoa_id=pessoa_id)
+
+async def get_amigos(db, pessoa_id: int, **kwargs):
+    return await crud_memoria.get_amigos(database.grafo, pessoa_id=pessoa_id, **kwargs)
+
+async def get_amigos_em_lote(db, pessoa_ids: List[int], **kwargs):
+    return await crud_memoria.get_amigos_em_lote(database.grafo, pessoa_ids, **kwargs)
+
+async def get_recomendacoes_pontuadas(db, pessoa_id: int, **kwargs):
+    return await crud_memoria.get_recomendacoes_pontuadas(database.grafo, pessoa_id=pessoa_id, **kwargs)
+
+async def buscar_pessoas(db, termos: List[str], limite: int = 10):
+    return await crud_memoria.buscar_pessoas(database.grafo, termos, limite)
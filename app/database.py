@@ -1,58 +1,291 @@
-from neo4j import AsyncGraphDatabase
+from neo4j import AsyncGraphDatabase, Bookmarks, READ_ACCESS
 import os
+import time
 from dotenv import load_dotenv
 import asyncio
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import HTTPException, Request, Response
+
+from .metricas import SessaoInstrumentada
 
 load_dotenv()
 
+# neo4j (padrão), memoria (grafo em processo, sem Neo4j) ou replica (Neo4j + réplica de leitura em memória)
+BACKEND = os.getenv("GRAFO_BACKEND", "neo4j").strip().lower()
+BACKENDS = ("neo4j", "memoria", "replica")
+if BACKEND not in BACKENDS:
+    raise ValueError(f"GRAFO_BACKEND inválido: {BACKEND} (use {', '.join(BACKENDS)})")
+
+# bookmarks do Neo4j devolvidos pelas escritas e aceitos nas leituras (leitura causal entre workers)
+HEADER_BOOKMARKS = "X-Neo4j-Bookmarks"
+
+
+def _env_int(nome, padrao):
+    valor = os.getenv(nome)
+    return int(valor) if valor else padrao
+
+
+def _env_float(nome, padrao):
+    valor = os.getenv(nome)
+    return float(valor) if valor else padrao
+
+
+def _env_bool(nome, padrao):
+    valor = os.getenv(nome)
+    if not valor:
+        return padrao
+    return valor.strip().lower() in ("1", "true", "sim", "yes", "on")
+
+
+class PoolStats:
+    """
+    Contadores de uso do pool de conexões Bolt, alimentados pelo acquire do driver
+    """
+    def __init__(self):
+        self.aguardando = 0
+        self.aquisicoes = 0
+        self.falhas = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+    def registrar(self, espera, sucesso=True):
+        if sucesso:
+            self.aquisicoes += 1
+        else:
+            self.falhas += 1
+        self.espera_total += espera
+        self.espera_maxima = max(self.espera_maxima, espera)
+
+
 class Database:
     def __init__(self):
         self.driver = None
         self._connection_attempts = 0
         self._max_attempts = 5
-    
+        self.pool_stats = PoolStats()
+        # GrafoMemoria dos backends memoria e replica
+        self.grafo = None
+        # compartilhado por todas as sessões do worker: uma leitura sempre vê as escritas já confirmadas nele
+        self.bookmarks = None
+
+    def pool_config(self):
+        """
+        Configurações do pool lidas do ambiente (uma instância por worker)
+        """
+        return {
+            "max_connection_lifetime": _env_int("NEO4J_MAX_CONNECTION_LIFETIME", 3600),
+            "max_connection_pool_size": _env_int("NEO4J_MAX_POOL_SIZE", 100),
+            "connection_acquisition_timeout": _env_float("NEO4J_ACQUISITION_TIMEOUT", 60.0),
+            "keep_alive": _env_bool("NEO4J_KEEP_ALIVE", True),
+            # tempo máximo refazendo uma transação gerenciada após falhas transitórias
+            "max_transaction_retry_time": _env_float("NEO4J_MAX_RETRY_TIME", 30.0),
+        }
+
     async def connect(self):
+        if BACKEND == "memoria":
+            from .grafo_memoria import GrafoMemoria
+
+            if self.grafo is None:
+                caminho = os.getenv("GRAFO_SNAPSHOT")
+                if caminho:
+                    from .snapshot import carregar_grafo
+
+                    self.grafo = carregar_grafo(caminho)
+                else:
+                    self.grafo = GrafoMemoria()
+            print("✅ Usando grafo em memória (GRAFO_BACKEND=memoria)")
+            return
+
+        if self.driver is not None:
+            return
+
         URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
         USERNAME = os.getenv("NEO4J_USERNAME", "neo4j")
         PASSWORD = os.getenv("NEO4J_PASSWORD", "password123")
-        
+
         while self._connection_attempts < self._max_attempts:
             try:
                 self.driver = AsyncGraphDatabase.driver(
-                    URI, 
+                    URI,
                     auth=(USERNAME, PASSWORD),
-                    max_connection_lifetime=3600
+                    **self.pool_config()
                 )
+                self.bookmarks = AsyncGraphDatabase.bookmark_manager()
+                self._instrumentar_pool()
                 # Testar conexão
                 await self.verify_connection()
                 print("✅ Conectado ao Neo4j com sucesso!")
+                self._connection_attempts = 0
                 return
             except Exception as e:
+                # o driver da tentativa que falhou é fechado: cada tentativa abre um pool novo
+                await self.close()
                 self._connection_attempts += 1
                 wait_time = 2 ** self._connection_attempts
                 print(f"❌ Tentativa {self._connection_attempts} falhou: {e}")
                 print(f"🕐 Tentando novamente em {wait_time} segundos...")
                 await asyncio.sleep(wait_time)
-        
+
+        self._connection_attempts = 0
         raise Exception(f"Falha ao conectar com Neo4j após {self._max_attempts} tentativas")
-    
+
+    def _instrumentar_pool(self):
+        """
+        Envolve o acquire do pool do driver para medir espera e fila de aquisição.
+        O driver não expõe essas métricas publicamente.
+        """
+        pool = getattr(self.driver, "_pool", None)
+        acquire_original = getattr(pool, "acquire", None)
+        # atributos privados do driver: se mudarem numa versão nova, /database/pool só perde estes contadores
+        if not asyncio.iscoroutinefunction(acquire_original):
+            print("⚠️ Pool do driver sem acquire assíncrono: espera de aquisição não será medida")
+            return
+        stats = self.pool_stats
+
+        async def acquire(*args, **kwargs):
+            stats.aguardando += 1
+            inicio = time.perf_counter()
+            try:
+                conexao = await acquire_original(*args, **kwargs)
+            except Exception:
+                stats.registrar(time.perf_counter() - inicio, sucesso=False)
+                raise
+            finally:
+                stats.aguardando -= 1
+            stats.registrar(time.perf_counter() - inicio)
+            return conexao
+
+        pool.acquire = acquire
+
     async def verify_connection(self):
         async with self.driver.session() as session:
             await session.run("RETURN 1 as test")
-    
+
     async def close(self):
         if self.driver:
-            await self.driver.close()
-    
-    def get_session(self):
+            driver, self.driver = self.driver, None
+            self.bookmarks = None
+            await driver.close()
+
+    def conectado(self) -> bool:
+        if BACKEND == "memoria":
+            return self.grafo is not None
+        return self.driver is not None
+
+    def get_session(self, leitura: bool = False, bookmarks: Optional[List[str]] = None):
+        """
+        leitura=True abre a sessão em modo leitura (roteada para seguidores/réplicas com neo4j://);
+        bookmarks recebidos do cliente fazem a sessão esperar por essas escritas
+        """
+        if BACKEND == "memoria":
+            if self.grafo is None:
+                raise Exception("Database not connected")
+            return self.grafo
         if not self.driver:
             raise Exception("Database not connected")
-        return self.driver.session()
+        config = {"bookmark_manager": self.bookmarks}
+        if leitura:
+            config["default_access_mode"] = READ_ACCESS
+        if bookmarks:
+            config["bookmarks"] = Bookmarks.from_raw_values(bookmarks)
+        return SessaoInstrumentada(self.driver.session(**config))
+
+    async def get_bookmarks(self) -> List[str]:
+        if self.bookmarks is None:
+            return []
+        return sorted(await self.bookmarks.get_bookmarks())
+
+    def _contar_conexoes(self):
+        """
+        (em uso, ociosas) lidas dos atributos privados do pool; (None, None) se o driver não os tiver
+        """
+        conexoes_por_endereco = getattr(getattr(self.driver, "_pool", None), "connections", None)
+        if conexoes_por_endereco is None:
+            return (0, 0) if self.driver is None else (None, None)
+        em_uso = ociosas = 0
+        try:
+            for conexoes in list(conexoes_por_endereco.values()):
+                for conexao in list(conexoes):
+                    if conexao.in_use:
+                        em_uso += 1
+                    else:
+                        ociosas += 1
+        except (AttributeError, TypeError):
+            return None, None
+        return em_uso, ociosas
+
+    def stats(self):
+        """
+        Uso atual do pool: conexões em uso, ociosas, requisições aguardando e tempo de aquisição
+        """
+        em_uso, ociosas = self._contar_conexoes()
+        s = self.pool_stats
+        total = s.aquisicoes + s.falhas
+        return {
+            "max_pool_size": self.pool_config()["max_connection_pool_size"],
+            "em_uso": em_uso,
+            "ociosas": ociosas,
+            "aguardando": s.aguardando,
+            "aquisicoes": s.aquisicoes,
+            "falhas_aquisicao": s.falhas,
+            "espera_media_ms": round(s.espera_total / total * 1000, 3) if total else 0.0,
+            "espera_maxima_ms": round(s.espera_maxima * 1000, 3),
+        }
 
 database = Database()
 
 async def init_db():
+    from .migracoes import migrar
+
     await database.connect()
+    if BACKEND == "memoria":
+        return
+    session = database.get_session()
+    try:
+        # serve.py --producao migra uma vez antes de subir os workers
+        if _env_bool("MIGRAR_NA_INICIALIZACAO", True):
+            await migrar(session)
+        if BACKEND == "replica":
+            from .crud_replica import carregar_replica
+
+            database.grafo = await carregar_replica(session)
+    finally:
+        await session.close()
+
+@asynccontextmanager
+async def sessao(leitura: bool = False, bookmarks: Optional[List[str]] = None):
+    """
+    Sessão própria para trabalhos fora do ciclo da requisição (streaming, tarefas em background).
+    Quem atende um cliente repassa os bookmarks dele (bookmarks_da_requisicao) para ler as próprias escritas.
+    """
+    session = database.get_session(leitura=leitura, bookmarks=bookmarks)
+    try:
+        yield session
+    finally:
+        await session.close()
+
+def bookmarks_da_requisicao(request: Request) -> List[str]:
+    valor = request.headers.get(HEADER_BOOKMARKS, "")
+    return [b.strip() for b in valor.split(",") if b.strip()]
+
+async def definir_bookmarks(response: Response):
+    """
+    Devolve ao cliente os bookmarks após uma escrita; reenviados no header, garantem que a
+    próxima leitura (em qualquer worker ou réplica) já enxergue essa escrita
+    """
+    bookmarks = await database.get_bookmarks()
+    if bookmarks:
+        response.headers[HEADER_BOOKMARKS] = ",".join(bookmarks)
 
-async def get_db():
-    return database.get_session()
\ No newline at end of file
+async def get_db(request: Request):
+    if not database.conectado():
+        # ainda conectando (ver app/ciclo_de_vida.py): o cliente deve tentar de novo
+        raise HTTPException(status_code=503, detail="Banco de dados ainda não está disponível",
+                            headers={"Retry-After": "5"})
+    session = database.get_session(bookmarks=bookmarks_da_requisicao(request))
+    try:
+        yield session
+    finally:
+        await session.close()
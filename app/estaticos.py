@@ -0,0 +1,115 @@
+"""
+Arquivos estáticos do frontend com cache HTTP e variantes pré-comprimidas.
+
+comprimir() grava ao lado de cada arquivo de texto as versões .br (se o pacote
+brotli estiver instalado) e .gz; EstaticosComprimidos escolhe a variante pelo
+Accept-Encoding sem comprimir nada por requisição. index.html é sempre
+revalidado (ETag); os demais arquivos ficam em cache por ESTATICOS_MAX_AGE_S.
+
+    python -m app.estaticos frontend
+"""
+import gzip
+import mimetypes
+import os
+import sys
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.staticfiles import StaticFiles
+
+MAX_AGE_S = int(os.getenv("ESTATICOS_MAX_AGE_S", "3600"))
+EXTENSOES_COMPRIMIVEIS = (".html", ".css", ".js", ".svg", ".json", ".txt")
+# arquivos menores que isto não compensam o header extra
+TAMANHO_MINIMO = 512
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# (Content-Encoding, extensão), na ordem de preferência
+VARIANTES: List[Tuple[str, str]] = [("br", ".br"), ("gzip", ".gz")]
+
+
+def _comprimir_arquivo(caminho: str, destino: str, comprimir_bytes) -> bool:
+    if os.path.exists(destino) and os.path.getmtime(destino) >= os.path.getmtime(caminho):
+        return False
+    with open(caminho, "rb") as f:
+        dados = f.read()
+    comprimido = comprimir_bytes(dados)
+    if len(comprimido) >= len(dados):
+        return False
+    with open(destino, "wb") as f:
+        f.write(comprimido)
+    return True
+
+
+def comprimir(diretorio: str) -> int:
+    """
+    Gera as variantes .br/.gz que faltam ou estão desatualizadas; retorna quantas foram gravadas
+    """
+    compressores = [(".gz", lambda dados: gzip.compress(dados, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        compressores.append((".br", lambda dados: brotli.compress(dados, quality=11)))
+    gravados = 0
+    for raiz, _, arquivos in os.walk(diretorio):
+        for nome in arquivos:
+            caminho = os.path.join(raiz, nome)
+            if not nome.endswith(EXTENSOES_COMPRIMIVEIS) or os.path.getsize(caminho) < TAMANHO_MINIMO:
+                continue
+            for extensao, comprimir_bytes in compressores:
+                gravados += _comprimir_arquivo(caminho, caminho + extensao, comprimir_bytes)
+    sem_brotli = "" if brotli is not None else " (sem .br: pip install brotli)"
+    print(f"✅ Estáticos comprimidos em {diretorio}: {gravados} arquivos gravados{sem_brotli}")
+    return gravados
+
+
+def codificacoes_aceitas(accept_encoding: str) -> set:
+    aceitas = set()
+    for parte in accept_encoding.split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        if parametros.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        aceitas.add(nome.strip().lower())
+    return aceitas
+
+
+class EstaticosComprimidos(StaticFiles):
+    async def _variante(self, path: str, scope) -> Optional[Tuple[str, object]]:
+        aceitas = codificacoes_aceitas(Headers(scope=scope).get("accept-encoding", ""))
+        for codificacao, extensao in VARIANTES:
+            if codificacao not in aceitas and "*" not in aceitas:
+                continue
+            try:
+                resposta = await super().get_response(path + extensao, scope)
+            except HTTPException:
+                continue
+            if resposta.status_code in (200, 304):
+                return codificacao, resposta
+        return None
+
+    async def get_response(self, path: str, scope):
+        if self.html and path in ("", "."):
+            path = "index.html"
+        variante = None
+        if path.endswith(EXTENSOES_COMPRIMIVEIS):
+            variante = await self._variante(path, scope)
+        if variante is not None:
+            codificacao, resposta = variante
+            resposta.headers["Content-Encoding"] = codificacao
+            tipo, _ = mimetypes.guess_type(path)
+            if tipo:
+                resposta.headers["Content-Type"] = tipo + ("; charset=utf-8" if tipo.startswith("text/") else "")
+        else:
+            resposta = await super().get_response(path, scope)
+        resposta.headers["Vary"] = "Accept-Encoding"
+        if path.endswith(".html"):
+            resposta.headers["Cache-Control"] = "no-cache"
+        else:
+            resposta.headers["Cache-Control"] = f"public, max-age={MAX_AGE_S}"
+        return resposta
+
+
+if __name__ == "__main__":
+    comprimir(sys.argv[1] if len(sys.argv) > 1 else "frontend")
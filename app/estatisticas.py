@@ -0,0 +1,199 @@
+"""
+Estatísticas da rede mantidas em memória para /estatisticas/.
+
+Contadores de pessoas e relacionamentos e as contagens por cidade e por
+interesse são atualizados pelos eventos de escrita do crud e reconciliados
+periodicamente com o banco, que também recebe escritas de outros processos.
+A reconciliação só lê contagens agregadas (count store, índices e grau dos
+nós :Interesse), sem percorrer as pessoas. A leitura devolve um resumo já montado, junto com o horário da última
+atualização e da última reconciliação.
+"""
+import asyncio
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from heapq import nsmallest
+from typing import Dict, Optional, Tuple
+
+from . import eventos
+from .backends import crud
+from .database import sessao
+
+TOP_K = 5
+RECONCILIAR_A_CADA = float(os.getenv("ESTATISTICAS_RECONCILIAR_S", "300"))
+
+
+def _iso(instante: Optional[float]) -> Optional[str]:
+    if instante is None:
+        return None
+    return datetime.fromtimestamp(instante, tz=timezone.utc).isoformat()
+
+
+class EstatisticasRede:
+    def __init__(self, contagens: Optional[dict] = None):
+        contagens = contagens or {}
+        self.total_pessoas = contagens.get("total_pessoas", 0)
+        self.total_relacionamentos = contagens.get("total_relacionamentos", 0)
+        self.cidades: Counter = Counter(contagens.get("cidades", {}))
+        self.interesses: Counter = Counter(contagens.get("interesses", {}))
+        # pessoas até este id estão nas contagens do banco; acima dele, só as criadas depois
+        self.maior_id = contagens.get("maior_id", 0)
+        # estado das pessoas salvas desde a reconciliação, para descontar o anterior quando são atualizadas
+        self._pessoas: Dict[int, Tuple[Optional[str], tuple]] = {}
+        # alguma pessoa contada só no agregado foi atualizada: as contagens esperam a próxima reconciliação
+        self.desatualizada = False
+        self._resumo: Optional[dict] = None
+        self.atualizado_em: Optional[float] = None
+        self.reconciliado_em: Optional[float] = None
+
+    def aplicar_pessoa(self, pessoa: dict):
+        novo = (pessoa.get("cidade"), tuple(dict.fromkeys(pessoa.get("interesses") or ())))
+        antigo = self._pessoas.get(pessoa["id"])
+        if antigo is None and pessoa["id"] <= self.maior_id:
+            # o estado anterior dela não é conhecido, não há o que descontar
+            self.desatualizada = True
+            return
+        if antigo == novo:
+            return
+        if antigo is not None:
+            self._contar(antigo, -1)
+        else:
+            self.total_pessoas += 1
+        self._contar(novo, 1)
+        self._pessoas[pessoa["id"]] = novo
+        self._alterado()
+
+    def _contar(self, estado: tuple, delta: int):
+        cidade, interesses = estado
+        if cidade is not None:
+            self.cidades[cidade] += delta
+            if self.cidades[cidade] <= 0:
+                del self.cidades[cidade]
+        for interesse in interesses:
+            self.interesses[interesse] += delta
+            if self.interesses[interesse] <= 0:
+                del self.interesses[interesse]
+
+    def aplicar_relacionamento(self):
+        self.total_relacionamentos += 1
+        self._alterado()
+
+    def _alterado(self):
+        self._resumo = None
+        self.atualizado_em = time.time()
+
+    def resumo(self) -> dict:
+        """
+        Resumo no formato de /estatisticas/; só é remontado depois de uma escrita
+        """
+        if self._resumo is None:
+            total_pessoas = self.total_pessoas
+            # maiores contagens primeiro, empate em ordem alfabética (como a query do crud)
+            cidades = nsmallest(TOP_K, self.cidades.items(), key=lambda c: (-c[1], c[0]))
+            interesses = nsmallest(TOP_K, self.interesses.items(), key=lambda c: (-c[1], c[0]))
+            self._resumo = {
+                "total_pessoas": total_pessoas,
+                "total_relacionamentos": self.total_relacionamentos,
+                "densidade_rede": round(self.total_relacionamentos / total_pessoas, 2) if total_pessoas else 0.0,
+                "top_cidades": [{"cidade": c, "quantidade": q} for c, q in cidades],
+                "top_interesses": [{"interesse": i, "quantidade": q} for i, q in interesses],
+                "atualizado_em": _iso(self.atualizado_em),
+                "reconciliado_em": _iso(self.reconciliado_em),
+            }
+        return self._resumo
+
+
+estatisticas = EstatisticasRede()
+_tarefa: Optional[asyncio.Task] = None
+# reconciliação antecipada pedida por uma atualização que as contagens em memória não conseguem aplicar
+_antecipada: Optional[asyncio.Task] = None
+# pessoas salvas durante uma reconciliação, reaplicadas no estado novo
+_pendentes: Optional[list] = None
+# relacionamentos criados depois que a contagem do banco começou, somados ao total novo
+_relacionamentos_pendentes: Optional[int] = None
+
+
+def _ao_salvar_pessoa(pessoa: dict):
+    global _antecipada
+    estatisticas.aplicar_pessoa(pessoa)
+    if _pendentes is not None:
+        _pendentes.append(pessoa)
+    elif estatisticas.desatualizada and (_antecipada is None or _antecipada.done()):
+        _antecipada = asyncio.get_running_loop().create_task(_reconciliar_registrando())
+
+
+def _ao_criar_relacionamento(pessoa_id1: int, pessoa_id2: int):
+    global _relacionamentos_pendentes
+    estatisticas.aplicar_relacionamento()
+    if _relacionamentos_pendentes is not None:
+        _relacionamentos_pendentes += 1
+
+
+async def reconciliar() -> EstatisticasRede:
+    """
+    Recalcula as contagens a partir do banco e substitui o estado atual
+    """
+    global estatisticas, _pendentes, _relacionamentos_pendentes
+    inicio = time.perf_counter()
+    _pendentes = []
+    _relacionamentos_pendentes = 0
+    try:
+        # escritas confirmadas durante a consulta podem contar duas vezes até a próxima reconciliação
+        async with sessao(leitura=True) as db:
+            nova = EstatisticasRede(await crud.get_contagens_rede(db=db))
+        # pessoas até maior_id já estão nas contagens; as criadas depois entram como delta
+        for pessoa in _pendentes:
+            if pessoa["id"] > nova.maior_id:
+                nova.aplicar_pessoa(pessoa)
+        nova.total_relacionamentos += _relacionamentos_pendentes
+        nova.atualizado_em = nova.reconciliado_em = time.time()
+        estatisticas = nova
+    finally:
+        _pendentes = None
+        _relacionamentos_pendentes = None
+    print(f"✅ Estatísticas reconciliadas: {nova.total_pessoas} pessoas, "
+          f"{nova.total_relacionamentos} relacionamentos ({time.perf_counter() - inicio:.2f}s)")
+    return nova
+
+
+async def _reconciliar_registrando():
+    try:
+        await reconciliar()
+    except Exception as e:
+        print(f"❌ Falha ao reconciliar as estatísticas: {e}")
+
+
+async def _reconciliar_periodicamente():
+    while True:
+        await asyncio.sleep(RECONCILIAR_A_CADA)
+        await _reconciliar_registrando()
+
+
+async def iniciar():
+    global _tarefa
+    eventos.assinar(eventos.PESSOA_SALVA, _ao_salvar_pessoa)
+    eventos.assinar(eventos.RELACIONAMENTO_CRIADO, _ao_criar_relacionamento)
+    await reconciliar()
+    if _tarefa is None and RECONCILIAR_A_CADA > 0:
+        _tarefa = asyncio.create_task(_reconciliar_periodicamente())
+
+
+async def parar():
+    global _tarefa, _antecipada
+    eventos.cancelar(eventos.PESSOA_SALVA, _ao_salvar_pessoa)
+    eventos.cancelar(eventos.RELACIONAMENTO_CRIADO, _ao_criar_relacionamento)
+    for tarefa in (_tarefa, _antecipada):
+        if tarefa is not None:
+            tarefa.cancel()
+    _tarefa = _antecipada = None
+
+
+async def get_estatisticas_rede(db) -> dict:
+    """
+    Resumo em memória; antes da primeira reconciliação consulta o banco
+    """
+    if estatisticas.reconciliado_em is None:
+        resumo = await crud.get_estatisticas_rede(db=db)
+        return {**resumo, "atualizado_em": _iso(time.time()), "reconciliado_em": None}
+    return estatisticas.resumo()
@@ -0,0 +1,41 @@
+"""
+Eventos de escrita publicados pelas operações de crud.
+
+Índices e caches em memória assinam estes eventos para se manter atualizados
+sem consultar o banco. Os assinantes são síncronos e devem ser rápidos.
+"""
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+# pessoa (dict no formato de schemas.Pessoa) criada ou atualizada
+PESSOA_SALVA = "pessoa_salva"
+# (pessoa_id1)-[:CONHECE]->(pessoa_id2) criado
+RELACIONAMENTO_CRIADO = "relacionamento_criado"
+
+_assinantes: Dict[str, List[Callable]] = defaultdict(list)
+
+
+def assinar(evento: str, callback: Callable):
+    if callback not in _assinantes[evento]:
+        _assinantes[evento].append(callback)
+
+
+def cancelar(evento: str, callback: Callable):
+    if callback in _assinantes[evento]:
+        _assinantes[evento].remove(callback)
+
+
+def publicar(evento: str, **dados):
+    for callback in list(_assinantes[evento]):
+        try:
+            callback(**dados)
+        except Exception as e:
+            print(f"❌ Erro no assinante de {evento}: {e}")
+
+
+def pessoa_salva(pessoa: dict):
+    publicar(PESSOA_SALVA, pessoa=pessoa)
+
+
+def relacionamento_criado(pessoa_id1: int, pessoa_id2: int):
+    publicar(RELACIONAMENTO_CRIADO, pessoa_id1=pessoa_id1, pessoa_id2=pessoa_id2)
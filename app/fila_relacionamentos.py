@@ -0,0 +1,190 @@
+"""
+Fila write-behind para a criação de relacionamentos.
+
+Com FILA_RELACIONAMENTOS=true, POST /pessoas/{id1}/conhece/{id2} não abre uma
+transação por aresta: o pedido entra num lote que é gravado a cada
+FILA_RELACIONAMENTOS_JANELA_MS ou ao atingir FILA_RELACIONAMENTOS_LOTE itens,
+numa única transação UNWIND ... MERGE (crud.criar_relacionamentos_em_lote).
+Pares repetidos no mesmo lote viram um só. Quem chamou pode aguardar a gravação
+do lote em que entrou. Com FILA_RELACIONAMENTOS_CAPACIDADE itens ainda não
+gravados, novos pedidos esperam vaga por até FILA_RELACIONAMENTOS_ESPERA_MS e
+depois são recusados (backpressure).
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from .backends import crud
+from .database import BACKEND, sessao
+
+JANELA_S = float(os.getenv("FILA_RELACIONAMENTOS_JANELA_MS", "5")) / 1000
+TAMANHO_LOTE = int(os.getenv("FILA_RELACIONAMENTOS_LOTE", "500"))
+CAPACIDADE = int(os.getenv("FILA_RELACIONAMENTOS_CAPACIDADE", "10000"))
+ESPERA_S = float(os.getenv("FILA_RELACIONAMENTOS_ESPERA_MS", "1000")) / 1000
+# no grafo em memória a escrita já é local: agrupar só acrescentaria a janela
+ATIVO = (os.getenv("FILA_RELACIONAMENTOS", "false").lower() in ("1", "true", "yes", "sim")
+         and BACKEND != "memoria")
+
+
+class FilaCheia(Exception):
+    def __init__(self, capacidade: int):
+        super().__init__(f"Fila de escrita cheia ({capacidade} itens aguardando gravação)")
+
+
+def _recuperar_excecao(futuro: asyncio.Future):
+    # quem não aguardou o lote (202) não deixa a exceção "never retrieved" no log
+    if not futuro.cancelled():
+        futuro.exception()
+
+
+class FilaEscrita:
+    """
+    gravar_lote(itens) grava os itens (chaves deduplicadas) numa transação; o retorno resolve o lote
+    """
+    def __init__(self, gravar_lote: Callable[[List[Hashable]], Awaitable],
+                 janela: float = JANELA_S, tamanho_lote: int = TAMANHO_LOTE,
+                 capacidade: int = CAPACIDADE, espera: float = ESPERA_S):
+        self.gravar_lote = gravar_lote
+        self.janela = janela
+        self.tamanho_lote = tamanho_lote
+        self.capacidade = capacidade
+        self.espera = espera
+        # lote aberto: itens na ordem de chegada e o futuro da sua gravação
+        self._lote: Dict[Hashable, None] = {}
+        self._futuro: Optional[asyncio.Future] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # vagas para itens ainda não gravados (lote aberto + lotes em gravação)
+        self._vagas = asyncio.Semaphore(capacidade)
+        self._nao_gravados = 0
+        self._tarefas: Set[asyncio.Task] = set()
+        self.pedidos = 0
+        self.duplicados = 0
+        self.recusados = 0
+        self.lotes = 0
+        self.itens_gravados = 0
+        self.erros = 0
+
+    def _duplicado(self, item: Hashable) -> Optional[asyncio.Future]:
+        if item in self._lote:
+            self.duplicados += 1
+            return self._futuro
+        return None
+
+    async def adicionar(self, item: Hashable) -> asyncio.Future:
+        """
+        Enfileira o item e devolve o futuro da gravação do lote em que ele entrou
+        """
+        self.pedidos += 1
+        futuro = self._duplicado(item)
+        if futuro is not None:
+            return futuro
+        try:
+            await asyncio.wait_for(self._vagas.acquire(), self.espera)
+        except asyncio.TimeoutError:
+            self.recusados += 1
+            raise FilaCheia(self.capacidade)
+        self._nao_gravados += 1
+        # outro pedido pode ter colocado o mesmo item no lote enquanto este esperava vaga
+        futuro = self._duplicado(item)
+        if futuro is not None:
+            self._nao_gravados -= 1
+            self._vagas.release()
+            return futuro
+
+        if self._futuro is None:
+            loop = asyncio.get_running_loop()
+            self._futuro = loop.create_future()
+            self._futuro.add_done_callback(_recuperar_excecao)
+            self._timer = loop.call_later(self.janela, self._disparar)
+        self._lote[item] = None
+        futuro = self._futuro
+        if len(self._lote) >= self.tamanho_lote:
+            self._disparar()
+        return futuro
+
+    def _disparar(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        itens, futuro = list(self._lote), self._futuro
+        self._lote, self._futuro = {}, None
+        if itens:
+            tarefa = asyncio.get_running_loop().create_task(self._gravar(itens, futuro))
+            self._tarefas.add(tarefa)
+            tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _gravar(self, itens: List[Hashable], futuro: asyncio.Future):
+        self.lotes += 1
+        try:
+            resultado = await self.gravar_lote(itens)
+        except Exception as e:
+            self.erros += 1
+            print(f"❌ Lote da fila de escrita com {len(itens)} itens falhou: {e}")
+            if not futuro.done():
+                futuro.set_exception(e)
+        else:
+            self.itens_gravados += len(itens)
+            if not futuro.done():
+                futuro.set_result(resultado)
+        finally:
+            self._nao_gravados -= len(itens)
+            for _ in itens:
+                self._vagas.release()
+
+    async def descarregar(self):
+        """
+        Grava o lote aberto e espera todos os lotes em andamento (usado no shutdown)
+        """
+        self._disparar()
+        if self._tarefas:
+            await asyncio.gather(*self._tarefas, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "pedidos": self.pedidos,
+            "duplicados": self.duplicados,
+            "recusados": self.recusados,
+            "lotes": self.lotes,
+            "itens_gravados": self.itens_gravados,
+            "erros": self.erros,
+            "aguardando": len(self._lote),
+            "em_gravacao": self._nao_gravados - len(self._lote),
+            "itens_por_lote": round(self.itens_gravados / self.lotes, 2) if self.lotes else 0.0,
+        }
+
+
+async def _gravar_relacionamentos(pares: List[Tuple[int, int]]) -> int:
+    async with sessao() as db:
+        return await crud.criar_relacionamentos_em_lote(
+            db, [{"pessoa_id1": pessoa_id1, "pessoa_id2": pessoa_id2} for pessoa_id1, pessoa_id2 in pares]
+        )
+
+
+fila = FilaEscrita(_gravar_relacionamentos)
+
+
+async def criar_relacionamento(db, pessoa_id1: int, pessoa_id2: int, aguardar: bool = True) -> bool:
+    """
+    Mesmo contrato de crud.criar_relacionamento (False se alguma pessoa não existe), passando pela fila.
+    Com aguardar=False retorna assim que o pedido entra no lote.
+    """
+    if not ATIVO:
+        return await crud.criar_relacionamento(db=db, pessoa_id1=pessoa_id1, pessoa_id2=pessoa_id2)
+    # o lote ignora pares inexistentes em silêncio: a existência é conferida antes, numa leitura só
+    existentes = await crud.get_pessoas_por_ids(db=db, pessoa_ids=[pessoa_id1, pessoa_id2])
+    if len(existentes) < len({pessoa_id1, pessoa_id2}):
+        return False
+    futuro = await fila.adicionar((pessoa_id1, pessoa_id2))
+    if aguardar:
+        # shield: uma requisição cancelada não cancela a gravação do lote para os demais
+        await asyncio.shield(futuro)
+    return True
+
+
+async def parar():
+    await fila.descarregar()
+
+
+def stats() -> dict:
+    return {"ativo": ATIVO, "janela_ms": JANELA_S * 1000, "tamanho_lote": TAMANHO_LOTE,
+            "capacidade": CAPACIDADE, **fila.stats()}
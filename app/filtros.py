@@ -0,0 +1,77 @@
+"""
+Filtro estruturado de pessoas (GET /pessoas/filtro), no lugar da antiga /query-personalizada/.
+
+Cidade, interesses (modo any: algum deles; all: todos), faixa de idade, grau
+mínimo (pessoas que a pessoa CONHECE), ordenação e limite. No Neo4j o filtro
+vira um Cypher parametrizado (crud.filtrar_pessoas): os valores vão sempre
+como parâmetros e o texto só depende de quais filtros foram informados, a
+"forma". Cada forma gera um único texto, que o Neo4j planeja uma vez e reusa
+do seu cache de planos; o texto compilado de cada forma fica num LRU
+(FILTRO_CACHE_FORMAS).
+"""
+import os
+from typing import NamedTuple, Optional, Tuple
+
+from .cache import LRUCache
+
+# campo de ordenação -> expressão Cypher; "-campo" ordena do maior para o menor
+ORDENACOES = {"id": "p.pessoa_id", "nome": "p.nome", "idade": "p.idade", "grau": "grau"}
+PADRAO_ORDENAR = "^-?(" + "|".join(ORDENACOES) + ")$"
+MODOS = ("any", "all")
+MAX_INTERESSES = int(os.getenv("FILTRO_MAX_INTERESSES", "20"))
+# teto de linhas de uma resposta, inclusive em stream=true
+MAX_LINHAS = int(os.getenv("FILTRO_MAX_LINHAS", "10000"))
+CAPACIDADE_CACHE = int(os.getenv("FILTRO_CACHE_FORMAS", "256"))
+
+formas = LRUCache(CAPACIDADE_CACHE)
+
+
+class Filtro(NamedTuple):
+    cidade: Optional[str] = None
+    interesses: Tuple[str, ...] = ()
+    modo: str = "any"
+    idade_min: Optional[int] = None
+    idade_max: Optional[int] = None
+    grau_min: Optional[int] = None
+    ordenar: str = "id"
+
+    @property
+    def campo(self) -> str:
+        return self.ordenar.lstrip("-")
+
+    @property
+    def decrescente(self) -> bool:
+        return self.ordenar.startswith("-")
+
+    def forma(self) -> tuple:
+        """
+        Quais filtros estão presentes (não os valores): filtros com a mesma forma compartilham a query
+        """
+        return (self.cidade is not None, bool(self.interesses), self.modo if self.interesses else None,
+                self.idade_min is not None, self.idade_max is not None, self.grau_min is not None, self.ordenar)
+
+    def parametros(self) -> dict:
+        return {"cidade": self.cidade, "interesses": list(self.interesses), "idade_min": self.idade_min,
+                "idade_max": self.idade_max, "grau_min": self.grau_min}
+
+
+def criar(cidade: Optional[str] = None, interesses: Optional[str] = None, modo: str = "any",
+          idade_min: Optional[int] = None, idade_max: Optional[int] = None,
+          grau_min: Optional[int] = None, ordenar: str = "id") -> Filtro:
+    """
+    Filtro a partir dos parâmetros da rota (interesses separados por vírgula); ValueError se inválido
+    """
+    nomes = tuple(dict.fromkeys(i.strip() for i in (interesses or "").split(",") if i.strip()))
+    if len(nomes) > MAX_INTERESSES:
+        raise ValueError(f"No máximo {MAX_INTERESSES} interesses por filtro")
+    if modo not in MODOS:
+        raise ValueError(f"modo deve ser um de: {', '.join(MODOS)}")
+    if ordenar.lstrip("-") not in ORDENACOES:
+        raise ValueError(f"ordenar deve ser um de: {', '.join(ORDENACOES)} (com - para decrescente)")
+    if idade_min is not None and idade_max is not None and idade_min > idade_max:
+        raise ValueError("idade_min maior que idade_max")
+    return Filtro(cidade or None, nomes, modo, idade_min, idade_max, grau_min or None, ordenar)
+
+
+def stats() -> dict:
+    return {"max_linhas": MAX_LINHAS, **formas.stats()}
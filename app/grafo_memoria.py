@@ -0,0 +1,269 @@
+"""
+Grafo em memória: listas de adjacência em CSR (arrays de int32), registros de
+pessoa com __slots__ e índices invertidos de interesse e cidade.
+
+Usado como backend de testes/benchmark (GRAFO_BACKEND=memoria) e como réplica
+de leitura do Neo4j (GRAFO_BACKEND=replica).
+"""
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from .texto import termos
+
+
+class No:
+    __slots__ = ("pessoa_id", "nome", "idade", "cidade", "interesses")
+
+    def __init__(self, pessoa_id: int, nome: str, idade: int, cidade: Optional[str], interesses):
+        self.pessoa_id = pessoa_id
+        self.nome = nome
+        self.idade = idade
+        self.cidade = cidade
+        self.interesses = tuple(interesses or ())
+
+    def como_dict(self) -> dict:
+        return {
+            "id": self.pessoa_id,
+            "nome": self.nome,
+            "idade": self.idade,
+            "interesses": list(self.interesses),
+            "cidade": self.cidade,
+        }
+
+
+class CSR:
+    """
+    Vizinhança compacta: vizinhos de i em alvos[offsets[i]:offsets[i + 1]], em ordem crescente
+    """
+    __slots__ = ("offsets", "alvos")
+
+    def __init__(self, n_nos: int, origens: array, destinos: array):
+        contagem = array("i", bytes(4 * (n_nos + 1)))
+        for o in origens:
+            contagem[o + 1] += 1
+        for i in range(n_nos):
+            contagem[i + 1] += contagem[i]
+        self.offsets = contagem
+        posicao = array("i", contagem)
+        alvos = array("i", bytes(4 * len(destinos)))
+        for o, d in zip(origens, destinos):
+            alvos[posicao[o]] = d
+            posicao[o] += 1
+        # linhas ordenadas: saber se a aresta existe é uma busca binária
+        for i in range(n_nos):
+            inicio, fim = contagem[i], contagem[i + 1]
+            if fim - inicio > 1:
+                alvos[inicio:fim] = array("i", sorted(alvos[inicio:fim]))
+        self.alvos = alvos
+
+    @classmethod
+    def de_buffers(cls, offsets, alvos) -> "CSR":
+        """
+        CSR sobre buffers já prontos (memoryview de formato "i", ex.: um snapshot mapeado em memória), sem copiar;
+        as linhas já devem estar ordenadas
+        """
+        csr = cls.__new__(cls)
+        csr.offsets = offsets
+        csr.alvos = alvos
+        return csr
+
+    def vizinhos(self, i: int) -> memoryview:
+        if i + 1 >= len(self.offsets):
+            return memoryview(self.alvos)[0:0]
+        return memoryview(self.alvos)[self.offsets[i]:self.offsets[i + 1]]
+
+    def contem(self, i: int, j: int) -> bool:
+        linha = self.vizinhos(i)
+        k = bisect_left(linha, j)
+        return k < len(linha) and linha[k] == j
+
+
+class GrafoMemoria:
+    # arestas pendentes aceitas antes de reconstruir o CSR
+    LIMIAR_RECONSTRUCAO = 4096
+
+    def __init__(self):
+        self.nos: List[No] = []
+        self.indice: Dict[int, int] = {}
+        self.ids_ordenados: List[int] = []
+        self.por_interesse: Dict[str, List[int]] = defaultdict(list)
+        self.por_cidade: Dict[str, List[int]] = defaultdict(list)
+        # termos normalizados do nome (app/texto.py); a lista de termos é reordenada na próxima busca por prefixo
+        self.por_termo: Dict[str, List[int]] = defaultdict(list)
+        self._termos: List[str] = []
+        self._termos_ordenados = True
+        self.sequencia = 0
+
+        self._origens = array("i")
+        self._destinos = array("i")
+        self._saida: Optional[CSR] = None
+        self._entrada: Optional[CSR] = None
+        self._pendentes_saida: Dict[int, List[int]] = defaultdict(list)
+        self._pendentes_entrada: Dict[int, List[int]] = defaultdict(list)
+        self._n_pendentes = 0
+        # resultados de app/analises.py (no Neo4j ficam como propriedades das pessoas)
+        self.analises: Dict[int, dict] = {}
+        self.execucao_analise: Optional[dict] = None
+        self.trava_analise = {"em_execucao_desde": None, "erro": None}
+
+    # Compatível com o ciclo de vida de uma sessão do driver
+    async def close(self):
+        pass
+
+    @property
+    def total_relacionamentos(self) -> int:
+        return len(self._origens)
+
+    @classmethod
+    def de_csr(cls, nos: List[No], saida: CSR, entrada: CSR, origens: array, destinos: array) -> "GrafoMemoria":
+        """
+        Monta o grafo a partir de nós ordenados por pessoa_id e CSRs prontos (app/snapshot.py)
+        """
+        grafo = cls()
+        grafo.nos = nos
+        grafo.indice = {no.pessoa_id: i for i, no in enumerate(nos)}
+        grafo.ids_ordenados = [no.pessoa_id for no in nos]
+        grafo.sequencia = grafo.ids_ordenados[-1] if nos else 0
+        for i, no in enumerate(nos):
+            grafo._indexar(i, no)
+        grafo._origens, grafo._destinos = origens, destinos
+        grafo._saida, grafo._entrada = saida, entrada
+        return grafo
+
+    def no(self, pessoa_id: int) -> Optional[No]:
+        i = self.indice.get(pessoa_id)
+        return None if i is None else self.nos[i]
+
+    def proximo_id(self) -> int:
+        self.sequencia += 1
+        return self.sequencia
+
+    def adicionar_pessoa(self, nome: str, idade: int, interesses: Iterable[str] = (),
+                         cidade: Optional[str] = None, pessoa_id: Optional[int] = None) -> No:
+        """
+        Cria a pessoa ou, se o pessoa_id já existe, atualiza suas propriedades (MERGE)
+        """
+        if pessoa_id is None:
+            pessoa_id = self.proximo_id()
+        else:
+            self.sequencia = max(self.sequencia, pessoa_id)
+
+        i = self.indice.get(pessoa_id)
+        if i is not None:
+            no = self.nos[i]
+            self._desindexar(i, no)
+            no.nome, no.idade, no.cidade = nome, idade, cidade
+            no.interesses = tuple(interesses or ())
+        else:
+            i = len(self.nos)
+            no = No(pessoa_id, nome, idade, cidade, interesses)
+            self.nos.append(no)
+            self.indice[pessoa_id] = i
+            if not self.ids_ordenados or pessoa_id > self.ids_ordenados[-1]:
+                self.ids_ordenados.append(pessoa_id)
+            else:
+                insort(self.ids_ordenados, pessoa_id)
+        self._indexar(i, no)
+        return no
+
+    def _indexar(self, i: int, no: No):
+        for interesse in no.interesses:
+            self.por_interesse[interesse].append(i)
+        if no.cidade:
+            self.por_cidade[no.cidade].append(i)
+        for termo in set(termos(no.nome)):
+            if termo not in self.por_termo:
+                self._termos.append(termo)
+                self._termos_ordenados = False
+            self.por_termo[termo].append(i)
+
+    def _desindexar(self, i: int, no: No):
+        for interesse in no.interesses:
+            self.por_interesse[interesse].remove(i)
+        if no.cidade:
+            self.por_cidade[no.cidade].remove(i)
+        for termo in set(termos(no.nome)):
+            self.por_termo[termo].remove(i)
+
+    def adicionar_aresta(self, pessoa_id1: int, pessoa_id2: int) -> Optional[bool]:
+        """
+        Cria (p1)-[:CONHECE]->(p2): True se a aresta é nova, False se já existia (não é duplicada)
+        e None se alguma das pessoas não existe
+        """
+        a = self.indice.get(pessoa_id1)
+        b = self.indice.get(pessoa_id2)
+        if a is None or b is None:
+            return None
+        if self._tem_aresta(a, b):
+            return False
+        self._origens.append(a)
+        self._destinos.append(b)
+        self._pendentes_saida[a].append(b)
+        self._pendentes_entrada[b].append(a)
+        self._n_pendentes += 1
+        if self._n_pendentes > max(self.LIMIAR_RECONSTRUCAO, len(self._origens) // 8):
+            self.compactar()
+        return True
+
+    def compactar(self):
+        """
+        Reconstrói os CSRs de saída e entrada incorporando as arestas pendentes
+        """
+        n = len(self.nos)
+        self._saida = CSR(n, self._origens, self._destinos)
+        self._entrada = CSR(n, self._destinos, self._origens)
+        self._pendentes_saida.clear()
+        self._pendentes_entrada.clear()
+        self._n_pendentes = 0
+
+    def _tem_aresta(self, a: int, b: int) -> bool:
+        """
+        Busca binária na linha do CSR de saída, depois nas poucas arestas pendentes de a
+        """
+        if self._saida is not None and self._saida.contem(a, b):
+            return True
+        return b in self._pendentes_saida.get(a, ())
+
+    def _vizinhos(self, csr: Optional[CSR], pendentes: Dict[int, List[int]], i: int) -> List[int]:
+        base = list(csr.vizinhos(i)) if csr is not None else []
+        extra = pendentes.get(i)
+        return base + extra if extra else base
+
+    def saida(self, i: int) -> List[int]:
+        return self._vizinhos(self._saida, self._pendentes_saida, i)
+
+    def entrada(self, i: int) -> List[int]:
+        return self._vizinhos(self._entrada, self._pendentes_entrada, i)
+
+    def vizinhos(self, i: int) -> set:
+        """
+        Vizinhança sem direção, como em (p)-[:CONHECE]-(q)
+        """
+        return set(self.saida(i)) | set(self.entrada(i))
+
+    def com_prefixo(self, prefixo: str) -> Set[int]:
+        """
+        Índices das pessoas com algum termo do nome começando por `prefixo` (já normalizado)
+        """
+        if not self._termos_ordenados:
+            self._termos.sort()
+            self._termos_ordenados = True
+        encontrados = set()
+        for posicao in range(bisect_left(self._termos, prefixo), len(self._termos)):
+            termo = self._termos[posicao]
+            if not termo.startswith(prefixo):
+                break
+            encontrados.update(self.por_termo[termo])
+        return encontrados
+
+    def conectados(self, a: int, b: int) -> bool:
+        return self._tem_aresta(a, b) or self._tem_aresta(b, a)
+
+    def ids_a_partir(self, after_id: Optional[int], limite: int) -> List[int]:
+        """
+        Até `limite` pessoa_ids depois de after_id, sem copiar o resto da lista
+        """
+        inicio = 0 if after_id is None else bisect_right(self.ids_ordenados, after_id)
+        return self.ids_ordenados[inicio:inicio + limite]
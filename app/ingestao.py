@@ -0,0 +1,123 @@
+"""
+Importação em massa: lê JSON ou NDJSON da requisição e grava em lotes UNWIND
+"""
+import json
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Type
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+from .database import sessao
+
+TAMANHO_LOTE_PADRAO = int(os.getenv("BULK_TAMANHO_LOTE", "1000"))
+TAMANHO_LOTE_MAXIMO = int(os.getenv("BULK_TAMANHO_LOTE_MAXIMO", "10000"))
+MAX_ERROS_REPORTADOS = 100
+
+TIPOS_NDJSON = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+async def _linhas_ndjson(request: Request) -> AsyncIterator[tuple]:
+    buffer = b""
+    numero = 0
+    async for pedaco in request.stream():
+        buffer += pedaco
+        *linhas, buffer = buffer.split(b"\n")
+        for linha in linhas:
+            numero += 1
+            if linha.strip():
+                yield numero, linha
+    if buffer.strip():
+        yield numero + 1, buffer
+
+
+async def ler_registros(request: Request) -> AsyncIterator[tuple]:
+    """
+    Produz (número da linha, objeto) a partir de um array JSON ou de um stream NDJSON
+    """
+    tipo = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if tipo in TIPOS_NDJSON:
+        async for numero, linha in _linhas_ndjson(request):
+            try:
+                yield numero, json.loads(linha)
+            except ValueError as e:
+                yield numero, e
+        return
+
+    try:
+        dados = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Corpo deve ser um array JSON ou NDJSON")
+    if not isinstance(dados, list):
+        raise HTTPException(status_code=400, detail="Corpo deve ser um array JSON ou NDJSON")
+    for numero, item in enumerate(dados, start=1):
+        yield numero, item
+
+
+async def importar(
+    registros: AsyncIterator[tuple],
+    esquema: Type[BaseModel],
+    gravar_lote: Callable[..., Awaitable[int]],
+    tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+) -> dict:
+    """
+    Valida cada registro, agrupa em lotes e grava cada lote em uma transação própria.
+    Um lote com erro não interrompe os seguintes.
+    """
+    inicio = time.perf_counter()
+    lotes = []
+    erros = []
+    total_erros = 0
+    recebidos = 0
+    escritos = 0
+    pendentes: List[dict] = []
+
+    def registrar_erro(erro: dict):
+        nonlocal total_erros
+        total_erros += 1
+        if len(erros) < MAX_ERROS_REPORTADOS:
+            erros.append(erro)
+
+    async def descarregar():
+        nonlocal escritos
+        numero_lote = len(lotes) + 1
+        inicio_lote = time.perf_counter()
+        relatorio = {"lote": numero_lote, "linhas": len(pendentes), "escritos": 0, "erro": None}
+        try:
+            async with sessao() as db:
+                relatorio["escritos"] = await gravar_lote(db, list(pendentes))
+        except Exception as e:
+            relatorio["erro"] = str(e)
+            registrar_erro({"lote": numero_lote, "erro": str(e)})
+        relatorio["duracao_ms"] = round((time.perf_counter() - inicio_lote) * 1000, 2)
+        escritos += relatorio["escritos"]
+        lotes.append(relatorio)
+        pendentes.clear()
+        print(f"📦 Lote {numero_lote}: {relatorio['escritos']}/{relatorio['linhas']} gravados"
+              + (f" (erro: {relatorio['erro']})" if relatorio["erro"] else ""))
+
+    async for numero, item in registros:
+        recebidos += 1
+        if isinstance(item, Exception):
+            registrar_erro({"linha": numero, "erro": f"JSON inválido: {item}"})
+            continue
+        try:
+            pendentes.append(esquema.model_validate(item).model_dump())
+        except ValidationError as e:
+            registrar_erro({"linha": numero, "erro": e.errors(include_url=False, include_context=False)})
+            continue
+        if len(pendentes) >= tamanho_lote:
+            await descarregar()
+
+    if pendentes:
+        await descarregar()
+
+    return {
+        "recebidos": recebidos,
+        "escritos": escritos,
+        "total_erros": total_erros,
+        "duracao_ms": round((time.perf_counter() - inicio) * 1000, 2),
+        "lotes": lotes,
+        "erros": erros,
+    }
@@ -1,18 +1,36 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Path, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from typing import List
+from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse
+from typing import List, Optional
+from urllib.parse import urlencode
 import os
-from . import crud, schemas, database
-from .database import get_db
+from . import (
+    alteracoes, analises, busca, cache_respostas, caminhos, ciclo_de_vida, coalescedor, schemas, database,
+    estaticos, estatisticas, fila_relacionamentos, filtros, ingestao, metricas, recomendacoes, rede, similaridade,
+)
+from .backends import crud
+from .database import HEADER_BOOKMARKS, bookmarks_da_requisicao, definir_bookmarks, get_db, sessao
+from .paginacao import (
+    HEADER_PROXIMO_CURSOR, LIMITE_MAXIMO, LIMITE_PADRAO,
+    definir_proximo_cursor, resposta_ndjson,
+)
 
 app = FastAPI(
     title="Relationship Manager API",
     description="API para gerenciar pessoas e relacionamentos usando Neo4j",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    # conexão, migrações, aquecimento e índices em memória: uma única vez, encerrados no shutdown
+    lifespan=ciclo_de_vida.lifespan,
 )
 
+# Os dicts do crud já saem no formato dos schemas (projeções de mapa no Cypher): com
+# VALIDAR_RESPOSTAS=false as leituras vão direto para o orjson, sem revalidar cada item
+VALIDAR_RESPOSTAS = os.getenv("VALIDAR_RESPOSTAS", "true").lower() in ("1", "true", "yes", "sim")
+
+# Cache de respostas das rotas de leitura (registrado antes do CORS para ficar por dentro dele)
+app.add_middleware(cache_respostas.MiddlewareCache)
+
 # Configuração CORS para desenvolvimento
 app.add_middleware(
     CORSMiddleware,
@@ -20,16 +38,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[HEADER_PROXIMO_CURSOR, "Link", "X-Rede-Truncada", "ETag", "X-Cache", HEADER_BOOKMARKS],
 )
 
-# Servir arquivos estáticos do frontend
+# Latência por rota para /metrics (mais externo: inclui cache e CORS)
+app.add_middleware(metricas.MiddlewareMetricas)
+
+# Servir arquivos estáticos do frontend (com cache e variantes .br/.gz geradas por app/estaticos.py)
 frontend_path = os.path.join(os.path.dirname(__file__), "..", "frontend")
 if os.path.exists(frontend_path):
-    app.mount("/static", StaticFiles(directory=frontend_path), name="static")
-
-@app.on_event("startup")
-async def startup_event():
-    await database.init_db()
+    app.mount("/static", estaticos.EstaticosComprimidos(directory=frontend_path, html=True), name="static")
 
 # Rota para servir o frontend
 @app.get("/")
@@ -39,62 +57,298 @@ async def read_index():
         return FileResponse(index_path)
     return {"message": "Frontend não encontrado. Execute o backend e frontend separadamente."}
 
-@app.on_event("startup")
-async def startup_event():
-    await database.init_db()
+@app.get("/healthz")
+async def liveness():
+    """
+    Liveness: o processo está de pé e o loop responde (não depende do banco)
+    """
+    return {"status": "ok", "fase": ciclo_de_vida.estado["fase"]}
 
+@app.get("/readyz")
+async def readiness():
+    """
+    Readiness: inicialização concluída (planos aquecidos, índices carregados) e banco acessível
+    """
+    estado = await ciclo_de_vida.prontidao()
+    if not estado["pronto"]:
+        return ORJSONResponse(estado, status_code=503)
+    return estado
 
 @app.post("/pessoas/", response_model=schemas.Pessoa)
-async def criar_pessoa(pessoa: schemas.PessoaCreate, db=Depends(get_db)):
-    return await crud.criar_pessoa(db=db, pessoa=pessoa)
+async def criar_pessoa(pessoa: schemas.PessoaCreate, response: Response, db=Depends(get_db)):
+    criada = await crud.criar_pessoa(db=db, pessoa=pessoa)
+    await definir_bookmarks(response)
+    return criada
 
+@app.post("/pessoas/bulk")
+async def importar_pessoas(
+    request: Request,
+    response: Response,
+    tamanho_lote: int = Query(ingestao.TAMANHO_LOTE_PADRAO, ge=1, le=ingestao.TAMANHO_LOTE_MAXIMO),
+):
+    """
+    Importa pessoas de um array JSON ou stream NDJSON em lotes (MERGE por id, idempotente)
+    """
+    relatorio = await ingestao.importar(
+        ingestao.ler_registros(request), schemas.PessoaImportacao,
+        crud.criar_pessoas_em_lote, tamanho_lote=tamanho_lote,
+    )
+    await definir_bookmarks(response)
+    return relatorio
+
+@app.post("/relacionamentos/bulk")
+async def importar_relacionamentos(
+    request: Request,
+    response: Response,
+    tamanho_lote: int = Query(ingestao.TAMANHO_LOTE_PADRAO, ge=1, le=ingestao.TAMANHO_LOTE_MAXIMO),
+):
+    """
+    Importa relacionamentos CONHECE de um array JSON ou stream NDJSON em lotes (MERGE, idempotente)
+    """
+    relatorio = await ingestao.importar(
+        ingestao.ler_registros(request), schemas.RelacionamentoCreate,
+        crud.criar_relacionamentos_em_lote, tamanho_lote=tamanho_lote,
+    )
+    await definir_bookmarks(response)
+    return relatorio
+
+async def _stream_sessao(request: Request, iterador, **kwargs):
+    # a sessão do stream é aberta fora do get_db: os bookmarks do cliente vão junto (read-your-writes)
+    async with sessao(leitura=True, bookmarks=bookmarks_da_requisicao(request)) as db:
+        async for item in iterador(db=db, **kwargs):
+            yield item
+
+def _sem_validacao(conteudo, response: Response):
+    """
+    Resposta já serializada, mantendo os headers definidos na rota (cursor, Link...)
+    """
+    if VALIDAR_RESPOSTAS:
+        return conteudo
+    return ORJSONResponse(conteudo, headers=response.headers)
+
+def _parse_ids(ids: str) -> List[int]:
+    try:
+        pessoa_ids = list(dict.fromkeys(int(i) for i in ids.split(",") if i.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids deve ser uma lista de inteiros separados por vírgula")
+    if len(pessoa_ids) > LIMITE_MAXIMO:
+        raise HTTPException(status_code=400, detail=f"No máximo {LIMITE_MAXIMO} ids por requisição")
+    return pessoa_ids
+
+@app.get("/pessoas", response_model=List[schemas.Pessoa], include_in_schema=False)
 @app.get("/pessoas/", response_model=List[schemas.Pessoa])
-async def listar_pessoas(db=Depends(get_db)):
-    return await crud.get_pessoas(db=db)
+async def listar_pessoas(
+    request: Request,
+    response: Response,
+    after: Optional[str] = None,
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    stream: bool = False,
+    ids: Optional[str] = None,
+    db=Depends(get_db),
+):
+    """
+    Lista pessoas paginadas por cursor (header X-Next-Cursor) ou, com stream=true, todas em NDJSON.
+    Com ids=1,2,3 busca essas pessoas em uma única consulta (ids inexistentes são omitidos).
+    """
+    if ids is not None:
+        return _sem_validacao(await crud.get_pessoas_por_ids(db=db, pessoa_ids=_parse_ids(ids)), response)
+    if stream:
+        return resposta_ndjson(_stream_sessao(request, crud.iter_pessoas))
+    pessoas, cursor = await crud.get_pessoas(db=db, after=after, limit=limit)
+    definir_proximo_cursor(response, request, cursor)
+    return _sem_validacao(pessoas, response)
+
+@app.get("/pessoas/filtro/stats")
+async def estatisticas_filtro():
+    """
+    Cache de formas compiladas do filtro (declarada antes de /pessoas/{pessoa_id})
+    """
+    return filtros.stats()
+
+@app.get("/pessoas/filtro", response_model=List[schemas.PessoaFiltrada])
+async def filtrar_pessoas(
+    request: Request,
+    response: Response,
+    cidade: Optional[str] = None,
+    interesses: Optional[str] = None,
+    modo: str = Query("any", pattern="^(any|all)$"),
+    idade_min: Optional[int] = Query(None, ge=0),
+    idade_max: Optional[int] = Query(None, ge=0),
+    grau_min: Optional[int] = Query(None, ge=0),
+    ordenar: str = Query("id", pattern=filtros.PADRAO_ORDENAR),
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=filtros.MAX_LINHAS),
+    stream: bool = False,
+    db=Depends(get_db),
+):
+    """
+    Pessoas por cidade, interesses (interesses=a,b com modo any ou all), faixa de idade e grau mínimo,
+    com o grau de cada uma. ordenar: id, nome, idade ou grau (-grau para decrescente).
+    Acima de PAGINACAO_LIMITE_MAXIMO linhas, só com stream=true (NDJSON).
+    """
+    try:
+        filtro = filtros.criar(cidade=cidade, interesses=interesses, modo=modo, idade_min=idade_min,
+                               idade_max=idade_max, grau_min=grau_min, ordenar=ordenar)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if stream:
+        return resposta_ndjson(_stream_sessao(request, crud.iter_filtrar_pessoas, filtro=filtro, limite=limit))
+    if limit > LIMITE_MAXIMO:
+        raise HTTPException(status_code=400, detail=f"limit acima de {LIMITE_MAXIMO} só com stream=true")
+    return _sem_validacao(await crud.filtrar_pessoas(db=db, filtro=filtro, limite=limit), response)
+
+@app.get("/pessoas/busca/cache/stats")
+async def estatisticas_busca():
+    """
+    Hits/misses do cache de prefixos da busca (declarada antes de /pessoas/{pessoa_id})
+    """
+    return busca.stats()
+
+@app.get("/pessoas/busca", response_model=List[schemas.Pessoa])
+async def buscar_pessoas_por_nome(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=busca.MAX_LIMITE),
+    db=Depends(get_db),
+):
+    """
+    Typeahead: pessoas cujo nome tem termos começando com cada termo de q, sem diferenciar acentos
+    e maiúsculas. Nomes com termos exatos e mais curtos vêm primeiro.
+    """
+    return _sem_validacao(await busca.buscar(db=db, q=q, limite=limit), response)
 
 @app.get("/pessoas/{pessoa_id}", response_model=schemas.Pessoa)
-async def buscar_pessoa(pessoa_id: int, db=Depends(get_db)):
-    pessoa = await crud.get_pessoa(db=db, pessoa_id=pessoa_id)
+async def buscar_pessoa(pessoa_id: int, request: Request, response: Response, db=Depends(get_db)):
+    pessoa = await coalescedor.get_pessoa(db=db, pessoa_id=pessoa_id, bookmarks=bookmarks_da_requisicao(request))
     if pessoa is None:
         raise HTTPException(status_code=404, detail="Pessoa não encontrada")
-    return pessoa
+    return _sem_validacao(pessoa, response)
 
 @app.post("/pessoas/{pessoa_id1}/conhece/{pessoa_id2}")
-async def criar_relacionamento(pessoa_id1: int, pessoa_id2: int, db=Depends(get_db)):
-    success = await crud.criar_relacionamento(db=db, pessoa_id1=pessoa_id1, pessoa_id2=pessoa_id2)
+async def criar_relacionamento(
+    pessoa_id1: int,
+    pessoa_id2: int,
+    response: Response,
+    aguardar: bool = True,
+    db=Depends(get_db),
+):
+    """
+    Cria (ou mantém) o relacionamento. Com a fila write-behind ativa e aguardar=false,
+    responde 202 assim que o pedido entra no lote.
+    """
+    try:
+        success = await fila_relacionamentos.criar_relacionamento(
+            db=db, pessoa_id1=pessoa_id1, pessoa_id2=pessoa_id2, aguardar=aguardar,
+        )
+    except fila_relacionamentos.FilaCheia as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     if not success:
         raise HTTPException(status_code=400, detail="Não foi possível criar o relacionamento")
+    if fila_relacionamentos.ATIVO and not aguardar:
+        response.status_code = 202
+        return {"message": "Relacionamento enfileirado"}
+    await definir_bookmarks(response)
     return {"message": "Relacionamento criado com sucesso"}
 
 @app.get("/pessoas/{pessoa_id}/amigos", response_model=List[schemas.Pessoa])
-async def listar_amigos(pessoa_id: int, db=Depends(get_db)):
-    return await crud.get_amigos(db=db, pessoa_id=pessoa_id)
+async def listar_amigos(
+    pessoa_id: int,
+    request: Request,
+    response: Response,
+    after: Optional[str] = None,
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    stream: bool = False,
+    db=Depends(get_db),
+):
+    if stream:
+        return resposta_ndjson(_stream_sessao(request, crud.iter_amigos, pessoa_id=pessoa_id))
+    if after is None:
+        amigos, cursor = await coalescedor.get_amigos(db=db, pessoa_id=pessoa_id, limit=limit,
+                                                      bookmarks=bookmarks_da_requisicao(request))
+    else:
+        amigos, cursor = await crud.get_amigos(db=db, pessoa_id=pessoa_id, after=after, limit=limit)
+    definir_proximo_cursor(response, request, cursor)
+    return _sem_validacao(amigos, response)
 
-@app.get("/recomendacoes/{pessoa_id}", response_model=List[schemas.Pessoa])
-async def recomendar_amigos(pessoa_id: int, db=Depends(get_db)):
-    return await crud.recomendar_amigos(db=db, pessoa_id=pessoa_id)
+@app.get("/recomendacoes/cache/stats")
+async def estatisticas_recomendacoes():
+    """
+    Hits/misses do cache de recomendações (declarada antes de /recomendacoes/{pessoa_id})
+    """
+    return recomendacoes.stats()
+
+@app.get("/recomendacoes/{pessoa_id}", response_model=List[schemas.Recomendacao])
+async def recomendar_amigos(
+    pessoa_id: int,
+    limit: int = Query(5, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    db=Depends(get_db),
+):
+    """
+    Amigos de amigos ordenados por amigos em comum (e, se configurado, interesses e cidade)
+    """
+    return await recomendacoes.get_recomendacoes(db=db, pessoa_id=pessoa_id, limit=limit, offset=offset)
 
 
 @app.get("/pessoas/{pessoa_id}/rede/{profundidade}")
-async def rede_social(pessoa_id: int, profundidade: int = 2, db=Depends(get_db)):
+async def rede_social(
+    pessoa_id: int,
+    request: Request,
+    response: Response,
+    profundidade: int = Path(ge=1, le=rede.PROFUNDIDADE_MAXIMA),
+    stream: bool = False,
+    db=Depends(get_db),
+):
     """
-    Mostra toda a rede social de uma pessoa até a profundidade especificada
+    Mostra toda a rede social de uma pessoa até a profundidade especificada, com a distância de cada uma.
+    Com stream=true envia um nível por linha (NDJSON) assim que ele é calculado.
     """
-    return await crud.get_rede_social(db=db, pessoa_id=pessoa_id, profundidade=profundidade)
+    if stream:
+        return resposta_ndjson(_stream_sessao(request, rede.iter_niveis, pessoa_id=pessoa_id, profundidade=profundidade))
+    pessoas, truncado = await rede.get_rede_social(db=db, pessoa_id=pessoa_id, profundidade=profundidade)
+    if truncado:
+        response.headers["X-Rede-Truncada"] = "true"
+    return pessoas
 
 @app.get("/pessoas/interesse/{interesse}")
-async def buscar_por_interesse(interesse: str, db=Depends(get_db)):
+async def buscar_por_interesse(
+    interesse: str,
+    request: Request,
+    response: Response,
+    after: Optional[str] = None,
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    stream: bool = False,
+    db=Depends(get_db),
+):
     """
     Encontra pessoas por interesse em comum
     """
-    return await crud.get_pessoas_por_interesse(db=db, interesse=interesse)
+    if stream:
+        return resposta_ndjson(_stream_sessao(request, crud.iter_pessoas_por_interesse, interesse=interesse))
+    pessoas, cursor = await crud.get_pessoas_por_interesse(db=db, interesse=interesse,
+                                                           after=after, limit=limit)
+    definir_proximo_cursor(response, request, cursor)
+    return _sem_validacao(pessoas, response)
 
 @app.get("/caminho/{pessoa_id1}/{pessoa_id2}")
-async def caminho_entre_pessoas(pessoa_id1: int, pessoa_id2: int, db=Depends(get_db)):
+async def caminho_entre_pessoas(
+    pessoa_id1: int,
+    pessoa_id2: int,
+    k: int = Query(1, ge=1, le=caminhos.MAXIMO_CAMINHOS),
+    todos: bool = False,
+    profundidade_maxima: int = Query(caminhos.PROFUNDIDADE_MAXIMA, ge=1, le=caminhos.PROFUNDIDADE_MAXIMA),
+    db=Depends(get_db),
+):
     """
-    Encontra o caminho mais curto entre duas pessoas
+    Encontra o caminho mais curto entre duas pessoas (busca bidirecional limitada).
+    Com k > 1 ou todos=true retorna também os demais caminhos mínimos, com ids.
     """
-    resultado = await crud.get_caminho_entre_pessoas(db=db, pessoa_id1=pessoa_id1, pessoa_id2=pessoa_id2)
+    if todos:
+        k = caminhos.MAXIMO_CAMINHOS
+    try:
+        resultado = await caminhos.get_caminho(db=db, pessoa_id1=pessoa_id1, pessoa_id2=pessoa_id2,
+                                               k=k, profundidade_maxima=profundidade_maxima)
+    except caminhos.LimiteVisitadosExcedido as e:
+        raise HTTPException(status_code=422, detail=str(e))
     if resultado is None:
         raise HTTPException(status_code=404, detail="Caminho não encontrado entre as pessoas")
     return resultado
@@ -102,45 +356,144 @@ async def caminho_entre_pessoas(pessoa_id1: int, pessoa_id2: int, db=Depends(get
 @app.get("/estatisticas/")
 async def estatisticas_rede(db=Depends(get_db)):
     """
-    Mostra estatísticas gerais da rede social
+    Mostra estatísticas gerais da rede social (mantidas em memória, com horário de atualização)
     """
-    return await crud.get_estatisticas_rede(db=db)
+    return await estatisticas.get_estatisticas_rede(db=db)
+
+@app.get("/database/pool")
+async def estatisticas_pool():
+    """
+    Uso do pool de conexões com o Neo4j neste worker
+    """
+    return database.database.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def exportar_metricas():
+    """
+    Métricas no formato texto do Prometheus
+    """
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/perfis")
+async def perfis_queries_lentas():
+    """
+    Planos PROFILE das queries de leitura mais lentas que METRICAS_PROFILE_MS
+    """
+    return list(metricas.perfis)
+
+@app.get("/cache/stats")
+async def estatisticas_cache():
+    """
+    Hits/misses e ocupação do cache de respostas deste worker
+    """
+    return cache_respostas.stats()
+
+@app.get("/database/fila-relacionamentos")
+async def estatisticas_fila_relacionamentos():
+    """
+    Pedidos, lotes e ocupação da fila write-behind de relacionamentos
+    """
+    return fila_relacionamentos.stats()
+
+@app.get("/database/coalescedor")
+async def estatisticas_coalescedor():
+    """
+    Pedidos individuais agrupados em lotes pelo coalescedor de leituras
+    """
+    return coalescedor.stats()
+
+@app.get("/eventos/stats")
+async def estatisticas_feed():
+    return alteracoes.stats()
+
+@app.get("/eventos")
+async def feed_alteracoes(last_event_id: Optional[str] = Header(None), desde: Optional[str] = None):
+    """
+    Server-Sent Events: pessoa, relacionamento, estatisticas e reset. A reconexão retoma a partir
+    do header Last-Event-ID (ou de ?desde=).
+    """
+    try:
+        cliente = alteracoes.conectar(last_event_id or desde)
+    except (alteracoes.FeedLotado, alteracoes.FeedIndisponivel) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return StreamingResponse(
+        alteracoes.transmitir(cliente),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: o nginx repassa cada lote assim que ele é enviado
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/pessoas/{pessoa_id}/similares")
-async def pessoas_similares(pessoa_id: int, db=Depends(get_db)):
-    """
-    Encontra pessoas com interesses similares
-    """
-    return await crud.get_pessoas_similares(db=db, pessoa_id=pessoa_id)
-
-@app.get("/query-personalizada/")
-async def query_personalizada(db=Depends(get_db)):
-    """
-    Exemplo de query complexa: Pessoas de SP que gostam de música e seus amigos
-    """
-    query = """
-    MATCH (p:Pessoa)
-    WHERE p.cidade = 'São Paulo' AND 'música' IN p.interesses
-    OPTIONAL MATCH (p)-[:CONHECE]->(amigo:Pessoa)
-    RETURN p.nome as pessoa, 
-           p.interesses as interesses,
-           collect(amigo.nome) as amigos
-    ORDER BY size(amigos) DESC
-    """
-    
-    session = db
-    result = await session.run(query)
-    records = await result.values()
-    
-    resultados = []
-    for record in records:
-        resultados.append({
-            "pessoa": record[0],
-            "interesses": record[1],
-            "amigos": record[2] if record[2] else []
-        })
-    
-    return resultados
+async def pessoas_similares(pessoa_id: int, limit: int = Query(5, ge=1, le=50), db=Depends(get_db)):
+    """
+    Encontra pessoas com interesses similares (índice em memória, com score de Jaccard)
+    """
+    return await similaridade.get_pessoas_similares(db=db, pessoa_id=pessoa_id, limit=limit)
+
+@app.post("/analises/executar", status_code=202)
+async def executar_analises():
+    """
+    Calcula PageRank, comunidades e centralidade de grau em segundo plano e grava nas pessoas
+    """
+    try:
+        await analises.disparar()
+    except analises.AnaliseEmExecucao as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"message": "Análise iniciada", "status": "/analises/"}
+
+@app.get("/analises/")
+async def execucao_analises(db=Depends(get_db)):
+    """
+    Estado da análise (em qualquer worker) e resumo da última execução (durações de cada fase)
+    """
+    return await analises.get_execucao(db=db)
+
+@app.get("/analises/influenciadores")
+async def influenciadores(limit: int = Query(10, ge=1, le=100), db=Depends(get_db)):
+    """
+    Pessoas de maior PageRank na última análise
+    """
+    return await crud.get_influenciadores(db=db, limite=limit)
+
+@app.get("/analises/comunidades")
+async def comunidades(db=Depends(get_db)):
+    """
+    Maiores comunidades encontradas na última análise
+    """
+    resultado = await analises.get_comunidades(db=db)
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Nenhuma análise executada")
+    return resultado
+
+@app.get("/analises/comunidades/{comunidade}")
+async def membros_comunidade(comunidade: int, limit: int = Query(50, ge=1, le=1000), db=Depends(get_db)):
+    """
+    Membros de uma comunidade, do maior para o menor PageRank
+    """
+    return await crud.get_membros_comunidade(db=db, comunidade=comunidade, limite=limit)
+
+@app.get("/pessoas/{pessoa_id}/comunidade")
+async def comunidade_pessoa(pessoa_id: int, limit: int = Query(20, ge=0, le=1000), db=Depends(get_db)):
+    """
+    PageRank, grau e comunidade da pessoa, com os principais membros da comunidade
+    """
+    pessoa = await crud.get_analise_pessoa(db=db, pessoa_id=pessoa_id)
+    if pessoa is None:
+        raise HTTPException(status_code=404, detail="Pessoa não encontrada")
+    if pessoa["comunidade"] is None:
+        raise HTTPException(status_code=404, detail="Pessoa ainda não analisada")
+    membros = await crud.get_membros_comunidade(db=db, comunidade=pessoa["comunidade"], limite=limit) if limit else []
+    return {**pessoa, "membros": membros}
+
+@app.get("/query-personalizada/", deprecated=True)
+async def query_personalizada():
+    """
+    Substituída por /pessoas/filtro: redireciona para o filtro equivalente (SP, música, mais conexões primeiro)
+    """
+    return RedirectResponse(
+        "/pessoas/filtro?" + urlencode({"cidade": "São Paulo", "interesses": "música", "ordenar": "-grau"}),
+        status_code=307,
+    )
 
 
 
@@ -0,0 +1,365 @@
+"""
+Métricas de latência exportadas em /metrics no formato texto do Prometheus.
+
+- http_*: latência e contagem de status por rota (template do path, não o path
+  concreto), registradas por MiddlewareMetricas.
+- neo4j_query_*: cada session.run / tx.run é medido por SessaoInstrumentada,
+  com o nome que quem executa a query declara em nomear_query (os helpers do
+  crud recebem o nome da função, ex.: "crud.get_amigos"), e registra o tempo no
+  cliente, os tempos do servidor (result_available_after + result_consumed_after
+  do summary) e as linhas retornadas.
+
+Com METRICAS_PROFILE_MS > 0, leituras mais lentas que o limite são repetidas
+com PROFILE numa sessão à parte e o plano fica disponível em /metrics/perfis.
+"""
+import asyncio
+import os
+import re
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.routing import Match
+
+BUCKETS_HTTP = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_QUERY = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+PROFILE_MS = float(os.getenv("METRICAS_PROFILE_MS", "0"))
+# intervalo mínimo entre dois PROFILE da mesma query
+PROFILE_INTERVALO_S = float(os.getenv("METRICAS_PROFILE_INTERVALO_S", "300"))
+PERFIS_GUARDADOS = 50
+
+_ESCRITA = re.compile(r"\b(CREATE|MERGE|SET|DELETE|REMOVE|DROP|LOAD\s+CSV|FOREACH)\b", re.IGNORECASE)
+
+
+def _rotulos(nomes: Tuple[str, ...], valores: Tuple) -> str:
+    if not nomes:
+        return ""
+    pares = []
+    for nome, valor in zip(nomes, valores):
+        valor = str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pares.append(f'{nome}="{valor}"')
+    return "{" + ",".join(pares) + "}"
+
+
+class Contador:
+    def __init__(self, nome: str, ajuda: str, rotulos: Iterable[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.valores: Dict[Tuple, float] = defaultdict(float)
+
+    def inc(self, *valores_rotulos, valor: float = 1.0):
+        self.valores[valores_rotulos] += valor
+
+    def exportar(self) -> List[str]:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        for chave, valor in sorted(self.valores.items()):
+            linhas.append(f"{self.nome}{_rotulos(self.rotulos, chave)} {valor:g}")
+        return linhas
+
+
+class Histograma:
+    def __init__(self, nome: str, ajuda: str, rotulos: Iterable[str] = (), buckets=BUCKETS_HTTP):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.buckets = tuple(buckets)
+        # rótulos -> [contagem por bucket..., soma, total]
+        self.series: Dict[Tuple, list] = {}
+
+    def observar(self, valor: float, *valores_rotulos):
+        serie = self.series.get(valores_rotulos)
+        if serie is None:
+            serie = self.series[valores_rotulos] = [0] * len(self.buckets) + [0.0, 0]
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                serie[i] += 1
+                break
+        serie[-2] += valor
+        serie[-1] += 1
+
+    def exportar(self) -> List[str]:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        for chave, serie in sorted(self.series.items()):
+            acumulado = 0
+            for limite, quantidade in zip(self.buckets, serie):
+                acumulado += quantidade
+                rotulos = _rotulos(self.rotulos + ("le",), chave + (f"{limite:g}",))
+                linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulos + ('le',), chave + ('+Inf',))} {serie[-1]}")
+            linhas.append(f"{self.nome}_sum{_rotulos(self.rotulos, chave)} {serie[-2]:.6f}")
+            linhas.append(f"{self.nome}_count{_rotulos(self.rotulos, chave)} {serie[-1]}")
+        return linhas
+
+
+http_requisicoes = Contador("http_requisicoes_total", "Requisições HTTP por rota e status",
+                            ("metodo", "rota", "status"))
+http_duracao = Histograma("http_requisicao_duracao_segundos", "Latência das requisições HTTP",
+                          ("metodo", "rota"))
+query_duracao = Histograma("neo4j_query_duracao_segundos", "Tempo da query no cliente (run até consumir)",
+                           ("query",), BUCKETS_QUERY)
+query_servidor = Histograma("neo4j_query_servidor_segundos",
+                            "Tempo no servidor: result_available_after + result_consumed_after",
+                            ("query",), BUCKETS_QUERY)
+query_linhas = Contador("neo4j_query_linhas_total", "Linhas retornadas por query", ("query",))
+query_erros = Contador("neo4j_query_erros_total", "Queries que falharam", ("query",))
+
+METRICAS = [http_requisicoes, http_duracao, query_duracao, query_servidor, query_linhas, query_erros]
+
+perfis: deque = deque(maxlen=PERFIS_GUARDADOS)
+_ultimo_profile: Dict[str, float] = {}
+_tarefas = set()
+
+
+def exportar() -> str:
+    from .database import database
+
+    linhas = []
+    for metrica in METRICAS:
+        linhas.extend(metrica.exportar())
+    if database.driver is not None:
+        for chave, valor in database.stats().items():
+            # contagens que o driver não expôs ficam de fora
+            if valor is None:
+                continue
+            linhas.append(f"# TYPE neo4j_pool_{chave} gauge")
+            linhas.append(f"neo4j_pool_{chave} {valor}")
+    return "\n".join(linhas) + "\n"
+
+
+# Rotas HTTP
+
+def _template_rota(scope) -> str:
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if app is None:
+        return "desconhecida"
+    for rota in app.routes:
+        if endpoint is not None:
+            if getattr(rota, "endpoint", None) is endpoint:
+                return rota.path
+        # respondida antes do roteamento (ex.: cache de respostas)
+        elif rota.matches(scope)[0] == Match.FULL:
+            return rota.path
+    return "desconhecida"
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI puro: mede até o fim do envio do corpo, inclusive respostas em streaming
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        inicio = time.perf_counter()
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            rota = _template_rota(scope)
+            http_duracao.observar(time.perf_counter() - inicio, scope["method"], rota)
+            http_requisicoes.inc(scope["method"], rota, status)
+
+
+# Queries
+
+# nome das queries executadas no contexto atual; sem nome elas aparecem como "desconhecida"
+_nome_query: ContextVar[str] = ContextVar("metricas_nome_query", default="desconhecida")
+
+
+@contextmanager
+def nomear_query(nome: str):
+    """
+    Atribui a nome (ex.: "crud.get_amigos") as queries executadas dentro do bloco
+    """
+    token = _nome_query.set(nome)
+    try:
+        yield
+    finally:
+        _nome_query.reset(token)
+
+
+class ResultadoMedido:
+    """
+    Envolve o AsyncResult e registra as métricas quando os registros terminam de ser lidos
+    """
+    def __init__(self, resultado, nome: str, query: str, parametros: dict, inicio: float):
+        self._resultado = resultado
+        self._nome = nome
+        self._query = query
+        self._parametros = parametros
+        self._inicio = inicio
+        self._linhas = 0
+        self._registrado = False
+
+    def __getattr__(self, nome):
+        return getattr(self._resultado, nome)
+
+    async def _finalizar(self):
+        if self._registrado:
+            return
+        self._registrado = True
+        summary = await self._resultado.consume()
+        await _registrar(self._nome, self._query, self._parametros, time.perf_counter() - self._inicio,
+                         self._linhas, summary)
+        return summary
+
+    async def single(self, *args, **kwargs):
+        record = await self._resultado.single(*args, **kwargs)
+        self._linhas = 0 if record is None else 1
+        await self._finalizar()
+        return record
+
+    async def values(self, *args, **kwargs):
+        valores = await self._resultado.values(*args, **kwargs)
+        self._linhas = len(valores)
+        await self._finalizar()
+        return valores
+
+    async def value(self, *args, **kwargs):
+        valores = await self._resultado.value(*args, **kwargs)
+        self._linhas = len(valores)
+        await self._finalizar()
+        return valores
+
+    async def data(self, *args, **kwargs):
+        dados = await self._resultado.data(*args, **kwargs)
+        self._linhas = len(dados)
+        await self._finalizar()
+        return dados
+
+    async def consume(self):
+        if self._registrado:
+            return await self._resultado.consume()
+        return await self._finalizar()
+
+    async def __aiter__(self):
+        async for record in self._resultado:
+            self._linhas += 1
+            yield record
+        await self._finalizar()
+
+
+async def _registrar(nome: str, query: str, parametros: dict, duracao: float, linhas: int, summary):
+    query_duracao.observar(duracao, nome)
+    query_linhas.inc(nome, valor=linhas)
+    servidor_ms = (summary.result_available_after or 0) + (summary.result_consumed_after or 0)
+    query_servidor.observar(servidor_ms / 1000, nome)
+    if PROFILE_MS > 0 and duracao * 1000 >= PROFILE_MS:
+        _agendar_profile(nome, query, parametros, duracao)
+
+
+def _agendar_profile(nome: str, query: str, parametros: dict, duracao: float):
+    agora = time.monotonic()
+    if _ESCRITA.search(query) or agora - _ultimo_profile.get(nome, -PROFILE_INTERVALO_S) < PROFILE_INTERVALO_S:
+        return
+    _ultimo_profile[nome] = agora
+    tarefa = asyncio.get_running_loop().create_task(_capturar_profile(nome, query, parametros, duracao))
+    _tarefas.add(tarefa)
+    tarefa.add_done_callback(_tarefas.discard)
+
+
+def _resumir_plano(plano: Optional[dict]) -> Optional[dict]:
+    if not plano:
+        return None
+    return {
+        "operador": plano.get("operatorType"),
+        "linhas": plano.get("rows"),
+        "db_hits": plano.get("dbHits"),
+        "argumentos": {k: v for k, v in (plano.get("args") or {}).items()
+                       if k in ("Details", "EstimatedRows", "PageCacheHits", "PageCacheMisses")},
+        "filhos": [_resumir_plano(filho) for filho in plano.get("children") or ()],
+    }
+
+
+async def _capturar_profile(nome: str, query: str, parametros: dict, duracao: float):
+    from .database import database
+
+    try:
+        # sessão do driver, sem instrumentação, para não medir o próprio PROFILE
+        async with database.driver.session() as session:
+            result = await session.run("PROFILE " + query, parametros)
+            summary = await result.consume()
+        perfis.append({
+            "query": nome,
+            "duracao_ms": round(duracao * 1000, 3),
+            "capturado_em": time.time(),
+            "cypher": query.strip(),
+            "plano": _resumir_plano(summary.profile),
+        })
+        print(f"🐢 Query lenta {nome}: {duracao * 1000:.1f} ms (PROFILE capturado)")
+    except Exception as e:
+        print(f"❌ Falha ao capturar PROFILE de {nome}: {e}")
+
+
+def _parametros(parameters, kwargs) -> dict:
+    parametros = dict(parameters or {})
+    parametros.update(kwargs)
+    return parametros
+
+
+class _Medidor:
+    def _medir_run(self, alvo, query, parameters, kwargs):
+        return self._run_medido(alvo, _nome_query.get(), query, _parametros(parameters, kwargs))
+
+    async def _run_medido(self, alvo, nome, query, parametros):
+        inicio = time.perf_counter()
+        try:
+            resultado = await alvo.run(query, parametros)
+        except Exception:
+            query_erros.inc(nome)
+            raise
+        return ResultadoMedido(resultado, nome, query, parametros, inicio)
+
+
+class TransacaoInstrumentada(_Medidor):
+    def __init__(self, tx):
+        self._tx = tx
+
+    def __getattr__(self, nome):
+        return getattr(self._tx, nome)
+
+    def run(self, query, parameters=None, **kwargs):
+        return self._medir_run(self._tx, query, parameters, kwargs)
+
+
+class SessaoInstrumentada(_Medidor):
+    """
+    Sessão do driver com session.run e as funções de transação medidas
+    """
+    def __init__(self, session):
+        self._session = session
+
+    def __getattr__(self, nome):
+        return getattr(self._session, nome)
+
+    async def __aenter__(self):
+        await self._session.__aenter__()
+        return self
+
+    async def __aexit__(self, *args):
+        return await self._session.__aexit__(*args)
+
+    def run(self, query, parameters=None, **kwargs):
+        return self._medir_run(self._session, query, parameters, kwargs)
+
+    async def execute_read(self, funcao, *args, **kwargs):
+        return await self._session.execute_read(
+            lambda tx, *a, **k: funcao(TransacaoInstrumentada(tx), *a, **k), *args, **kwargs)
+
+    async def execute_write(self, funcao, *args, **kwargs):
+        return await self._session.execute_write(
+            lambda tx, *a, **k: funcao(TransacaoInstrumentada(tx), *a, **k), *args, **kwargs)
@@ -0,0 +1,118 @@
+"""
+Schema e migrações do grafo: constraints, índices, backfill de pessoa_id e nós :Interesse
+"""
+import asyncio
+
+from .metricas import nomear_query
+
+TAMANHO_LOTE_MIGRACAO = 10000
+
+SCHEMA = [
+    "CREATE CONSTRAINT pessoa_id_unico IF NOT EXISTS FOR (p:Pessoa) REQUIRE p.pessoa_id IS UNIQUE",
+    "CREATE CONSTRAINT interesse_nome_unico IF NOT EXISTS FOR (i:Interesse) REQUIRE i.nome IS UNIQUE",
+    "CREATE CONSTRAINT sequencia_nome_unico IF NOT EXISTS FOR (s:Sequencia) REQUIRE s.nome IS UNIQUE",
+    "CREATE INDEX pessoa_nome IF NOT EXISTS FOR (p:Pessoa) ON (p.nome)",
+    "CREATE INDEX pessoa_cidade IF NOT EXISTS FOR (p:Pessoa) ON (p.cidade)",
+    # faixa de idade de GET /pessoas/filtro
+    "CREATE INDEX pessoa_idade IF NOT EXISTS FOR (p:Pessoa) ON (p.idade)",
+    # typeahead de GET /pessoas/busca: o analyzer standard-folding ignora acentos e maiúsculas
+    "CREATE FULLTEXT INDEX pessoa_nome_busca IF NOT EXISTS FOR (p:Pessoa) ON EACH [p.nome] "
+    "OPTIONS {indexConfig: {`fulltext.analyzer`: 'standard-folding'}}",
+    # resultados de app/analises.py: top por PageRank e membros de uma comunidade
+    "CREATE INDEX pessoa_pagerank IF NOT EXISTS FOR (p:Pessoa) ON (p.pagerank)",
+    "CREATE INDEX pessoa_comunidade IF NOT EXISTS FOR (p:Pessoa) ON (p.comunidade)",
+    "CREATE CONSTRAINT analise_nome_unico IF NOT EXISTS FOR (a:Analise) REQUIRE a.nome IS UNIQUE",
+]
+
+
+async def criar_schema(db):
+    for comando in SCHEMA:
+        with nomear_query("migracoes.criar_schema"):
+            result = await db.run(comando)
+        await result.consume()
+
+
+async def migrar_pessoa_id(db, tamanho_lote: int = TAMANHO_LOTE_MIGRACAO) -> int:
+    """
+    Atribui pessoa_id sequencial às pessoas que ainda não têm um, em lotes
+    """
+    query = """
+    MATCH (p:Pessoa)
+    WHERE p.pessoa_id IS NULL
+    WITH p LIMIT $tamanho_lote
+    WITH collect(p) AS pessoas
+    WHERE size(pessoas) > 0
+    MERGE (seq:Sequencia {nome: 'Pessoa'})
+    ON CREATE SET seq.valor = 0
+    // incremento lido de volta depois da escrita (que pega o lock do nó), como em crud.criar_pessoa
+    SET seq.valor = seq.valor + size(pessoas)
+    WITH pessoas, seq.valor - size(pessoas) AS base
+    UNWIND range(0, size(pessoas) - 1) AS i
+    WITH pessoas[i] AS p, base + i + 1 AS novo_id
+    SET p.pessoa_id = novo_id
+    RETURN count(p) AS migradas
+    """
+
+    total = 0
+    while True:
+        with nomear_query("migracoes.migrar_pessoa_id"):
+            result = await db.run(query, tamanho_lote=tamanho_lote)
+        record = await result.single()
+        migradas = record["migradas"] if record else 0
+        if not migradas:
+            break
+        total += migradas
+    if total:
+        print(f"✅ pessoa_id atribuído a {total} pessoas")
+    return total
+
+
+async def migrar_interesses(db, tamanho_lote: int = TAMANHO_LOTE_MIGRACAO) -> int:
+    """
+    Cria nós :Interesse e arestas GOSTA_DE a partir da lista p.interesses, em lotes.
+    A lista continua na pessoa como cópia para as respostas da API.
+    """
+    query = """
+    MATCH (p:Pessoa)
+    WHERE size(coalesce(p.interesses, [])) > 0 AND NOT (p)-[:GOSTA_DE]->(:Interesse)
+    WITH p LIMIT $tamanho_lote
+    UNWIND p.interesses AS nome
+    MERGE (i:Interesse {nome: nome})
+    MERGE (p)-[:GOSTA_DE]->(i)
+    RETURN count(DISTINCT p) AS migradas
+    """
+
+    total = 0
+    while True:
+        with nomear_query("migracoes.migrar_interesses"):
+            result = await db.run(query, tamanho_lote=tamanho_lote)
+        record = await result.single()
+        migradas = record["migradas"] if record else 0
+        if not migradas:
+            break
+        total += migradas
+    if total:
+        print(f"✅ Interesses normalizados para {total} pessoas")
+    return total
+
+
+async def migrar(db):
+    await criar_schema(db)
+    await migrar_pessoa_id(db)
+    await migrar_interesses(db)
+
+
+async def main():
+    from .database import database
+
+    await database.connect()
+    session = database.get_session()
+    try:
+        await migrar(session)
+    finally:
+        await session.close()
+        await database.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
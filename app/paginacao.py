@@ -0,0 +1,72 @@
+"""
+Paginação por cursor (keyset) e respostas NDJSON em streaming
+"""
+import base64
+import json
+import os
+from typing import AsyncIterator, Optional
+from urllib.parse import quote
+
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+LIMITE_PADRAO = int(os.getenv("PAGINACAO_LIMITE_PADRAO", "100"))
+LIMITE_MAXIMO = int(os.getenv("PAGINACAO_LIMITE_MAXIMO", "1000"))
+
+HEADER_PROXIMO_CURSOR = "X-Next-Cursor"
+
+
+def codificar_cursor(chave: dict) -> str:
+    """
+    Cursor opaco: a chave do último item da página em JSON base64 url-safe
+    """
+    bruto = json.dumps(chave, separators=(",", ":"), ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: Optional[str], **tipos) -> Optional[dict]:
+    """
+    Devolve a chave do cursor; tipos (ex.: nome=str, id=int) são os campos obrigatórios da chave
+    """
+    if not cursor:
+        return None
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        chave = json.loads(bruto)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if not isinstance(chave, dict) or any(type(chave.get(campo)) is not tipo for campo, tipo in tipos.items()):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return chave
+
+
+def pagina(itens: list, limit: int, chave):
+    """
+    Recebe até limit + 1 itens e devolve (página, próximo cursor ou None)
+    """
+    if len(itens) <= limit:
+        return itens, None
+    itens = itens[:limit]
+    return itens, codificar_cursor(chave(itens[-1]))
+
+
+def definir_proximo_cursor(response, request, cursor: Optional[str]):
+    if cursor is None:
+        return
+    response.headers[HEADER_PROXIMO_CURSOR] = cursor
+    proxima_url = request.url.include_query_params(after=cursor)
+    # headers HTTP são latin-1: caracteres fora de ASCII no path (ex.: /pessoas/interesse/música) vão codificados
+    response.headers["Link"] = f'<{quote(str(proxima_url), safe=":/?&=%#+,;@")}>; rel="next"'
+
+
+async def _linhas_ndjson(itens: AsyncIterator[dict]):
+    async for item in itens:
+        yield orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE)
+
+
+def resposta_ndjson(itens: AsyncIterator[dict]) -> StreamingResponse:
+    """
+    Escreve cada registro assim que chega do banco, sem montar a lista em memória
+    """
+    return StreamingResponse(_linhas_ndjson(itens), media_type="application/x-ndjson")
@@ -0,0 +1,110 @@
+"""
+Recomendações de amizade ranqueadas (amigos de amigos).
+
+O score de um candidato é o número de amigos em comum, somado opcionalmente a
+PESO_INTERESSES × interesses em comum e PESO_CIDADE × (mesma cidade). Cada
+pessoa tem sua lista top-k guardada num cache LRU limitado; os eventos de
+escrita invalidam só as listas que podem ter mudado.
+"""
+import os
+from collections import defaultdict
+from typing import Dict, List, Set
+
+from . import eventos
+from .backends import crud
+from .cache import LRUCache
+
+PESO_INTERESSES = float(os.getenv("RECOMENDACOES_PESO_INTERESSES", "0"))
+PESO_CIDADE = float(os.getenv("RECOMENDACOES_PESO_CIDADE", "0"))
+TOP_K = int(os.getenv("RECOMENDACOES_TOP_K", "50"))
+CAPACIDADE_CACHE = int(os.getenv("RECOMENDACOES_CACHE_TAMANHO", "10000"))
+TTL_CACHE = float(os.getenv("RECOMENDACOES_CACHE_TTL_S", "600"))
+
+# pessoa_id -> pessoas cujas listas em cache dependem dela (amigos e candidatos)
+_dependentes: Dict[int, Set[int]] = defaultdict(set)
+# pessoa_id -> ids de que a lista dela depende, para limpar _dependentes no despejo
+_depende_de: Dict[int, Set[int]] = {}
+# incrementada a cada invalidação: uma lista calculada enquanto houve escrita não é guardada
+_geracao = 0
+
+
+def _ao_remover(pessoa_id, _valor):
+    for outro in _depende_de.pop(pessoa_id, ()):
+        dependentes = _dependentes.get(outro)
+        if dependentes is not None:
+            dependentes.discard(pessoa_id)
+            if not dependentes:
+                del _dependentes[outro]
+
+
+cache = LRUCache(CAPACIDADE_CACHE, ttl=TTL_CACHE or None, ao_remover=_ao_remover)
+
+
+def invalidar(pessoa_id: int):
+    """
+    Descarta a lista da pessoa e as listas que dependem dela
+    """
+    global _geracao
+    _geracao += 1
+    cache.pop(pessoa_id)
+    for dependente in list(_dependentes.get(pessoa_id, ())):
+        cache.pop(dependente)
+
+
+def _ao_criar_relacionamento(pessoa_id1: int, pessoa_id2: int):
+    # a nova aresta muda os amigos de amigos de ambos e de quem já tinha um deles na lista
+    invalidar(pessoa_id1)
+    invalidar(pessoa_id2)
+
+
+def _ao_salvar_pessoa(pessoa: dict):
+    # interesses ou cidade alterados mudam o score de quem a tem como candidata
+    invalidar(pessoa["id"])
+
+
+def iniciar():
+    eventos.assinar(eventos.RELACIONAMENTO_CRIADO, _ao_criar_relacionamento)
+    eventos.assinar(eventos.PESSOA_SALVA, _ao_salvar_pessoa)
+
+
+def parar():
+    eventos.cancelar(eventos.RELACIONAMENTO_CRIADO, _ao_criar_relacionamento)
+    eventos.cancelar(eventos.PESSOA_SALVA, _ao_salvar_pessoa)
+    cache.clear()
+
+
+async def _calcular(db, pessoa_id: int, limite: int):
+    return await crud.get_recomendacoes_pontuadas(
+        db=db, pessoa_id=pessoa_id, limite=limite,
+        peso_interesses=PESO_INTERESSES, peso_cidade=PESO_CIDADE,
+    )
+
+
+async def get_recomendacoes(db, pessoa_id: int, limit: int = 5, offset: int = 0) -> List[dict]:
+    """
+    Página [offset, offset + limit) do ranking. Páginas além do top-k em cache
+    são calculadas direto no banco.
+    """
+    fim = offset + limit
+    if fim > TOP_K:
+        _, candidatos = await _calcular(db, pessoa_id, fim)
+        return candidatos[offset:fim]
+
+    candidatos = cache.get(pessoa_id)
+    if candidatos is None:
+        geracao = _geracao
+        amigos_ids, candidatos = await _calcular(db, pessoa_id, TOP_K)
+        if geracao != _geracao:
+            # a invalidação chegou durante o cálculo, que pode ter lido o estado anterior
+            return candidatos[offset:fim]
+        cache.set(pessoa_id, candidatos)
+        depende_de = set(amigos_ids) | {c["id"] for c in candidatos}
+        _depende_de[pessoa_id] = depende_de
+        for outro in depende_de:
+            _dependentes[outro].add(pessoa_id)
+    return candidatos[offset:fim]
+
+
+def stats() -> dict:
+    return {**cache.stats(), "top_k": TOP_K,
+            "peso_interesses": PESO_INTERESSES, "peso_cidade": PESO_CIDADE}
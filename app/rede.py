@@ -0,0 +1,63 @@
+"""
+Expansão da rede de uma pessoa por níveis para /pessoas/{id}/rede/{profundidade}.
+
+Cada nível é a fronteira do anterior: os vizinhos de todo o nível vêm numa
+única consulta e cada pessoa é visitada uma só vez, na menor distância. A
+profundidade e o total de pessoas são limitados no servidor.
+"""
+import os
+from typing import AsyncIterator, List, Optional
+
+from .backends import crud
+
+PROFUNDIDADE_MAXIMA = int(os.getenv("REDE_PROFUNDIDADE_MAXIMA", "4"))
+LIMITE_PESSOAS = int(os.getenv("REDE_LIMITE_PESSOAS", "10000"))
+
+
+async def iter_niveis(db, pessoa_id: int, profundidade: int = 2,
+                      limite: Optional[int] = None) -> AsyncIterator[dict]:
+    """
+    Um item por distância: {"distancia", "pessoas", "truncado"}, já com os dados das pessoas
+    """
+    limite = limite or LIMITE_PESSOAS
+    visitados = {pessoa_id}
+    fronteira = [pessoa_id]
+    for distancia in range(1, min(profundidade, PROFUNDIDADE_MAXIMA) + 1):
+        vizinhos = await crud.get_vizinhos_em_lote(db=db, pessoa_ids=fronteira)
+        proxima: List[int] = []
+        truncado = False
+        for no in fronteira:
+            for vizinho in vizinhos.get(no, ()):
+                if vizinho in visitados:
+                    continue
+                if len(visitados) > limite:
+                    truncado = True
+                    break
+                visitados.add(vizinho)
+                proxima.append(vizinho)
+            if truncado:
+                break
+        if not proxima and not truncado:
+            return
+
+        pessoas = await crud.get_pessoas_por_ids(db=db, pessoa_ids=proxima)
+        for pessoa in pessoas:
+            if pessoa.get("cidade") is None:
+                pessoa["cidade"] = "Não informada"
+            pessoa["distancia"] = distancia
+        pessoas.sort(key=lambda p: (p["nome"], p["id"]))
+        yield {"distancia": distancia, "pessoas": pessoas, "truncado": truncado}
+        if truncado:
+            return
+        fronteira = proxima
+
+
+async def get_rede_social(db, pessoa_id: int, profundidade: int = 2):
+    """
+    Lista única ordenada por distância e nome, e se o limite de pessoas cortou a expansão
+    """
+    pessoas, truncado = [], False
+    async for nivel in iter_niveis(db, pessoa_id, profundidade):
+        pessoas.extend(nivel["pessoas"])
+        truncado = nivel["truncado"]
+    return pessoas, truncado
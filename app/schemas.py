@@ -5,16 +5,32 @@ class PessoaBase(BaseModel):
     nome: str
     idade: int
     interesses: List[str]
+    cidade: Optional[str] = None
 
 class PessoaCreate(PessoaBase):
     pass
 
 class Pessoa(PessoaBase):
+    # pessoa_id: chave estável e indexada (não o id interno do Neo4j)
     id: int
 
     class Config:
         from_attributes = True
 
+class PessoaImportacao(PessoaBase):
+    # id explícito: permite MERGE idempotente ao repetir uma importação
+    id: int
+    interesses: List[str] = []
+
+class PessoaFiltrada(Pessoa):
+    # pessoas que ela CONHECE
+    grau: int
+
+class Recomendacao(Pessoa):
+    amigos_em_comum: int
+    interesses_em_comum: int
+    score: float
+
 class RelacionamentoCreate(BaseModel):
     pessoa_id1: int
-    pessoa_id2: int
\ No newline at end of file
+    pessoa_id2: int
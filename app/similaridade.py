@@ -0,0 +1,215 @@
+"""
+Índice de similaridade por interesses para /pessoas/{id}/similares.
+
+Mantém um vocabulário de interesses e a matriz esparsa pessoa × interesse na
+forma de listas invertidas (interesse -> linhas). A sobreposição de uma pessoa
+com todas as outras sai de um único np.bincount sobre as listas dos seus
+interesses, e o Jaccard é calculado vetorialmente. O índice é construído na
+inicialização e atualizado pelos eventos de escrita do crud.
+"""
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from . import eventos
+from .backends import crud
+from .database import sessao
+
+MINIMO_INTERESSES_COMUNS = 2
+RECONSTRUIR_A_CADA = float(os.getenv("SIMILARIDADE_RECONSTRUIR_S", "300"))
+
+
+class IndiceSimilaridade:
+    def __init__(self):
+        self.vocabulario: Dict[str, int] = {}
+        self.linha_por_id: Dict[int, int] = {}
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.tamanhos = np.zeros(0, dtype=np.int32)
+        self.n_linhas = 0
+        self._interesses_por_linha: List[np.ndarray] = []
+        self._postings: List[List[int]] = []
+        self._postings_np: List[Optional[np.ndarray]] = []
+        self.atualizado_em: Optional[float] = None
+
+    def __len__(self):
+        return self.n_linhas
+
+    def _coluna(self, interesse: str) -> int:
+        coluna = self.vocabulario.get(interesse)
+        if coluna is None:
+            coluna = len(self.vocabulario)
+            self.vocabulario[interesse] = coluna
+            self._postings.append([])
+            self._postings_np.append(None)
+        return coluna
+
+    def _crescer(self, capacidade: int):
+        if capacidade <= len(self.ids):
+            return
+        nova = max(capacidade, 2 * len(self.ids), 1024)
+        self.ids = np.resize(self.ids, nova)
+        self.tamanhos = np.resize(self.tamanhos, nova)
+
+    def atualizar(self, pessoa_id: int, interesses):
+        """
+        Inclui a pessoa ou troca seus interesses (sem reconstruir o índice)
+        """
+        colunas = np.array(sorted({self._coluna(i) for i in interesses or ()}), dtype=np.int32)
+        linha = self.linha_por_id.get(pessoa_id)
+        if linha is None:
+            linha = self.n_linhas
+            self._crescer(linha + 1)
+            self.n_linhas += 1
+            self.linha_por_id[pessoa_id] = linha
+            self.ids[linha] = pessoa_id
+            self._interesses_por_linha.append(colunas)
+        else:
+            antigas = self._interesses_por_linha[linha]
+            if np.array_equal(antigas, colunas):
+                return
+            for coluna in antigas:
+                self._postings[coluna].remove(linha)
+                self._postings_np[coluna] = None
+            self._interesses_por_linha[linha] = colunas
+        for coluna in colunas:
+            self._postings[coluna].append(linha)
+            self._postings_np[coluna] = None
+        self.tamanhos[linha] = len(colunas)
+        self.atualizado_em = time.time()
+
+    def _posting(self, coluna: int) -> np.ndarray:
+        arr = self._postings_np[coluna]
+        if arr is None:
+            arr = np.fromiter(self._postings[coluna], dtype=np.int32, count=len(self._postings[coluna]))
+            self._postings_np[coluna] = arr
+        return arr
+
+    def top_k(self, pessoa_id: int, k: int = 5, excluir=(),
+              minimo: int = MINIMO_INTERESSES_COMUNS) -> List[tuple]:
+        """
+        Retorna [(pessoa_id, interesses em comum, jaccard)] ordenado por sobreposição e Jaccard
+        """
+        linha = self.linha_por_id.get(pessoa_id)
+        if linha is None or self.n_linhas == 0:
+            return []
+        colunas = self._interesses_por_linha[linha]
+        if len(colunas) == 0:
+            return []
+
+        linhas = np.concatenate([self._posting(c) for c in colunas])
+        sobreposicao = np.bincount(linhas, minlength=self.n_linhas)
+        sobreposicao[linha] = 0
+        if excluir:
+            excluidas = [self.linha_por_id[i] for i in excluir if i in self.linha_por_id]
+            sobreposicao[excluidas] = 0
+
+        candidatas = np.flatnonzero(sobreposicao >= minimo)
+        if len(candidatas) == 0:
+            return []
+        comuns = sobreposicao[candidatas]
+        uniao = self.tamanhos[linha] + self.tamanhos[candidatas] - comuns
+        jaccard = comuns / uniao
+
+        if len(candidatas) > k:
+            # pré-seleção parcial antes da ordenação completa
+            corte = np.argpartition(-(2 * comuns + jaccard), k - 1)[:k]
+            candidatas, comuns, jaccard = candidatas[corte], comuns[corte], jaccard[corte]
+        ordem = np.lexsort((self.ids[candidatas], -jaccard, -comuns))
+        return [
+            (int(self.ids[candidatas[i]]), int(comuns[i]), float(jaccard[i]))
+            for i in ordem[:k]
+        ]
+
+
+indice = IndiceSimilaridade()
+_tarefa: Optional[asyncio.Task] = None
+# escritas recebidas durante uma reconstrução, reaplicadas no índice novo
+_pendentes: Optional[list] = None
+
+
+def _ao_salvar_pessoa(pessoa: dict):
+    indice.atualizar(pessoa["id"], pessoa.get("interesses"))
+    if _pendentes is not None:
+        _pendentes.append(pessoa)
+
+
+async def construir() -> IndiceSimilaridade:
+    """
+    Monta um índice novo lendo todas as pessoas e o publica no lugar do atual
+    """
+    global indice, _pendentes
+    novo = IndiceSimilaridade()
+    inicio = time.perf_counter()
+    _pendentes = []
+    try:
+        async with sessao(leitura=True) as db:
+            async for pessoa in crud.iter_pessoas(db=db):
+                novo.atualizar(pessoa["id"], pessoa["interesses"])
+        for pessoa in _pendentes:
+            novo.atualizar(pessoa["id"], pessoa.get("interesses"))
+        indice = novo
+    finally:
+        _pendentes = None
+    print(f"✅ Índice de similaridade: {len(novo)} pessoas, {len(novo.vocabulario)} interesses "
+          f"({time.perf_counter() - inicio:.2f}s)")
+    return novo
+
+
+async def _reconstruir_periodicamente():
+    while True:
+        await asyncio.sleep(RECONSTRUIR_A_CADA)
+        try:
+            await construir()
+        except Exception as e:
+            print(f"❌ Falha ao reconstruir o índice de similaridade: {e}")
+
+
+async def iniciar():
+    """
+    Constrói o índice, assina os eventos de escrita e agenda a reconstrução periódica
+    (que incorpora escritas feitas por outros processos)
+    """
+    global _tarefa
+    eventos.assinar(eventos.PESSOA_SALVA, _ao_salvar_pessoa)
+    await construir()
+    if _tarefa is None and RECONSTRUIR_A_CADA > 0:
+        _tarefa = asyncio.create_task(_reconstruir_periodicamente())
+
+
+async def parar():
+    global _tarefa
+    eventos.cancelar(eventos.PESSOA_SALVA, _ao_salvar_pessoa)
+    if _tarefa is not None:
+        _tarefa.cancel()
+        _tarefa = None
+
+
+async def get_pessoas_similares(db, pessoa_id: int, limit: int = 5) -> List[dict]:
+    """
+    Pessoas com ao menos 2 interesses em comum que ainda não se conhecem, pelo índice
+    """
+    conexoes = await crud.get_conexoes_ids(db=db, pessoa_id=pessoa_id)
+    melhores = indice.top_k(pessoa_id, k=limit, excluir=conexoes)
+    if not melhores:
+        return []
+
+    ids = [pessoa_id] + [m[0] for m in melhores]
+    pessoas = {p["id"]: p for p in await crud.get_pessoas_por_ids(db=db, pessoa_ids=ids)}
+    meus_interesses = pessoas[pessoa_id]["interesses"] if pessoa_id in pessoas else []
+    similares = []
+    for similar_id, comuns, jaccard in melhores:
+        pessoa = pessoas.get(similar_id)
+        if pessoa is None:
+            continue
+        outros = set(pessoa["interesses"])
+        similar = dict(pessoa)
+        if similar.get("cidade") is None:
+            similar["cidade"] = "Não informada"
+        similar["interesses_comuns"] = [i for i in meus_interesses if i in outros]
+        similar["score_similaridade"] = comuns
+        similar["score_jaccard"] = round(jaccard, 4)
+        similares.append(similar)
+    return similares
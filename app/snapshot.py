@@ -0,0 +1,486 @@
+"""
+Snapshot compacto do grafo: exportação, restauração e carga direta em memória.
+
+O arquivo é colunar e binário (little-endian): um cabeçalho com contagens e
+CRC32, uma tabela de seções e, alinhadas em 64 bytes, as colunas das pessoas
+(pessoa_id, idade, nome, cidade e interesses, com cidade e interesses
+codificados por dicionário) e as arestas CONHECE em CSR: arestas_offsets
+(int32, n + 1) e arestas (int32, índice da pessoa de destino). As pessoas ficam
+em ordem crescente de pessoa_id e o índice de uma pessoa é a sua posição.
+
+Snapshot abre o arquivo com mmap: as colunas são arrays numpy sobre o próprio
+arquivo, sem cópia, e carregar_grafo monta um GrafoMemoria cujo CSR de saída
+aponta para elas (GRAFO_SNAPSHOT com GRAFO_BACKEND=memoria).
+
+    python -m app.snapshot exportar grafo.snap
+    python -m app.snapshot restaurar grafo.snap --limpar --paralelo 8
+    python -m app.snapshot info grafo.snap
+"""
+import argparse
+import asyncio
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .grafo_memoria import CSR, GrafoMemoria, No
+
+LOTE_EXPORTACAO = int(os.getenv("SNAPSHOT_LOTE_EXPORTACAO", "10000"))
+LOTE_RESTAURACAO = int(os.getenv("SNAPSHOT_LOTE_RESTAURACAO", "5000"))
+PARALELO = int(os.getenv("SNAPSHOT_PARALELO", "4"))
+
+MAGICO = b"GRAFOSNP"
+VERSAO = 1
+# mágico, versão, número de seções, pessoas, arestas, CRC32 de tudo o que vem depois da tabela de seções
+CABECALHO = struct.Struct("<8sIIqqI")
+# nome, dtype numpy, offset no arquivo, quantidade de elementos
+SECAO = struct.Struct("<24s4sqq")
+ALINHAMENTO = 64
+BLOCO_CRC = 16 * 1024 * 1024
+SEM_IDADE = -1
+SEM_CIDADE = -1
+
+
+class SnapshotInvalido(Exception):
+    pass
+
+
+def _alinhar(posicao: int) -> int:
+    return (posicao + ALINHAMENTO - 1) // ALINHAMENTO * ALINHAMENTO
+
+
+def csr_por_ids(ids: np.ndarray, origens: np.ndarray, destinos: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    CSR (offsets, alvos) em índices de `ids` (crescentes) a partir de arestas dadas por pessoa_id
+    """
+    if len(ids) == 0:
+        return np.zeros(1, dtype="<i4"), np.zeros(0, dtype="<i4")
+    i_origem = np.minimum(np.searchsorted(ids, origens), len(ids) - 1)
+    i_destino = np.minimum(np.searchsorted(ids, destinos), len(ids) - 1)
+    # pessoas criadas durante a exportação podem aparecer só como destino: a aresta fica de fora
+    validas = (ids[i_origem] == origens) & (ids[i_destino] == destinos)
+    i_origem, i_destino = i_origem[validas], i_destino[validas]
+    # por origem e, dentro da linha, por destino (GrafoMemoria procura arestas por busca binária)
+    ordem = np.lexsort((i_destino, i_origem))
+    offsets = np.zeros(len(ids) + 1, dtype="<i4")
+    np.cumsum(np.bincount(i_origem, minlength=len(ids)), out=offsets[1:])
+    return offsets, i_destino[ordem].astype("<i4")
+
+
+class _Dicionario:
+    """
+    Texto -> código, na ordem em que aparecem
+    """
+    def __init__(self):
+        self.codigos: Dict[str, int] = {}
+
+    def codigo(self, texto: str) -> int:
+        codigo = self.codigos.get(texto)
+        if codigo is None:
+            codigo = self.codigos[texto] = len(self.codigos)
+        return codigo
+
+
+class _Textos:
+    """
+    Lista de textos como offsets int64 + bytes UTF-8 concatenados
+    """
+    def __init__(self):
+        self.offsets = array("q", [0])
+        self.dados = bytearray()
+
+    def adicionar(self, texto: str):
+        self.dados += texto.encode("utf-8")
+        self.offsets.append(len(self.dados))
+
+    @classmethod
+    def de(cls, textos: Iterable[str]) -> "_Textos":
+        t = cls()
+        for texto in textos:
+            t.adicionar(texto)
+        return t
+
+
+class Colunas:
+    """
+    Acumula pessoas (em ordem crescente de pessoa_id) e relacionamentos e grava o snapshot
+    """
+    def __init__(self):
+        self.ids = array("q")
+        self.idades = array("i")
+        self.nomes = _Textos()
+        self.cidades = array("i")
+        self._vocab_cidades = _Dicionario()
+        self.interesses_offsets = array("q", [0])
+        self.interesses = array("i")
+        self._vocab_interesses = _Dicionario()
+        # arestas por pessoa_id; viram índices em gravar(), quando todos os ids são conhecidos
+        self.origens = array("q")
+        self.destinos = array("q")
+
+    def adicionar_pessoa(self, pessoa: dict):
+        pessoa_id = pessoa["id"]
+        if self.ids and pessoa_id <= self.ids[-1]:
+            raise ValueError(f"Pessoas fora de ordem no snapshot: {pessoa_id} depois de {self.ids[-1]}")
+        self.ids.append(pessoa_id)
+        idade = pessoa.get("idade")
+        self.idades.append(SEM_IDADE if idade is None else idade)
+        self.nomes.adicionar(pessoa.get("nome") or "")
+        cidade = pessoa.get("cidade")
+        self.cidades.append(SEM_CIDADE if cidade is None else self._vocab_cidades.codigo(cidade))
+        for interesse in pessoa.get("interesses") or ():
+            self.interesses.append(self._vocab_interesses.codigo(interesse))
+        self.interesses_offsets.append(len(self.interesses))
+
+    def adicionar_relacionamento(self, pessoa_id1: int, pessoa_id2: int):
+        self.origens.append(pessoa_id1)
+        self.destinos.append(pessoa_id2)
+
+    def _csr(self) -> Tuple[np.ndarray, np.ndarray]:
+        return csr_por_ids(np.frombuffer(self.ids, dtype=np.int64), np.frombuffer(self.origens, dtype=np.int64),
+                           np.frombuffer(self.destinos, dtype=np.int64))
+
+    def gravar(self, caminho: str) -> dict:
+        """
+        Grava o snapshot de forma atômica (arquivo temporário + rename)
+        """
+        offsets, alvos = self._csr()
+        cidades = _Textos.de(self._vocab_cidades.codigos)
+        vocab = _Textos.de(self._vocab_interesses.codigos)
+        secoes = [
+            ("pessoa_id", np.frombuffer(self.ids, dtype=np.int64).astype("<i8")),
+            ("idade", np.frombuffer(self.idades, dtype=np.int32).astype("<i4")),
+            ("nome_offsets", np.frombuffer(self.nomes.offsets, dtype=np.int64).astype("<i8")),
+            ("nome_dados", np.frombuffer(self.nomes.dados, dtype="u1")),
+            ("cidade", np.frombuffer(self.cidades, dtype=np.int32).astype("<i4")),
+            ("cidades_offsets", np.frombuffer(cidades.offsets, dtype=np.int64).astype("<i8")),
+            ("cidades_dados", np.frombuffer(cidades.dados, dtype="u1")),
+            ("interesses_offsets", np.frombuffer(self.interesses_offsets, dtype=np.int64).astype("<i8")),
+            ("interesses", np.frombuffer(self.interesses, dtype=np.int32).astype("<i4")),
+            ("vocab_offsets", np.frombuffer(vocab.offsets, dtype=np.int64).astype("<i8")),
+            ("vocab_dados", np.frombuffer(vocab.dados, dtype="u1")),
+            ("arestas_offsets", offsets),
+            ("arestas", alvos),
+        ]
+
+        inicio = _alinhar(CABECALHO.size + SECAO.size * len(secoes))
+        tabela, posicao = [], inicio
+        for nome, dados in secoes:
+            tabela.append(SECAO.pack(nome.encode(), dados.dtype.str.encode(), posicao, len(dados)))
+            posicao = _alinhar(posicao + dados.nbytes)
+
+        temporario = caminho + ".tmp"
+        crc = 0
+        with open(temporario, "wb") as f:
+            f.write(bytes(inicio))
+            for (_, dados), entrada in zip(secoes, tabela):
+                offset = SECAO.unpack(entrada)[2]
+                preenchimento = bytes(offset - f.tell())
+                f.write(preenchimento)
+                crc = zlib.crc32(preenchimento, crc)
+                f.write(memoryview(dados).cast("B"))
+                crc = zlib.crc32(memoryview(dados).cast("B"), crc)
+            f.seek(0)
+            f.write(CABECALHO.pack(MAGICO, VERSAO, len(secoes), len(self.ids), len(alvos), crc))
+            f.write(b"".join(tabela))
+        os.replace(temporario, caminho)
+        return {"pessoas": len(self.ids), "relacionamentos": len(alvos), "bytes": os.path.getsize(caminho)}
+
+
+class Snapshot:
+    """
+    Leitura do snapshot por mmap; coluna() devolve arrays numpy sobre o arquivo, sem cópia
+    """
+    def __init__(self, caminho: str, verificar: bool = True):
+        self.caminho = caminho
+        self._arquivo = open(caminho, "rb")
+        try:
+            self._mapa = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+            self._ler_cabecalho()
+            if verificar:
+                self.verificar()
+        except Exception:
+            self.close()
+            raise
+
+    def _ler_cabecalho(self):
+        if len(self._mapa) < CABECALHO.size:
+            raise SnapshotInvalido(f"{self.caminho}: arquivo truncado")
+        magico, versao, n_secoes, self.n_pessoas, self.n_arestas, self._crc = CABECALHO.unpack_from(self._mapa)
+        if magico != MAGICO:
+            raise SnapshotInvalido(f"{self.caminho}: não é um snapshot do grafo")
+        if versao != VERSAO:
+            raise SnapshotInvalido(f"{self.caminho}: versão {versao} não suportada (esperada {VERSAO})")
+        self._secoes: Dict[str, Tuple[np.dtype, int, int]] = {}
+        for i in range(n_secoes):
+            nome, dtype, offset, quantidade = SECAO.unpack_from(self._mapa, CABECALHO.size + i * SECAO.size)
+            dtype = np.dtype(dtype.rstrip(b"\0").decode())
+            if offset + quantidade * dtype.itemsize > len(self._mapa):
+                raise SnapshotInvalido(f"{self.caminho}: arquivo truncado")
+            self._secoes[nome.rstrip(b"\0").decode()] = (dtype, offset, quantidade)
+        self._inicio_dados = _alinhar(CABECALHO.size + SECAO.size * n_secoes)
+
+    def verificar(self):
+        crc = 0
+        dados = memoryview(self._mapa)
+        try:
+            for inicio in range(self._inicio_dados, len(dados), BLOCO_CRC):
+                crc = zlib.crc32(dados[inicio:inicio + BLOCO_CRC], crc)
+        finally:
+            dados.release()
+        if crc != self._crc:
+            raise SnapshotInvalido(f"{self.caminho}: checksum não confere (arquivo corrompido)")
+
+    def coluna(self, nome: str) -> np.ndarray:
+        dtype, offset, quantidade = self._secoes[nome]
+        return np.frombuffer(self._mapa, dtype=dtype, count=quantidade, offset=offset)
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self.coluna("pessoa_id")
+
+    @property
+    def idades(self) -> np.ndarray:
+        return self.coluna("idade")
+
+    @property
+    def arestas_offsets(self) -> np.ndarray:
+        return self.coluna("arestas_offsets")
+
+    @property
+    def arestas(self) -> np.ndarray:
+        return self.coluna("arestas")
+
+    def origens(self) -> np.ndarray:
+        """
+        Índice de origem de cada aresta (expande o CSR; é a única coluna de arestas que gera cópia)
+        """
+        return np.repeat(np.arange(self.n_pessoas, dtype=np.int32), np.diff(self.arestas_offsets))
+
+    def _textos(self, prefixo: str, inicio: int = 0, fim: Optional[int] = None) -> List[str]:
+        offsets = self.coluna(prefixo + "_offsets")
+        offsets = offsets[inicio:(len(offsets) - 1 if fim is None else fim) + 1]
+        if len(offsets) == 0:
+            return []
+        base = int(offsets[0])
+        dados = self.coluna(prefixo + "_dados")[base:int(offsets[-1])].tobytes()
+        limites = (offsets - base).tolist()
+        return [dados[a:b].decode("utf-8") for a, b in zip(limites, limites[1:])]
+
+    def nomes(self, inicio: int = 0, fim: Optional[int] = None) -> List[str]:
+        return self._textos("nome", inicio, fim)
+
+    def cidades(self, inicio: int = 0, fim: Optional[int] = None) -> List[Optional[str]]:
+        vocab = self._textos("cidades")
+        return [None if c == SEM_CIDADE else vocab[c] for c in self.coluna("cidade")[inicio:fim].tolist()]
+
+    def interesses(self, inicio: int = 0, fim: Optional[int] = None) -> List[Tuple[str, ...]]:
+        vocab = self._textos("vocab")
+        offsets = self.coluna("interesses_offsets")[inicio:(self.n_pessoas if fim is None else fim) + 1].tolist()
+        codigos = self.coluna("interesses")[offsets[0]:offsets[-1]].tolist() if offsets else []
+        base = offsets[0] if offsets else 0
+        return [tuple(vocab[c] for c in codigos[a - base:b - base]) for a, b in zip(offsets, offsets[1:])]
+
+    def pessoas(self, inicio: int = 0, fim: Optional[int] = None) -> List[dict]:
+        """
+        Pessoas [inicio, fim) no formato de /pessoas/bulk
+        """
+        fim = self.n_pessoas if fim is None else min(fim, self.n_pessoas)
+        colunas = zip(self.ids[inicio:fim].tolist(), self.nomes(inicio, fim), self.idades[inicio:fim].tolist(),
+                      self.interesses(inicio, fim), self.cidades(inicio, fim))
+        return [
+            {"id": pessoa_id, "nome": nome, "idade": None if idade == SEM_IDADE else idade,
+             "interesses": list(interesses), "cidade": cidade}
+            for pessoa_id, nome, idade, interesses, cidade in colunas
+        ]
+
+    def relacionamentos(self, inicio: int = 0, fim: Optional[int] = None) -> List[dict]:
+        """
+        Arestas [inicio, fim) na ordem do CSR, no formato de /relacionamentos/bulk
+        """
+        fim = self.n_arestas if fim is None else min(fim, self.n_arestas)
+        offsets = self.arestas_offsets
+        # origem de cada aresta do intervalo sem expandir o CSR inteiro
+        primeira = int(np.searchsorted(offsets, inicio, side="right")) - 1
+        ultima = int(np.searchsorted(offsets, fim, side="left"))
+        trecho = np.clip(offsets[primeira:ultima + 1], inicio, fim) - inicio
+        origens = np.repeat(np.arange(primeira, primeira + len(trecho) - 1), np.diff(trecho))
+        ids = self.ids
+        return [
+            {"pessoa_id1": pessoa_id1, "pessoa_id2": pessoa_id2}
+            for pessoa_id1, pessoa_id2 in zip(ids[origens].tolist(), ids[self.arestas[inicio:fim]].tolist())
+        ]
+
+    def close(self):
+        mapa = getattr(self, "_mapa", None)
+        if mapa is not None:
+            try:
+                mapa.close()
+            except BufferError:
+                # ainda há arrays apontando para o arquivo (ex.: um GrafoMemoria carregado): o mmap fica aberto
+                pass
+        self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def carregar_grafo(caminho: str) -> GrafoMemoria:
+    """
+    GrafoMemoria a partir do snapshot: o CSR de saída usa as colunas mapeadas do arquivo sem copiar;
+    o de entrada é derivado delas com numpy
+    """
+    inicio = time.perf_counter()
+    snap = Snapshot(caminho)
+    n = snap.n_pessoas
+    nos = [No(pessoa_id, nome, None if idade == SEM_IDADE else idade, cidade, interesses)
+           for pessoa_id, nome, idade, interesses, cidade in zip(
+               snap.ids.tolist(), snap.nomes(), snap.idades.tolist(), snap.interesses(), snap.cidades())]
+
+    offsets, alvos = snap.arestas_offsets, snap.arestas
+    origens = snap.origens()
+    if np.any((origens[1:] == origens[:-1]) & (alvos[1:] <= alvos[:-1])):
+        # snapshot gravado antes das linhas ordenadas: só neste caso o CSR de saída é copiado
+        alvos = np.ascontiguousarray(alvos[np.lexsort((alvos, origens))])
+    ordem = np.argsort(alvos, kind="stable")
+    entrada_offsets = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(np.bincount(alvos, minlength=n), out=entrada_offsets[1:])
+    entrada_alvos = origens[ordem]
+
+    # as listas de arestas do GrafoMemoria recebem novas escritas: essas duas são cópias
+    lista_origens, lista_destinos = array("i"), array("i")
+    lista_origens.frombytes(origens.tobytes())
+    lista_destinos.frombytes(alvos.tobytes())
+    grafo = GrafoMemoria.de_csr(
+        nos,
+        saida=CSR.de_buffers(memoryview(offsets), memoryview(alvos)),
+        entrada=CSR.de_buffers(memoryview(entrada_offsets), memoryview(entrada_alvos)),
+        origens=lista_origens,
+        destinos=lista_destinos,
+    )
+    print(f"✅ Snapshot {caminho} carregado em {time.perf_counter() - inicio:.2f}s: "
+          f"{n} pessoas, {snap.n_arestas} relacionamentos")
+    return grafo
+
+
+async def exportar(caminho: str, tamanho_lote: int = LOTE_EXPORTACAO) -> dict:
+    """
+    Lê pessoas e relacionamentos do Neo4j em lotes por pessoa_id e grava o snapshot
+    """
+    from .backends import crud
+    from .database import sessao
+
+    inicio = time.perf_counter()
+    colunas = Colunas()
+    after_id = -1
+    async with sessao(leitura=True) as db:
+        while True:
+            lote = await crud.get_pessoas_para_snapshot(db, after_id=after_id, limite=tamanho_lote)
+            for pessoa in lote:
+                colunas.adicionar_pessoa(pessoa)
+                for destino in pessoa["destinos"]:
+                    colunas.adicionar_relacionamento(pessoa["id"], destino)
+            if len(lote) < tamanho_lote:
+                break
+            after_id = lote[-1]["id"]
+            print(f"   📤 {len(colunas.ids)} pessoas, {len(colunas.origens)} relacionamentos")
+    resumo = colunas.gravar(caminho)
+    resumo["duracao_s"] = round(time.perf_counter() - inicio, 2)
+    print(f"✅ Snapshot {caminho}: {resumo['pessoas']} pessoas, {resumo['relacionamentos']} relacionamentos, "
+          f"{resumo['bytes'] / 1e6:.1f} MB em {resumo['duracao_s']}s")
+    return resumo
+
+
+async def _gravar_em_paralelo(rotulo: str, total: int, tamanho_lote: int, paralelo: int, montar_lote, gravar_lote) -> int:
+    from .database import sessao
+
+    semaforo = asyncio.Semaphore(paralelo)
+    gravados = 0
+
+    async def gravar(inicio: int):
+        nonlocal gravados
+        async with semaforo:
+            lote = montar_lote(inicio, inicio + tamanho_lote)
+            async with sessao() as db:
+                escritos = await gravar_lote(db, lote)
+            gravados += escritos
+            print(f"   {rotulo} {min(inicio + tamanho_lote, total)}/{total}")
+
+    await asyncio.gather(*(gravar(inicio) for inicio in range(0, total, tamanho_lote)))
+    return gravados
+
+
+async def restaurar(caminho: str, paralelo: int = PARALELO, tamanho_lote: int = LOTE_RESTAURACAO,
+                    limpar: bool = False) -> dict:
+    """
+    Grava o snapshot no Neo4j com os lotes UNWIND de /pessoas/bulk e /relacionamentos/bulk,
+    `paralelo` transações por vez: primeiro todas as pessoas, depois os relacionamentos
+    """
+    from .backends import crud
+    from .database import sessao
+    from .metricas import nomear_query
+    from .migracoes import criar_schema
+
+    inicio = time.perf_counter()
+    with Snapshot(caminho) as snap:
+        async with sessao() as db:
+            if limpar:
+                with nomear_query("snapshot.restaurar"):
+                    result = await db.run("MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS")
+                await result.consume()
+                print("✅ Banco limpo com sucesso!")
+            await criar_schema(db)
+        pessoas = await _gravar_em_paralelo("👥", snap.n_pessoas, tamanho_lote, paralelo,
+                                            snap.pessoas, crud.criar_pessoas_em_lote)
+        # deadlocks entre lotes que tocam as mesmas pessoas são refeitos pelas transações gerenciadas
+        relacionamentos = await _gravar_em_paralelo("🔗", snap.n_arestas, tamanho_lote, paralelo,
+                                                    snap.relacionamentos, crud.criar_relacionamentos_em_lote)
+    resumo = {"pessoas": pessoas, "relacionamentos": relacionamentos,
+              "duracao_s": round(time.perf_counter() - inicio, 2)}
+    print(f"✅ Snapshot restaurado em {resumo['duracao_s']}s: {pessoas} pessoas, {relacionamentos} relacionamentos")
+    return resumo
+
+
+async def _executar(args):
+    from .database import BACKEND, database
+
+    if BACKEND == "memoria":
+        raise SystemExit("❌ Exportar/restaurar usa o Neo4j: rode sem GRAFO_BACKEND=memoria")
+    await database.connect()
+    try:
+        if args.comando == "exportar":
+            await exportar(args.arquivo, args.lote or LOTE_EXPORTACAO)
+        else:
+            await restaurar(args.arquivo, args.paralelo, args.lote or LOTE_RESTAURACAO, args.limpar)
+    finally:
+        await database.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m app.snapshot", description="Snapshot compacto do grafo")
+    parser.add_argument("comando", choices=("exportar", "restaurar", "info"))
+    parser.add_argument("arquivo")
+    parser.add_argument("--lote", type=int, help="pessoas por leitura na exportação / linhas por lote na restauração")
+    parser.add_argument("--paralelo", type=int, default=PARALELO, help="transações de escrita simultâneas")
+    parser.add_argument("--limpar", action="store_true", help="apaga o grafo atual antes de restaurar")
+    args = parser.parse_args(argv)
+
+    if args.comando == "info":
+        with Snapshot(args.arquivo) as snap:
+            print(f"✅ {args.arquivo}: versão {VERSAO}, {snap.n_pessoas} pessoas, {snap.n_arestas} relacionamentos, "
+                  f"{os.path.getsize(args.arquivo) / 1e6:.1f} MB, checksum ok")
+        return
+    asyncio.run(_executar(args))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,20 @@
+"""
+Normalização de nomes para a busca: minúsculas e sem acentos
+"""
+import re
+import unicodedata
+from typing import List
+
+_TERMO = re.compile(r"\w+")
+
+
+def normalizar(texto: str) -> str:
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+def termos(texto: str) -> List[str]:
+    """
+    "José da Silva" -> ["jose", "da", "silva"]
+    """
+    return _TERMO.findall(normalizar(texto))
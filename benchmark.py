@@ -0,0 +1,237 @@
+"""
+Benchmark de carga dos endpoints da API.
+
+Dispara requisições em cada rota de app/main.py com concorrência alvo e registra
+latência p50/p95/p99 e vazão em um JSON, para comparar regressões entre commits.
+
+Exemplos:
+    python benchmark.py --url http://localhost:8000 --pessoas 10000
+    python benchmark.py --in-process --gerar 5000 --saida benchmarks/baseline.json
+    python benchmark.py --url http://localhost:8000 --comparar benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from gerar_grafo import INTERESSES
+
+SAIDA_PADRAO = os.path.join("benchmarks", "baseline.json")
+
+# nome -> (método, rota, gera parâmetros da rota)
+CENARIOS = {
+    "listar_pessoas": ("GET", "/pessoas/", lambda r, n: {}),
+    "buscar_pessoa": ("GET", "/pessoas/{id}", lambda r, n: {"id": r.randint(1, n)}),
+    "listar_amigos": ("GET", "/pessoas/{id}/amigos", lambda r, n: {"id": r.randint(1, n)}),
+    "recomendacoes": ("GET", "/recomendacoes/{id}", lambda r, n: {"id": r.randint(1, n)}),
+    "rede_social": ("GET", "/pessoas/{id}/rede/2", lambda r, n: {"id": r.randint(1, n)}),
+    "buscar_por_interesse": ("GET", "/pessoas/interesse/{interesse}", lambda r, n: {"interesse": r.choice(INTERESSES)}),
+    "caminho_entre_pessoas": ("GET", "/caminho/{id1}/{id2}", lambda r, n: {"id1": r.randint(1, n), "id2": r.randint(1, n)}),
+    "estatisticas_rede": ("GET", "/estatisticas/", lambda r, n: {}),
+    "pessoas_similares": ("GET", "/pessoas/{id}/similares", lambda r, n: {"id": r.randint(1, n)}),
+    "filtrar_pessoas": ("GET", "/pessoas/filtro?interesses={interesse}&ordenar=-grau&limit=50",
+                        lambda r, n: {"interesse": r.choice(INTERESSES)}),
+    "pool": ("GET", "/database/pool", lambda r, n: {}),
+}
+
+CENARIOS_ESCRITA = {
+    "criar_pessoa": ("POST", "/pessoas/", lambda r, n: {}),
+    "criar_relacionamento": ("POST", "/pessoas/{id1}/conhece/{id2}", lambda r, n: {"id1": r.randint(1, n), "id2": r.randint(1, n)}),
+}
+
+
+def percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return 0.0
+    k = (len(valores_ordenados) - 1) * p / 100
+    i = int(k)
+    j = min(i + 1, len(valores_ordenados) - 1)
+    return valores_ordenados[i] + (valores_ordenados[j] - valores_ordenados[i]) * (k - i)
+
+
+def _corpo(nome, rng):
+    if nome == "criar_pessoa":
+        return {
+            "nome": f"Benchmark {rng.randint(0, 10 ** 9)}",
+            "idade": rng.randint(18, 80),
+            "cidade": "São Paulo",
+            "interesses": rng.sample(INTERESSES, 3),
+        }
+    return None
+
+
+async def executar_cenario(cliente, nome, cenario, n_pessoas, concorrencia, requisicoes, seed):
+    metodo, rota, parametros = cenario
+    rng = random.Random(f"{seed}:{nome}")
+    alvos = []
+    for _ in range(requisicoes):
+        alvos.append((rota.format(**parametros(rng, n_pessoas)), _corpo(nome, rng)))
+
+    latencias = []
+    status = {}
+    fila = iter(alvos)
+
+    async def trabalhador():
+        for url, corpo in fila:
+            inicio = time.perf_counter()
+            try:
+                resposta = await cliente.request(metodo, url, json=corpo)
+                await resposta.aread()
+                codigo = str(resposta.status_code)
+            except httpx.HTTPError as e:
+                codigo = type(e).__name__
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            status[codigo] = status.get(codigo, 0) + 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "metodo": metodo,
+        "rota": rota,
+        "requisicoes": len(latencias),
+        "status": status,
+        "p50_ms": round(percentil(latencias, 50), 3),
+        "p95_ms": round(percentil(latencias, 95), 3),
+        "p99_ms": round(percentil(latencias, 99), 3),
+        "max_ms": round(latencias[-1], 3) if latencias else 0.0,
+        "vazao_rps": round(len(latencias) / duracao, 2) if duracao else 0.0,
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(atual, baseline, tolerancia):
+    """
+    Imprime a variação de p95 e vazão contra o baseline e retorna as rotas que regrediram
+    """
+    regressoes = []
+    print(f"\n📊 Comparação com {baseline.get('commit') or 'baseline'} (tolerância {tolerancia:.0%})")
+    for nome, resultado in atual["cenarios"].items():
+        anterior = baseline.get("cenarios", {}).get(nome)
+        if not anterior or not anterior["p95_ms"]:
+            continue
+        delta = resultado["p95_ms"] / anterior["p95_ms"] - 1
+        marcador = "🔴" if delta > tolerancia else "🟢"
+        print(f"  {marcador} {nome:24} p95 {anterior['p95_ms']:>9.2f} → {resultado['p95_ms']:>9.2f} ms ({delta:+.0%})"
+              f"  vazão {anterior['vazao_rps']:>8.1f} → {resultado['vazao_rps']:>8.1f} req/s")
+        if delta > tolerancia:
+            regressoes.append(nome)
+    return regressoes
+
+
+async def _cliente_em_processo(args):
+    """
+    Executa a aplicação no próprio processo (ASGI), sem servidor HTTP, com o ciclo de vida da app
+    """
+    from app.main import app
+
+    transporte = httpx.ASGITransport(app=app)
+    cliente = httpx.AsyncClient(transport=transporte, base_url="http://benchmark", timeout=args.timeout)
+    return app, cliente
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga dos endpoints")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--in-process", action="store_true", help="executa a app no próprio processo")
+    parser.add_argument("--pessoas", type=int, default=1000, help="ids sorteados em 1..N")
+    parser.add_argument("--gerar", type=int, help="gera e carrega um grafo sintético com N pessoas antes")
+    parser.add_argument("--grau-medio", type=int, default=10)
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--requisicoes", type=int, default=500, help="requisições por rota")
+    parser.add_argument("--rotas", nargs="*", help="limita o benchmark a estes cenários")
+    parser.add_argument("--incluir-escritas", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--saida", default=SAIDA_PADRAO)
+    parser.add_argument("--comparar", help="baseline JSON para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.10, help="piora de p95 aceita (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    # lido antes de rodar: --saida pode apontar para o próprio baseline
+    baseline = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    cenarios = dict(CENARIOS)
+    if args.incluir_escritas:
+        cenarios.update(CENARIOS_ESCRITA)
+    if args.rotas:
+        cenarios = {nome: c for nome, c in cenarios.items() if nome in args.rotas}
+
+    if args.in_process:
+        app, cliente = await _cliente_em_processo(args)
+        ciclo_de_vida = app.router.lifespan_context(app)
+    else:
+        cliente = httpx.AsyncClient(base_url=args.url, timeout=args.timeout,
+                                    limits=httpx.Limits(max_connections=args.concorrencia))
+        ciclo_de_vida = None
+
+    n_pessoas = args.pessoas
+    resultado = {
+        "commit": _commit_atual(),
+        "data": datetime.now(timezone.utc).isoformat(),
+        "alvo": "in-process" if args.in_process else args.url,
+        "parametros": {
+            "pessoas": args.gerar or n_pessoas,
+            "concorrencia": args.concorrencia,
+            "requisicoes_por_rota": args.requisicoes,
+            "seed": args.seed,
+        },
+        "ambiente": {"python": platform.python_version(), "plataforma": platform.platform()},
+        "cenarios": {},
+    }
+
+    try:
+        if ciclo_de_vida is not None:
+            from app.ciclo_de_vida import aguardar_pronto
+
+            await ciclo_de_vida.__aenter__()
+            await aguardar_pronto()
+        if args.gerar:
+            from gerar_grafo import carregar_grafo, gerar_grafo
+            from app.database import sessao
+
+            pessoas, relacionamentos = gerar_grafo(args.gerar, args.grau_medio, args.seed)
+            async with sessao() as db:
+                await carregar_grafo(db, pessoas, relacionamentos)
+            n_pessoas = args.gerar
+
+        async with cliente:
+            for nome, cenario in cenarios.items():
+                r = await executar_cenario(cliente, nome, cenario, n_pessoas,
+                                           args.concorrencia, args.requisicoes, args.seed)
+                resultado["cenarios"][nome] = r
+                print(f"⏱  {nome:24} p50 {r['p50_ms']:>8.2f}  p95 {r['p95_ms']:>8.2f}  "
+                      f"p99 {r['p99_ms']:>8.2f} ms  {r['vazao_rps']:>8.1f} req/s  {r['status']}")
+    finally:
+        if ciclo_de_vida is not None:
+            await ciclo_de_vida.__aexit__(None, None, None)
+
+    os.makedirs(os.path.dirname(args.saida) or ".", exist_ok=True)
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"💾 Resultado salvo em {args.saida}")
+
+    if baseline is not None and comparar(resultado, baseline, args.tolerancia):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,177 @@
+"""
+Micro-benchmark do caminho de serialização das listagens.
+
+Mede, para páginas de N pessoas, cada etapa entre os registros do driver e o
+corpo da resposta de /pessoas/ (response_model List[Pessoa]) e de
+/pessoas/interesse/{interesse} (sem response_model, passa pelo jsonable_encoder):
+
+  montagem   registro com o nó -> dict campo a campo, ou projeção de mapa já pronta
+  resposta   o que o FastAPI faz com o retorno da rota: validação/encoder + json ou orjson
+
+Exemplos:
+    python benchmark_serializacao.py
+    python benchmark_serializacao.py --tamanhos 100 1000 --repeticoes 200 --saida benchmarks/serializacao.json
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import random
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from neo4j import Record
+from neo4j.graph import Graph, Node
+
+from app import schemas
+from gerar_grafo import INTERESSES
+
+CIDADES = ["São Paulo", "Rio de Janeiro", "Belo Horizonte", "Curitiba", "Porto Alegre", None]
+
+
+def gerar_pessoas(n: int, seed: int) -> List[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i,
+            "nome": f"Pessoa {rng.randint(0, 10 ** 6)}",
+            "idade": rng.randint(18, 80),
+            "interesses": rng.sample(INTERESSES, 3),
+            "cidade": rng.choice(CIDADES),
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def registros_com_no(pessoas: List[dict]) -> List[Record]:
+    """
+    Como o driver entregava antes: RETURN p, p.pessoa_id as id
+    """
+    grafo = Graph()
+    registros = []
+    for p in pessoas:
+        propriedades = {"pessoa_id": p["id"], "nome": p["nome"], "idade": p["idade"], "interesses": p["interesses"]}
+        if p["cidade"] is not None:
+            propriedades["cidade"] = p["cidade"]
+        no = Node(grafo, f"4:bench:{p['id']}", p["id"], ["Pessoa"], propriedades)
+        registros.append(Record({"p": no, "id": p["id"]}))
+    return registros
+
+
+def registros_projetados(pessoas: List[dict]) -> List[Record]:
+    """
+    Como o driver entrega agora: RETURN p {id: p.pessoa_id, .nome, ...}
+    """
+    return [Record({"pessoa": dict(p)}) for p in pessoas]
+
+
+def montar_campo_a_campo(registros: List[Record]) -> List[dict]:
+    return [
+        {
+            "id": record[1],
+            "nome": record[0]["nome"],
+            "idade": record[0]["idade"],
+            "interesses": record[0]["interesses"],
+            "cidade": record[0].get("cidade"),
+        }
+        for record in registros
+    ]
+
+
+def montar_projecao(registros: List[Record]) -> List[dict]:
+    return [record[0] for record in registros]
+
+
+CAMPO_PESSOAS = create_response_field(name="Response_listar_pessoas", type_=List[schemas.Pessoa])
+
+
+async def resposta_validada(pessoas, campo, classe):
+    conteudo = await serialize_response(field=campo, response_content=pessoas, is_coroutine=True)
+    return classe(conteudo).body
+
+
+async def resposta_direta(pessoas, campo, classe):
+    return classe(pessoas).body
+
+
+# nome -> (montagem, resposta, classe da resposta); "validação" em rota sem response_model é o jsonable_encoder
+VARIANTES = {
+    "antes (nó + validação + json)": (montar_campo_a_campo, resposta_validada, JSONResponse),
+    "projeção + validação + orjson": (montar_projecao, resposta_validada, ORJSONResponse),
+    "projeção + orjson sem validação": (montar_projecao, resposta_direta, ORJSONResponse),
+}
+
+ROTAS = {
+    "/pessoas/": CAMPO_PESSOAS,
+    "/pessoas/interesse/{interesse}": None,
+}
+
+
+async def medir(funcao, repeticoes: int) -> float:
+    """
+    Mediana em microssegundos
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        retorno = funcao()
+        if inspect.isawaitable(retorno):
+            await retorno
+        tempos.append(time.perf_counter() - inicio)
+    tempos.sort()
+    return tempos[len(tempos) // 2] * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark da serialização das listagens")
+    parser.add_argument("--tamanhos", type=int, nargs="*", default=[100, 1000])
+    parser.add_argument("--repeticoes", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--saida", help="salva o resultado em JSON")
+    args = parser.parse_args()
+
+    resultado = {}
+    for rota, campo in ROTAS.items():
+        for n in args.tamanhos:
+            pessoas = gerar_pessoas(n, args.seed)
+            entradas = {
+                montar_campo_a_campo: registros_com_no(pessoas),
+                montar_projecao: registros_projetados(pessoas),
+            }
+            # todas as variantes produzem o mesmo JSON
+            corpos = set()
+            for montar, responder, classe in VARIANTES.values():
+                corpo = await responder(montar(entradas[montar]), campo, classe)
+                corpos.add(json.dumps(json.loads(corpo), sort_keys=True))
+            assert len(corpos) == 1, "variantes produziram respostas diferentes"
+
+            print(f"\n📦 {rota} — {n} pessoas (mediana de {args.repeticoes})")
+            base = None
+            for nome, (montar, responder, classe) in VARIANTES.items():
+                registros = entradas[montar]
+                montagem = await medir(lambda: montar(registros), args.repeticoes)
+                lista = montar(registros)
+                resposta = await medir(lambda: responder(lista, campo, classe), args.repeticoes)
+                total = montagem + resposta
+                base = base or total
+                print(f"  {nome:34} montagem {montagem:>9.0f} µs  resposta {resposta:>9.0f} µs  "
+                      f"total {total:>9.0f} µs  ({base / total:.1f}x)")
+                resultado.setdefault(rota, {}).setdefault(str(n), {})[nome] = {
+                    "montagem_us": round(montagem, 1),
+                    "resposta_us": round(resposta, 1),
+                    "total_us": round(total, 1),
+                }
+
+    if args.saida:
+        os.makedirs(os.path.dirname(args.saida) or ".", exist_ok=True)
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultado salvo em {args.saida}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
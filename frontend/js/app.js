@@ -1,14 +1,18 @@
 // Configuração da API
-const API_BASE_URL = 'http://localhost:8000';
+// servido pela própria API (/static/) em produção; pelo servidor de desenvolvimento na porta 8080
+const API_BASE_URL = window.location.port === '8080' ? 'http://localhost:8000' : window.location.origin;
 
 // Elementos DOM
 let pessoasCache = [];
+let pessoaDetalhada = null;
 
 // Inicialização
 document.addEventListener('DOMContentLoaded', () => {
+  initFeed();
   carregarPessoas();
   carregarEstatisticas();
   document.getElementById('person-form').addEventListener('submit', adicionarPessoa);
+  initBuscaNome();
   initThemeToggle();
 });
 
@@ -85,19 +89,34 @@ function unlockLoading() {
 }
 
 // API Functions
+// Bookmarks da última escrita: reenviados nas leituras logo depois dela, elas enxergam a escrita em qualquer
+// worker e não passam pelo cache de respostas (que pode ter a versão anterior em outro worker)
+const BOOKMARKS_VALIDADE_MS = 10000;
+let ultimaEscrita = { bookmarks: null, em: 0 };
+
+function headersBookmarks() {
+    if (!ultimaEscrita.bookmarks || Date.now() - ultimaEscrita.em > BOOKMARKS_VALIDADE_MS) return {};
+    return { 'X-Neo4j-Bookmarks': ultimaEscrita.bookmarks };
+}
+
 async function apiCall(endpoint, options = {}) {
     try {
         const response = await fetch(`${API_BASE_URL}${endpoint}`, {
+            ...options,
             headers: {
                 'Content-Type': 'application/json',
+                ...headersBookmarks(),
                 ...options.headers
-            },
-            ...options
+            }
         });
         
         if (!response.ok) {
             throw new Error(`Erro HTTP: ${response.status}`);
         }
+        const bookmarks = response.headers.get('X-Neo4j-Bookmarks');
+        if (bookmarks) {
+            ultimaEscrita = { bookmarks, em: Date.now() };
+        }
         
         return await response.json();
     } catch (error) {
@@ -119,6 +138,90 @@ async function carregarPessoas() {
     hideLoading();
   }
 }
+
+// Busca por nome no servidor (GET /pessoas/busca): só depois que o usuário para de digitar
+const BUSCA_DEBOUNCE_MS = 250;
+const BUSCA_LIMITE = 50;
+let buscaTimer = null;
+let buscaController = null;
+
+function initBuscaNome() {
+  document.getElementById('nome-busca').addEventListener('input', () => {
+    clearTimeout(buscaTimer);
+    buscaTimer = setTimeout(atualizarPessoas, BUSCA_DEBOUNCE_MS);
+  });
+}
+
+async function atualizarPessoas() {
+  const q = document.getElementById('nome-busca').value.trim();
+  // resposta de uma busca anterior que ainda não chegou não sobrescreve a atual
+  if (buscaController) buscaController.abort();
+  buscaController = null;
+  if (!q) {
+    return carregarPessoas();
+  }
+  const controller = new AbortController();
+  buscaController = controller;
+  try {
+    const pessoas = await apiCall(`/pessoas/busca?q=${encodeURIComponent(q)}&limit=${BUSCA_LIMITE}`, {
+      signal: controller.signal
+    });
+    renderizarPessoas(pessoas, `Nenhuma pessoa encontrada para "${q}".`);
+  } catch (error) {
+    if (error.name !== 'AbortError') {
+      console.error('Erro na busca por nome:', error);
+    }
+  } finally {
+    if (buscaController === controller) buscaController = null;
+  }
+}
+
+// Feed de alterações (GET /eventos): aplica pessoas e estatísticas recebidas em vez de reler as listas
+let feed = null;
+
+function initFeed() {
+  if (!window.EventSource) return;
+  // o EventSource reconecta sozinho enviando Last-Event-ID; o servidor continua de onde parou
+  feed = new EventSource(`${API_BASE_URL}/eventos`);
+  feed.addEventListener('pessoa', (event) => aplicarPessoa(JSON.parse(event.data)));
+  feed.addEventListener('relacionamento', (event) => aplicarRelacionamento(JSON.parse(event.data)));
+  feed.addEventListener('estatisticas', (event) => renderizarEstatisticas(JSON.parse(event.data)));
+  // o servidor descartou eventos (conexão lenta ou id não retomável): relê tudo uma vez
+  feed.addEventListener('reset', () => {
+    atualizarPessoas();
+    carregarEstatisticas();
+  });
+}
+
+// mesma regra de GET /pessoas/busca: cada termo da busca é prefixo de algum termo do nome
+function termosBusca(texto) {
+  return texto.normalize('NFKD').replace(/\p{M}/gu, '').toLowerCase().match(/[\p{L}\p{N}_]+/gu) || [];
+}
+
+function casaComBusca(nome) {
+  const termosNome = termosBusca(nome);
+  return termosBusca(document.getElementById('nome-busca').value)
+    .every(termo => termosNome.some(t => t.startsWith(termo)));
+}
+
+function aplicarPessoa(pessoa) {
+  const indice = pessoasCache.findIndex(p => p.id === pessoa.id);
+  if (indice >= 0) {
+    pessoasCache[indice] = pessoa;
+  } else if (casaComBusca(pessoa.nome)) {
+    pessoasCache.push(pessoa);
+  } else {
+    return;
+  }
+  renderizarPessoas(pessoasCache);
+}
+
+function aplicarRelacionamento({ pessoa_id1, pessoa_id2 }) {
+  const aberto = !document.getElementById('pessoa-detalhes').classList.contains('hidden');
+  if (aberto && [pessoa_id1, pessoa_id2].includes(pessoaDetalhada)) {
+    verDetalhes(pessoaDetalhada);
+  }
+}
 // Carregar Estatísticas
 async function carregarEstatisticas() {
     try {
@@ -156,7 +259,8 @@ async function adicionarPessoa(event) {
         });
         
         event.target.reset();
-        await carregarPessoas();
+        // relê mesmo com o feed aberto: com vários workers o POST pode cair num worker diferente do feed
+        await atualizarPessoas();
         await carregarEstatisticas();
         
         alert('Pessoa adicionada com sucesso!');
@@ -219,11 +323,15 @@ async function verRedeSocial(pessoaId, nomePessoa) {
     }
 }
 // Renderização
-function renderizarPessoas(pessoas) {
+function renderizarPessoas(pessoas, mensagemVazia = 'Nenhuma pessoa cadastrada.') {
     const container = document.getElementById('pessoas-list');
+    pessoasCache = pessoas;
     
     if (pessoas.length === 0) {
-        container.innerHTML = '<p>Nenhuma pessoa cadastrada.</p>';
+        // a mensagem pode trazer o texto digitado na busca: vai como texto, não como HTML
+        const paragrafo = document.createElement('p');
+        paragrafo.textContent = mensagemVazia;
+        container.replaceChildren(paragrafo);
         return;
     }
     
@@ -303,6 +411,7 @@ function renderizarDetalhesPessoa(pessoa, amigos, similares, rede) {
     const titulo = document.getElementById('detalhes-titulo');
     
     titulo.textContent = `Detalhes: ${pessoa.nome}`;
+    pessoaDetalhada = pessoa.id;
     
     container.innerHTML = `
         <div class="detalhes-section">
@@ -399,6 +508,7 @@ function renderizarRedeSocial(rede, nomePessoa) {
 // Funções de UI
 function fecharDetalhes() {
     document.getElementById('pessoa-detalhes').classList.add('hidden');
+    pessoaDetalhada = null;
 }
 
 function fecharRede() {
@@ -418,7 +528,8 @@ async function criarRelacionamento(pessoaId1, pessoaId2) {
         });
         
         alert('Relacionamento criado com sucesso!');
-        await carregarPessoas();
+        // relê mesmo com o feed aberto: com vários workers o POST pode cair num worker diferente do feed
+        await atualizarPessoas();
         await carregarEstatisticas();
     } catch (error) {
         console.error('Erro ao criar relacionamento:', error);
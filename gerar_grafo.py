@@ -0,0 +1,184 @@
+"""
+Gerador de grafos sintéticos em escala de produção.
+
+Gera pessoas com cidades e interesses em distribuição de cauda longa (Zipf) e
+relacionamentos CONHECE por ligação preferencial (grau em lei de potência).
+A mesma seed sempre gera o mesmo grafo.
+
+Exemplos:
+    python gerar_grafo.py --pessoas 100000 --grau-medio 10 --seed 42 --limpar
+    python gerar_grafo.py --pessoas 100000 --saida dados/   # gera NDJSON para /pessoas/bulk
+    python gerar_grafo.py --pessoas 1000000 --snapshot grafo.snap   # snapshot para app.snapshot / GRAFO_SNAPSHOT
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Iterator, List, Tuple
+
+PRIMEIROS_NOMES = [
+    "Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Fernando", "Gabriela", "Heitor",
+    "Isabela", "João", "Karina", "Lucas", "Mariana", "Nicolas", "Olívia", "Pedro",
+    "Quésia", "Rafael", "Sofia", "Thiago", "Úrsula", "Vinícius", "Wesley", "Yasmin",
+    "Alice", "Bob", "Carol", "David", "Eva", "Felipe", "Gina", "Helena", "Igor", "Júlia",
+]
+SOBRENOMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira",
+    "Lima", "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes",
+    "Soares", "Fernandes", "Vieira", "Barbosa", "Rocha", "Dias", "Nascimento", "Andrade",
+]
+CIDADES = [
+    "São Paulo", "Rio de Janeiro", "Belo Horizonte", "Brasília", "Salvador", "Fortaleza",
+    "Curitiba", "Manaus", "Recife", "Porto Alegre", "Goiânia", "Belém", "Campinas",
+    "São Luís", "Maceió", "Natal", "Florianópolis", "Vitória", "João Pessoa", "Cuiabá",
+]
+INTERESSES = [
+    "música", "tecnologia", "esportes", "viagens", "cinema", "leitura", "programação",
+    "gastronomia", "culinária", "arte", "fotografia", "yoga", "natureza", "festas",
+    "cerveja", "games", "dança", "teatro", "moda", "política", "história", "ciência",
+    "astronomia", "jardinagem", "pets", "corrida", "ciclismo", "futebol", "vôlei",
+    "natação", "meditação", "idiomas", "empreendedorismo", "investimentos", "séries",
+    "anime", "quadrinhos", "vinho", "café", "trilhas",
+]
+
+
+def _pesos_zipf(n: int, expoente: float = 1.1) -> List[float]:
+    return [1.0 / (i + 1) ** expoente for i in range(n)]
+
+
+def gerar_pessoas(n_pessoas: int, rng: random.Random) -> Iterator[dict]:
+    pesos_cidades = _pesos_zipf(len(CIDADES))
+    pesos_interesses = _pesos_zipf(len(INTERESSES), 0.9)
+    for pessoa_id in range(1, n_pessoas + 1):
+        quantidade = min(len(INTERESSES), max(1, int(rng.gauss(3, 1.2))))
+        interesses = set()
+        while len(interesses) < quantidade:
+            interesses.update(rng.choices(INTERESSES, weights=pesos_interesses, k=quantidade - len(interesses)))
+        yield {
+            "id": pessoa_id,
+            "nome": f"{rng.choice(PRIMEIROS_NOMES)} {rng.choice(SOBRENOMES)}",
+            "idade": max(14, min(90, int(rng.gauss(32, 11)))),
+            "cidade": rng.choices(CIDADES, weights=pesos_cidades)[0],
+            "interesses": sorted(interesses),
+        }
+
+
+def gerar_relacionamentos(n_pessoas: int, grau_medio: int, rng: random.Random) -> Iterator[Tuple[int, int]]:
+    """
+    Ligação preferencial (Barabási–Albert): cada nova pessoa conhece m pessoas já
+    existentes escolhidas com probabilidade proporcional ao grau, o que gera uma
+    distribuição de graus em lei de potência. A direção de cada aresta é sorteada.
+    """
+    m = max(1, grau_medio // 2)
+    # cada pessoa aparece aqui uma vez por aresta em que participa
+    extremidades: List[int] = []
+    inicial = min(n_pessoas, m + 1)
+    for a in range(1, inicial + 1):
+        for b in range(a + 1, inicial + 1):
+            extremidades += (a, b)
+            yield (a, b) if rng.random() < 0.5 else (b, a)
+    for nova in range(inicial + 1, n_pessoas + 1):
+        escolhidas = set()
+        while len(escolhidas) < m:
+            escolhidas.add(rng.choice(extremidades))
+        for alvo in escolhidas:
+            extremidades += (nova, alvo)
+            yield (nova, alvo) if rng.random() < 0.5 else (alvo, nova)
+
+
+def gerar_grafo(n_pessoas: int, grau_medio: int = 10, seed: int = 42):
+    """
+    Retorna (pessoas, relacionamentos) determinísticos para a seed informada
+    """
+    rng = random.Random(seed)
+    pessoas = list(gerar_pessoas(n_pessoas, rng))
+    relacionamentos = [
+        {"pessoa_id1": a, "pessoa_id2": b}
+        for a, b in gerar_relacionamentos(n_pessoas, grau_medio, rng)
+    ]
+    return pessoas, relacionamentos
+
+
+def _lotes(itens: list, tamanho: int):
+    for i in range(0, len(itens), tamanho):
+        yield itens[i:i + tamanho]
+
+
+async def carregar_grafo(db, pessoas: list, relacionamentos: list, tamanho_lote: int = 5000):
+    """
+    Grava o grafo pelos mesmos lotes UNWIND usados por /pessoas/bulk e /relacionamentos/bulk
+    """
+    from app.backends import crud
+
+    inicio = time.perf_counter()
+    for i, lote in enumerate(_lotes(pessoas, tamanho_lote), start=1):
+        await crud.criar_pessoas_em_lote(db, lote)
+        print(f"   👥 {min(i * tamanho_lote, len(pessoas))}/{len(pessoas)} pessoas")
+    for i, lote in enumerate(_lotes(relacionamentos, tamanho_lote), start=1):
+        await crud.criar_relacionamentos_em_lote(db, lote)
+        print(f"   🔗 {min(i * tamanho_lote, len(relacionamentos))}/{len(relacionamentos)} relacionamentos")
+    print(f"✅ Grafo carregado em {time.perf_counter() - inicio:.1f}s")
+
+
+def salvar_ndjson(diretorio: str, pessoas: list, relacionamentos: list):
+    os.makedirs(diretorio, exist_ok=True)
+    for nome, itens in (("pessoas.ndjson", pessoas), ("relacionamentos.ndjson", relacionamentos)):
+        with open(os.path.join(diretorio, nome), "w", encoding="utf-8") as f:
+            for item in itens:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    print(f"✅ NDJSON salvo em {diretorio}")
+
+
+def salvar_snapshot(caminho: str, pessoas: list, relacionamentos: list):
+    from app.snapshot import Colunas
+
+    colunas = Colunas()
+    for pessoa in pessoas:
+        colunas.adicionar_pessoa(pessoa)
+    for r in relacionamentos:
+        colunas.adicionar_relacionamento(r["pessoa_id1"], r["pessoa_id2"])
+    resumo = colunas.gravar(caminho)
+    print(f"✅ Snapshot salvo em {caminho} ({resumo['bytes'] / 1e6:.1f} MB)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Gera um grafo social sintético")
+    parser.add_argument("--pessoas", type=int, default=10000)
+    parser.add_argument("--grau-medio", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--lote", type=int, default=5000, help="tamanho dos lotes UNWIND")
+    parser.add_argument("--limpar", action="store_true", help="apaga o grafo atual antes de carregar")
+    parser.add_argument("--saida", help="grava NDJSON neste diretório em vez de carregar no banco")
+    parser.add_argument("--snapshot", help="grava um snapshot (app/snapshot.py) em vez de carregar no banco")
+    args = parser.parse_args()
+
+    pessoas, relacionamentos = gerar_grafo(args.pessoas, args.grau_medio, args.seed)
+    print(f"🎲 {len(pessoas)} pessoas e {len(relacionamentos)} relacionamentos gerados (seed {args.seed})")
+
+    if args.saida:
+        salvar_ndjson(args.saida, pessoas, relacionamentos)
+        return
+    if args.snapshot:
+        salvar_snapshot(args.snapshot, pessoas, relacionamentos)
+        return
+
+    from app.database import database, sessao
+    from app.migracoes import criar_schema
+
+    await database.connect()
+    try:
+        async with sessao() as db:
+            if args.limpar:
+                result = await db.run("MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS")
+                await result.consume()
+                print("✅ Banco limpo com sucesso!")
+            await criar_schema(db)
+            await carregar_grafo(db, pessoas, relacionamentos, args.lote)
+    finally:
+        await database.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
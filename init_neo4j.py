@@ -1,5 +1,6 @@
 import asyncio
 from app.database import database
+from app.migracoes import migrar
 
 async def init_sample_data():
     await database.connect()
@@ -29,6 +30,8 @@ async def init_sample_data():
     record = await result.single()
     print(record["message"])
     
+    await migrar(session)
+    
     await database.close()
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 import asyncio
 from app.database import database
+from app.migracoes import migrar
 
 async def populate_sample_data():
     await database.connect()
@@ -52,7 +53,10 @@ async def populate_sample_data():
         await session.run(query_create_relationships)
         print("✅ Relacionamentos criados com sucesso!")
         
-        # Query 4: Verificar dados criados
+        # Query 4: Constraints, índices e pessoa_id das pessoas criadas
+        await migrar(session)
+        
+        # Query 5: Verificar dados criados
         query_verify = """
         MATCH (p:Pessoa)
         RETURN count(p) as total_pessoas
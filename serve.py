@@ -1,3 +1,12 @@
+"""
+Sobe a aplicação.
+
+    python serve.py                      # desenvolvimento: backend com reload + frontend na porta 8080
+    python serve.py --producao           # N workers (padrão: número de CPUs), uvloop + httptools
+    python serve.py --producao --workers 4 --pool-total 200
+"""
+import argparse
+import asyncio
 import uvicorn
 import threading
 import time
@@ -19,7 +28,7 @@ def start_backend():
     print("🚀 Backend iniciando...")
     uvicorn.run("app.main:app", host="localhost", port=8000, reload=True)
 
-if __name__ == "__main__":
+def desenvolvimento():
     # Verificar se a pasta frontend existe
     if not os.path.exists("frontend"):
         print("❌ Pasta 'frontend' não encontrada!")
@@ -36,4 +45,77 @@ if __name__ == "__main__":
     time.sleep(3)
     
     # Iniciar frontend
-    start_frontend()
\ No newline at end of file
+    start_frontend()
+
+def _migrar_uma_vez():
+    """
+    Migrações no processo principal, antes dos workers: evita N workers alterando o schema ao mesmo tempo
+    """
+    from app import migracoes
+    from app.database import BACKEND
+
+    if BACKEND == "memoria":
+        return
+    try:
+        # banco fora do ar não segura a subida: os workers continuam tentando em segundo plano
+        asyncio.run(asyncio.wait_for(migracoes.main(), timeout=15))
+        os.environ["MIGRAR_NA_INICIALIZACAO"] = "false"
+    except (Exception, asyncio.TimeoutError) as e:
+        print(f"❌ Migração antes dos workers falhou ({e or 'timeout'}); cada worker tentará na inicialização")
+
+def producao(args):
+    """
+    Workers do uvicorn (processos separados, cada um com seu pool do Neo4j), servindo também o frontend
+    em /static/. No SIGTERM o uvicorn para de aceitar conexões e espera as requisições em andamento por até
+    --graceful-timeout segundos antes de rodar o shutdown do lifespan (que fecha o driver).
+    """
+    from app.estaticos import comprimir
+
+    workers = args.workers
+    # os workers leem o total (ex.: app/alteracoes.py decide se o feed precisa do canal no redis)
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    if args.pool_total:
+        # o pool é por processo: divide o orçamento total de conexões entre os workers
+        os.environ["NEO4J_MAX_POOL_SIZE"] = str(max(1, args.pool_total // workers))
+    if os.path.exists("frontend"):
+        comprimir("frontend")
+    if args.migrar:
+        _migrar_uma_vez()
+
+    print(f"🚀 Produção: {workers} workers em http://{args.host}:{args.port} "
+          f"(pool Neo4j por worker: {os.getenv('NEO4J_MAX_POOL_SIZE', '100')})")
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        timeout_graceful_shutdown=args.graceful_timeout,
+        timeout_keep_alive=args.keep_alive,
+        proxy_headers=True,
+        forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        access_log=args.access_log,
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor da API e do frontend")
+    parser.add_argument("--producao", action="store_true", help="modo produção com vários workers")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int,
+                        default=int(os.getenv("WEB_CONCURRENCY", "0")) or os.cpu_count() or 1)
+    parser.add_argument("--pool-total", type=int, default=int(os.getenv("NEO4J_POOL_TOTAL", "0")),
+                        help="conexões com o Neo4j somando todos os workers (padrão: NEO4J_MAX_POOL_SIZE por worker)")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT_S", "30")),
+                        help="segundos para drenar requisições em andamento no shutdown")
+    parser.add_argument("--keep-alive", type=int, default=int(os.getenv("KEEP_ALIVE_S", "5")))
+    parser.add_argument("--sem-migrar", dest="migrar", action="store_false",
+                        help="não roda as migrações antes de subir os workers")
+    parser.add_argument("--access-log", action="store_true")
+    args = parser.parse_args()
+
+    if args.producao:
+        producao(args)
+    else:
+        desenvolvimento()
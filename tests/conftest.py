@@ -0,0 +1,47 @@
+"""
+Os testes rodam sobre o grafo em memória (GRAFO_BACKEND=memoria), sem Neo4j.
+
+O backend é escolhido na importação de app.database, por isso a variável é
+definida antes de qualquer import do app.
+"""
+import os
+
+os.environ["GRAFO_BACKEND"] = "memoria"
+os.environ.pop("GRAFO_SNAPSHOT", None)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database import database  # noqa: E402
+from app.grafo_memoria import GrafoMemoria  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture
+def grafo():
+    return GrafoMemoria()
+
+
+@pytest.fixture
+def cliente():
+    # cada teste começa com um grafo vazio; caches e índices são limpos no shutdown do lifespan
+    database.grafo = None
+    with TestClient(app) as c:
+        yield c
+    database.grafo = None
+
+
+@pytest.fixture
+def criar_pessoas(cliente):
+    """
+    criar_pessoas("Ana", "Bia", cidade="Rio") -> ids criados, na ordem
+    """
+    def criar(*nomes, **campos):
+        ids = []
+        for nome in nomes:
+            corpo = {"nome": nome, "idade": 30, "interesses": [], **campos}
+            resposta = cliente.post("/pessoas/", json=corpo)
+            assert resposta.status_code == 200, resposta.text
+            ids.append(resposta.json()["id"])
+        return ids
+    return criar
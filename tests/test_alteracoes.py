@@ -0,0 +1,114 @@
+import pytest
+
+from app import alteracoes, eventos
+from app.alteracoes import EPOCA, Difusor, FeedLotado
+
+
+def test_eventos_pendentes_da_mesma_chave_sao_coalescidos():
+    difusor = Difusor(buffer=10)
+    cliente = difusor.conectar()
+    difusor.publicar("pessoa", ("pessoa", 1), {"id": 1, "nome": "Ana"})
+    difusor.publicar("pessoa", ("pessoa", 2), {"id": 2, "nome": "Bia"})
+    difusor.publicar("pessoa", ("pessoa", 1), {"id": 1, "nome": "Ana Maria"})
+
+    reset, pendentes = cliente.retirar()
+
+    assert not reset
+    # o mais recente substitui o pendente e vai para o fim: os ids continuam crescentes
+    assert [(e.seq, e.dados["nome"]) for e in pendentes] == [(2, "Bia"), (3, "Ana Maria")]
+    assert cliente.coalescidos == 1
+    assert cliente.retirar() == (False, [])
+
+
+def test_buffer_cheio_vira_reset():
+    difusor = Difusor(buffer=2)
+    lento = difusor.conectar()
+    rapido = difusor.conectar()
+    for pessoa_id in range(3):
+        difusor.publicar("pessoa", ("pessoa", pessoa_id), {"id": pessoa_id})
+        if pessoa_id < 2:
+            rapido.retirar()
+
+    assert lento.retirar() == (True, [])
+    assert rapido.retirar()[1][0].seq == 3
+    # depois do reset o cliente volta a receber normalmente
+    difusor.publicar("pessoa", ("pessoa", 9), {"id": 9})
+    assert [e.seq for e in lento.retirar()[1]] == [4]
+
+
+def test_reconexao_retoma_do_historico_ou_pede_reset():
+    difusor = Difusor(historico=2)
+    for pessoa_id in range(4):
+        difusor.publicar("pessoa", ("pessoa", pessoa_id), {"id": pessoa_id})
+
+    retomado = difusor.conectar(f"{EPOCA}-2")
+    assert retomado.retirar() == (False, list(difusor.historico))
+    assert difusor.conectar(f"{EPOCA}-4").retirar() == (False, [])
+    # já saiu do histórico, é de outro processo ou é do futuro
+    for ultimo_id in (f"{EPOCA}-1", "outra-2", f"{EPOCA}-9"):
+        assert difusor.conectar(ultimo_id).retirar() == (True, [])
+
+
+def test_limite_de_clientes():
+    difusor = Difusor(max_clientes=1)
+    cliente = difusor.conectar()
+    with pytest.raises(FeedLotado):
+        difusor.conectar()
+    difusor.desconectar(cliente)
+    difusor.conectar()
+    assert difusor.recusados == 1
+
+
+def test_lote_com_reset_aponta_para_o_evento_mais_recente(monkeypatch):
+    difusor = Difusor()
+    monkeypatch.setattr(alteracoes, "difusor", difusor)
+    difusor.publicar("pessoa", ("pessoa", 1), {"id": 1})
+
+    texto = alteracoes._lote(True, [])
+
+    assert texto.startswith(f"id: {EPOCA}-1\nevent: reset\n")
+    assert difusor.resets == 1
+
+
+class CanalFalso:
+    def __init__(self):
+        self.enviados = []
+
+    def enviar(self, evento, dados):
+        self.enviados.append((evento, dados))
+
+
+def test_escritas_de_outro_worker_chegam_pelo_canal(monkeypatch):
+    difusor = Difusor()
+    canal = CanalFalso()
+    monkeypatch.setattr(alteracoes, "difusor", difusor)
+    monkeypatch.setattr(alteracoes, "canal", canal)
+    cliente = difusor.conectar()
+    alteracoes.iniciar()
+    try:
+        # escrita deste worker: vai para o feed local e para o canal
+        eventos.relacionamento_criado(1, 2)
+        bruto = alteracoes.serializar(eventos.PESSOA_SALVA, {"pessoa": {"id": 7, "nome": "Ana"}})
+        # a própria mensagem volta do canal e é ignorada
+        assert alteracoes.repassar(bruto) is False
+        monkeypatch.setattr(alteracoes, "EPOCA", "outro")
+        assert alteracoes.repassar(bruto) is True
+    finally:
+        eventos.cancelar(eventos.PESSOA_SALVA, alteracoes._ao_salvar_pessoa)
+        eventos.cancelar(eventos.RELACIONAMENTO_CRIADO, alteracoes._ao_criar_relacionamento)
+
+    assert [(e.tipo, e.dados) for e in cliente.retirar()[1]] == [
+        ("relacionamento", {"pessoa_id1": 1, "pessoa_id2": 2}),
+        ("pessoa", {"id": 7, "nome": "Ana"}),
+    ]
+    # a escrita de outro worker não volta para o canal
+    assert canal.enviados == [(eventos.RELACIONAMENTO_CRIADO, {"pessoa_id1": 1, "pessoa_id2": 2})]
+
+
+def test_varios_workers_sem_canal_recusam_o_feed(cliente, monkeypatch):
+    monkeypatch.setattr(alteracoes, "ATIVO", False)
+
+    resposta = cliente.get("/eventos")
+
+    assert resposta.status_code == 503
+    assert "FEED_REDIS_URL" in resposta.json()["detail"]
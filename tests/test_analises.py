@@ -0,0 +1,151 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app import analises, crud_memoria, snapshot
+from app.snapshot import Colunas, csr_por_ids
+
+
+def _csr(n, arestas):
+    ids = np.arange(n, dtype=np.int64)
+    origens = np.array([a for a, _ in arestas], dtype=np.int64)
+    destinos = np.array([b for _, b in arestas], dtype=np.int64)
+    return csr_por_ids(ids, origens, destinos)
+
+
+def _pagerank_denso(n, arestas, amortecimento=0.85, iteracoes=200):
+    """
+    Referência: iteração de potência sobre a matriz de transição completa
+    """
+    transicao = np.zeros((n, n))
+    for a, b in arestas:
+        transicao[b, a] += 1
+    saida = transicao.sum(axis=0)
+    transicao[:, saida == 0] = 1.0
+    transicao /= transicao.sum(axis=0)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iteracoes):
+        scores = amortecimento * transicao @ scores + (1 - amortecimento) / n
+    return scores
+
+
+def test_pagerank_confere_com_a_versao_densa():
+    # 3 não conhece ninguém: distribui o score entre todos
+    arestas = [(0, 1), (0, 2), (1, 2), (2, 0), (4, 2), (4, 3)]
+    offsets, alvos = _csr(5, arestas)
+
+    scores, iteracoes = analises.pagerank(offsets, alvos, tolerancia=1e-12)
+
+    assert scores.sum() == pytest.approx(1.0)
+    np.testing.assert_allclose(scores, _pagerank_denso(5, arestas), atol=1e-9)
+    assert int(np.argmax(scores)) == 2
+    assert 1 < iteracoes < analises.MAX_ITERACOES_PAGERANK
+
+
+def test_pagerank_sem_arestas_e_sem_pessoas():
+    offsets, alvos = _csr(4, [])
+    scores, _ = analises.pagerank(offsets, alvos)
+    np.testing.assert_allclose(scores, np.full(4, 0.25))
+    assert len(analises.pagerank(*_csr(0, []))[0]) == 0
+
+
+def test_comunidades_separa_dois_grupos_ligados_por_uma_aresta():
+    # grupo de 5 (0-4) e grupo de 4 (5-8), completos, com uma ponte 4 -> 5
+    grupo_a = [(a, b) for a in range(5) for b in range(5) if a < b]
+    grupo_b = [(a, b) for a in range(5, 9) for b in range(5, 9) if a < b]
+    offsets, alvos = _csr(9, grupo_a + grupo_b + [(4, 5)])
+
+    comunidade, _ = analises.comunidades(offsets, alvos)
+
+    # numeradas da maior para a menor
+    assert comunidade.tolist() == [0] * 5 + [1] * 4
+
+
+def test_comunidades_deterministicas_e_isolados_sozinhos():
+    offsets, alvos = _csr(5, [(0, 1), (1, 2), (2, 0)])
+
+    primeira, _ = analises.comunidades(offsets, alvos)
+    segunda, _ = analises.comunidades(offsets, alvos)
+
+    assert primeira.tolist() == segunda.tolist()
+    assert primeira[0] == primeira[1] == primeira[2] == 0
+    assert len({primeira[3], primeira[4], 0}) == 3
+
+
+def test_graus_somam_entrada_e_saida():
+    offsets, alvos = _csr(3, [(0, 1), (0, 2), (2, 1)])
+
+    grau, centralidade = analises.graus(offsets, alvos)
+
+    assert grau.tolist() == [2, 2, 2]
+    np.testing.assert_allclose(centralidade, [1.0, 1.0, 1.0])
+
+
+def test_execucao_grava_nas_pessoas_e_no_resumo(cliente, criar_pessoas):
+    ana, bia, caio = criar_pessoas("Ana", "Bia", "Caio")
+    for origem, destino in ((ana, bia), (caio, bia), (bia, ana)):
+        cliente.post(f"/pessoas/{origem}/conhece/{destino}")
+
+    resumo = asyncio.run(analises.executar())
+
+    assert (resumo["pessoas"], resumo["relacionamentos"], resumo["pessoas_gravadas"]) == (3, 3, 3)
+    influenciadores = cliente.get("/analises/influenciadores").json()
+    assert influenciadores[0]["id"] == bia
+    assert cliente.get("/analises/comunidades").json() == [{"comunidade": 0, "tamanho": 3}]
+
+
+def test_trava_no_banco_barra_a_segunda_execucao(cliente, criar_pessoas, monkeypatch):
+    from app.database import database
+
+    criar_pessoas("Ana")
+    # outro worker tomou a trava
+    assert asyncio.run(crud_memoria.iniciar_execucao_analise(database.grafo, validade_s=60)) is True
+
+    assert cliente.post("/analises/executar").status_code == 409
+    with pytest.raises(analises.AnaliseEmExecucao):
+        asyncio.run(analises.executar())
+    assert cliente.get("/analises/").json() == {"em_execucao": True, "erro": None, "ultima_execucao": None}
+
+    # trava vencida: a execução que a tinha morreu
+    monkeypatch.setattr(analises, "TRAVA_VALIDADE_S", 0)
+    assert cliente.get("/analises/").json()["em_execucao"] is False
+    asyncio.run(analises.executar())
+    estado = cliente.get("/analises/").json()
+    assert (estado["em_execucao"], estado["ultima_execucao"]["pessoas"]) == (False, 1)
+
+
+def test_erro_solta_a_trava_e_fica_no_estado(cliente, criar_pessoas, monkeypatch):
+    criar_pessoas("Ana")
+
+    def falhar(*_):
+        raise RuntimeError("sem memória")
+
+    monkeypatch.setattr(analises, "calcular", falhar)
+    with pytest.raises(RuntimeError):
+        asyncio.run(analises.executar())
+
+    assert cliente.get("/analises/").json() == {"em_execucao": False, "erro": "sem memória", "ultima_execucao": None}
+
+
+def test_execucao_por_snapshot_fecha_o_arquivo(cliente, tmp_path, monkeypatch):
+    colunas = Colunas()
+    for pessoa_id in (1, 2):
+        colunas.adicionar_pessoa({"id": pessoa_id, "nome": f"P{pessoa_id}", "idade": 30, "interesses": [],
+                                  "cidade": None})
+    colunas.adicionar_relacionamento(1, 2)
+    caminho = str(tmp_path / "grafo.snap")
+    colunas.gravar(caminho)
+    abertos = []
+
+    class SnapshotRegistrado(snapshot.Snapshot):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            abertos.append(self)
+
+    monkeypatch.setattr(snapshot, "Snapshot", SnapshotRegistrado)
+
+    resumo = asyncio.run(analises.executar(caminho))
+
+    assert (resumo["pessoas"], resumo["relacionamentos"]) == (2, 1)
+    assert len(abertos) == 1 and abertos[0]._mapa.closed
@@ -0,0 +1,32 @@
+import asyncio
+
+from app import coalescedor
+from app.database import HEADER_BOOKMARKS, database
+
+
+def test_leitura_com_bookmarks_nao_entra_no_lote(cliente, criar_pessoas, monkeypatch):
+    ana, = criar_pessoas("Ana")
+    monkeypatch.setattr(coalescedor, "ATIVO", True)
+    antes = coalescedor.pessoas.stats()
+
+    pessoa = asyncio.run(coalescedor.get_pessoa(database.grafo, ana, bookmarks=["bm:1"]))
+
+    assert pessoa["id"] == ana
+    assert coalescedor.pessoas.stats() == antes
+    assert coalescedor.stats()["com_bookmarks"] >= 1
+
+
+def test_stream_abre_sessao_com_bookmarks_do_cliente(cliente, criar_pessoas, monkeypatch):
+    criar_pessoas("Ana", "Bia")
+    pedidas = []
+    get_session_original = database.get_session
+
+    def get_session(leitura=False, bookmarks=None):
+        pedidas.append((leitura, bookmarks))
+        return get_session_original(leitura=leitura, bookmarks=bookmarks)
+
+    monkeypatch.setattr(database, "get_session", get_session)
+    resposta = cliente.get("/pessoas/", params={"stream": "true"}, headers={HEADER_BOOKMARKS: "bm:1,bm:2"})
+
+    assert resposta.status_code == 200
+    assert (True, ["bm:1", "bm:2"]) in pedidas
@@ -0,0 +1,28 @@
+from app import busca
+
+
+def _ids(cliente, q):
+    return {p["id"] for p in cliente.get("/pessoas/busca", params={"q": q}).json()}
+
+
+def test_busca_por_prefixo_sem_acentos(cliente, criar_pessoas):
+    jose, joana, _ = criar_pessoas("José Silva", "Joana Sá", "Maria")
+
+    assert _ids(cliente, "jo") == {jose, joana}
+    assert _ids(cliente, "JOSE sil") == {jose}
+    assert _ids(cliente, "sa") == {joana}
+
+
+def test_pessoa_salva_invalida_sem_mexer_no_lru(cliente, criar_pessoas):
+    ana, = criar_pessoas("Ana")
+    for q in ("an", "zé", "bi"):
+        cliente.get("/pessoas/busca", params={"q": q})
+    antes = busca.cache.stats()
+
+    anabela, = criar_pessoas("Anabela")
+
+    # só sai a entrada que o nome novo satisfaz; as outras ficam na mesma ordem e os contadores não mudam
+    depois = busca.cache.stats()
+    assert (depois["hits"], depois["misses"]) == (antes["hits"], antes["misses"])
+    assert [chave for chave, _ in busca.cache.itens()] == [("ze",), ("bi",)]
+    assert _ids(cliente, "an") == {ana, anabela}
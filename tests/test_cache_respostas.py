@@ -0,0 +1,70 @@
+import asyncio
+
+from app import cache_respostas
+from app.database import HEADER_BOOKMARKS
+
+
+def test_etag_e_304(cliente, criar_pessoas):
+    ana, = criar_pessoas("Ana")
+    primeira = cliente.get(f"/pessoas/{ana}")
+    etag = primeira.headers["etag"]
+    assert primeira.headers["x-cache"] == "MISS"
+
+    repetida = cliente.get(f"/pessoas/{ana}", headers={"If-None-Match": etag})
+
+    assert repetida.status_code == 304
+    assert repetida.content == b""
+    assert repetida.headers["etag"] == etag
+    assert repetida.headers["x-cache"] == "HIT"
+    assert cliente.get(f"/pessoas/{ana}", headers={"If-None-Match": '"outro"'}).status_code == 200
+
+
+def test_escrita_invalida_as_tags_afetadas(cliente, criar_pessoas):
+    ana, bia = criar_pessoas("Ana", "Bia")
+    etag = cliente.get(f"/pessoas/{ana}/amigos").headers["etag"]
+    assert cliente.get(f"/pessoas/{bia}").headers["x-cache"] == "MISS"
+
+    cliente.post(f"/pessoas/{ana}/conhece/{bia}")
+
+    depois = cliente.get(f"/pessoas/{ana}/amigos", headers={"If-None-Match": etag})
+    assert depois.status_code == 200
+    assert depois.headers["x-cache"] == "MISS"
+    assert [amigo["id"] for amigo in depois.json()] == [bia]
+    # a pessoa não mudou: continua em cache
+    assert cliente.get(f"/pessoas/{bia}").headers["x-cache"] == "HIT"
+
+
+class CacheLento(cache_respostas.CacheMemoria):
+    """
+    Invalidação assíncrona como a do redis, que demora a terminar
+    """
+    def __init__(self):
+        super().__init__()
+        self.invalidadas = []
+
+    async def invalidar(self, tags):
+        await asyncio.sleep(0.05)
+        self.invalidadas.extend(tags)
+
+
+def test_escrita_responde_depois_da_invalidacao_assincrona(cliente, criar_pessoas, monkeypatch):
+    ana, bia = criar_pessoas("Ana", "Bia")
+    lento = CacheLento()
+    monkeypatch.setattr(cache_respostas, "armazenamento", lento)
+
+    cliente.post(f"/pessoas/{ana}/conhece/{bia}")
+
+    assert f"amigos:{ana}" in lento.invalidadas
+
+
+def test_leitura_com_bookmarks_nao_usa_nem_guarda_cache(cliente, criar_pessoas):
+    ana, = criar_pessoas("Ana")
+    cliente.get(f"/pessoas/{ana}")
+    bookmarks = {HEADER_BOOKMARKS: "bm:1"}
+
+    com = cliente.get(f"/pessoas/{ana}", headers=bookmarks)
+    cliente.get("/pessoas/", headers=bookmarks)
+
+    assert com.status_code == 200 and "x-cache" not in com.headers
+    assert cliente.get("/pessoas/").headers["x-cache"] == "MISS"
+    assert cache_respostas.stats()["com_bookmarks"] >= 2
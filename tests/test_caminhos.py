@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app import caminhos
+
+
+def _grafo(grafo, n, arestas):
+    for pessoa_id in range(1, n + 1):
+        grafo.adicionar_pessoa(f"P{pessoa_id}", 30, pessoa_id=pessoa_id)
+    for a, b in arestas:
+        grafo.adicionar_aresta(a, b)
+    return grafo
+
+
+def test_bfs_bidirecional_devolve_todos_os_caminhos_minimos(grafo):
+    # losango 1-2-4 / 1-3-4 e uma cauda 4-5
+    _grafo(grafo, 5, [(1, 2), (1, 3), (2, 4), (3, 4), (4, 5)])
+
+    encontrado = asyncio.run(caminhos.buscar(grafo, 1, 5, k=10))
+
+    assert encontrado["caminhos"] == [[1, 2, 4, 5], [1, 3, 4, 5]]
+    assert encontrado["graus_separacao"] == 3
+    # cada pessoa conta uma vez, mesmo descoberta pelos dois lados
+    assert encontrado["visitados"] == 5
+
+
+def test_bfs_respeita_k_e_a_direcao_das_arestas(grafo):
+    _grafo(grafo, 4, [(2, 1), (3, 2), (4, 3)])
+
+    encontrado = asyncio.run(caminhos.buscar(grafo, 1, 4, k=1))
+
+    assert encontrado["caminhos"] == [[1, 2, 3, 4]]
+
+
+def test_bfs_sem_caminho_ou_alem_da_profundidade(grafo):
+    _grafo(grafo, 5, [(1, 2), (2, 3), (3, 4)])
+
+    assert asyncio.run(caminhos.buscar(grafo, 1, 5)) is None
+    assert asyncio.run(caminhos.buscar(grafo, 1, 4, profundidade_maxima=2)) is None
+    assert asyncio.run(caminhos.buscar(grafo, 1, 1)) is None
+
+
+def test_bfs_interrompe_no_limite_de_visitados(grafo):
+    # estrela: a origem tem 10 vizinhos, nenhum leva ao destino
+    _grafo(grafo, 12, [(1, i) for i in range(2, 12)])
+
+    with pytest.raises(caminhos.LimiteVisitadosExcedido) as erro:
+        asyncio.run(caminhos.buscar(grafo, 1, 12, limite_visitados=5))
+    assert erro.value.visitados == 12
+
+
+def test_cache_de_caminhos_e_invalidado_por_escrita(cliente, criar_pessoas):
+    ana, bia, caio = criar_pessoas("Ana", "Bia", "Caio")
+    cliente.post(f"/pessoas/{ana}/conhece/{bia}")
+    cliente.post(f"/pessoas/{bia}/conhece/{caio}")
+    assert cliente.get(f"/caminho/{ana}/{caio}").json()["graus_separacao"] == 2
+
+    cliente.post(f"/pessoas/{ana}/conhece/{caio}")
+
+    resposta = cliente.get(f"/caminho/{ana}/{caio}").json()
+    assert resposta["caminho"] == ["Ana", "Caio"]
+    assert resposta["graus_separacao"] == 1
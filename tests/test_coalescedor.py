@@ -0,0 +1,32 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from app import coalescedor
+from app.coalescedor import Coalescedor
+
+
+def test_lote_de_amigos_busca_so_o_maior_limite(monkeypatch):
+    pedidos = []
+
+    async def get_amigos_em_lote(db, pessoa_ids, limite):
+        pedidos.append((pessoa_ids, limite))
+        return {pessoa_id: [{"id": n} for n in range(10)] for pessoa_id in pessoa_ids}
+
+    @asynccontextmanager
+    async def sessao(leitura):
+        yield None
+
+    monkeypatch.setattr(coalescedor.crud, "get_amigos_em_lote", get_amigos_em_lote)
+    monkeypatch.setattr(coalescedor, "sessao", sessao)
+    monkeypatch.setattr(coalescedor, "ATIVO", True)
+    monkeypatch.setattr(coalescedor, "amigos", Coalescedor(coalescedor._carregar_amigos, janela=0.01))
+
+    async def cenario():
+        return await asyncio.gather(coalescedor.get_amigos(None, 1, limit=2),
+                                    coalescedor.get_amigos(None, 1, limit=5),
+                                    coalescedor.get_amigos(None, 2, limit=20))
+
+    (curta, _), (longa, _), (todos, cursor) = asyncio.run(cenario())
+
+    assert pedidos == [([1, 2], 21)]
+    assert (len(curta), len(longa), len(todos), cursor) == (2, 5, 10, None)
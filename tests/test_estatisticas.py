@@ -0,0 +1,64 @@
+import asyncio
+
+from app import estatisticas
+from app.backends import crud
+from app.database import database
+from app.schemas import PessoaCreate
+
+
+def test_escritas_durante_a_reconciliacao_nao_se_perdem(cliente, criar_pessoas, monkeypatch):
+    ana, bia, caio = criar_pessoas("Ana", "Bia", "Caio")
+    cliente.post(f"/pessoas/{ana}/conhece/{bia}")
+    contagens_originais = crud.get_contagens_rede
+
+    async def contar_e_escrever(db):
+        contagens = await contagens_originais(db=db)
+        # escritas confirmadas depois da leitura do banco, antes de o estado novo entrar
+        await crud.criar_relacionamento(database.grafo, pessoa_id1=bia, pessoa_id2=caio)
+        await crud.criar_pessoa(database.grafo, pessoa=PessoaCreate(nome="Duda", idade=20, interesses=[]))
+        return contagens
+
+    monkeypatch.setattr(crud, "get_contagens_rede", contar_e_escrever)
+    asyncio.run(estatisticas.reconciliar())
+
+    resumo = estatisticas.estatisticas.resumo()
+    assert resumo["total_relacionamentos"] == 2
+    assert resumo["total_pessoas"] == 4
+
+
+def test_reconciliacao_usa_so_as_contagens(cliente, criar_pessoas, monkeypatch):
+    criar_pessoas("Ana", "Bia", cidade="Recife", interesses=["xadrez"])
+    criar_pessoas("Caio", cidade="Natal", interesses=["xadrez", "música"])
+
+    async def nao_percorrer(db):
+        raise AssertionError("a reconciliação não deve percorrer as pessoas")
+        yield
+
+    monkeypatch.setattr(crud, "iter_pessoas", nao_percorrer)
+    asyncio.run(estatisticas.reconciliar())
+
+    resumo = estatisticas.estatisticas.resumo()
+    assert resumo["total_pessoas"] == 3
+    assert resumo["top_cidades"] == [{"cidade": "Recife", "quantidade": 2}, {"cidade": "Natal", "quantidade": 1}]
+    assert resumo["top_interesses"] == [{"interesse": "xadrez", "quantidade": 3},
+                                        {"interesse": "música", "quantidade": 1}]
+
+
+def test_pessoa_nova_e_atualizada_depois_da_reconciliacao(cliente, criar_pessoas):
+    ana, = criar_pessoas("Ana", cidade="Recife")
+    asyncio.run(estatisticas.reconciliar())
+    duda, = criar_pessoas("Duda", cidade="Recife")
+
+    # Duda foi criada depois: o estado anterior é conhecido e é descontado
+    cliente.post("/pessoas/bulk", json=[{"id": duda, "nome": "Duda", "idade": 30, "interesses": [],
+                                         "cidade": "Natal"}])
+    resumo = cliente.get("/estatisticas/").json()
+    assert resumo["total_pessoas"] == 2
+    assert resumo["top_cidades"] == [{"cidade": "Natal", "quantidade": 1}, {"cidade": "Recife", "quantidade": 1}]
+
+    # Ana só está no agregado: a atualização pede uma reconciliação antes do intervalo
+    cliente.post("/pessoas/bulk", json=[{"id": ana, "nome": "Ana", "idade": 30, "interesses": [],
+                                         "cidade": "Natal"}])
+    resumo = cliente.get("/estatisticas/").json()
+    assert resumo["top_cidades"] == [{"cidade": "Natal", "quantidade": 2}]
+    assert estatisticas.estatisticas.desatualizada is False
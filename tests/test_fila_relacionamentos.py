@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from app import fila_relacionamentos
+from app.fila_relacionamentos import FilaCheia, FilaEscrita
+
+
+class Gravador:
+    """
+    gravar_lote falso: guarda os lotes e, se pedido, segura a gravação até liberar
+    """
+    def __init__(self, erro: Exception = None):
+        self.lotes = []
+        self.erro = erro
+        self.liberado = asyncio.Event()
+        self.liberado.set()
+
+    async def __call__(self, itens):
+        await self.liberado.wait()
+        self.lotes.append(itens)
+        if self.erro is not None:
+            raise self.erro
+        return len(itens)
+
+
+def test_pedidos_da_janela_viram_um_lote_sem_repetidos():
+    async def cenario():
+        gravador = Gravador()
+        fila = FilaEscrita(gravador, janela=0.01, tamanho_lote=100)
+        futuros = [await fila.adicionar(par) for par in ((1, 2), (2, 3), (1, 2), (3, 1))]
+        assert len(set(map(id, futuros))) == 1
+        assert await futuros[0] == 3
+        return gravador, fila
+
+    gravador, fila = asyncio.run(cenario())
+
+    assert gravador.lotes == [[(1, 2), (2, 3), (3, 1)]]
+    stats = fila.stats()
+    assert (stats["pedidos"], stats["duplicados"], stats["lotes"], stats["itens_gravados"]) == (4, 1, 1, 3)
+    assert (stats["aguardando"], stats["em_gravacao"]) == (0, 0)
+
+
+def test_lote_cheio_grava_sem_esperar_a_janela():
+    async def cenario():
+        gravador = Gravador()
+        fila = FilaEscrita(gravador, janela=60, tamanho_lote=2)
+        primeiro = await fila.adicionar((1, 2))
+        await fila.adicionar((2, 3))
+        terceiro = await fila.adicionar((3, 4))
+        await asyncio.wait_for(primeiro, 1)
+        assert not terceiro.done()
+        await fila.descarregar()
+        assert terceiro.done()
+        return gravador
+
+    assert asyncio.run(cenario()).lotes == [[(1, 2), (2, 3)], [(3, 4)]]
+
+
+def test_fila_cheia_recusa_depois_da_espera():
+    async def cenario():
+        gravador = Gravador()
+        gravador.liberado.clear()
+        fila = FilaEscrita(gravador, janela=0, tamanho_lote=1, capacidade=2, espera=0.01)
+        await fila.adicionar((1, 2))
+        await fila.adicionar((2, 3))
+        with pytest.raises(FilaCheia):
+            await fila.adicionar((3, 4))
+        assert fila.stats()["em_gravacao"] == 2
+        # gravados os lotes, as vagas voltam
+        gravador.liberado.set()
+        await fila.descarregar()
+        await fila.adicionar((3, 4))
+        await fila.descarregar()
+        return gravador, fila
+
+    gravador, fila = asyncio.run(cenario())
+
+    assert gravador.lotes == [[(1, 2)], [(2, 3)], [(3, 4)]]
+    assert fila.recusados == 1
+
+
+def test_erro_do_lote_chega_a_quem_aguarda_e_libera_as_vagas():
+    async def cenario():
+        fila = FilaEscrita(Gravador(erro=RuntimeError("deadlock")), janela=0, capacidade=1, espera=0.01)
+        futuro = await fila.adicionar((1, 2))
+        with pytest.raises(RuntimeError):
+            await futuro
+        await fila.adicionar((2, 3))
+        await fila.descarregar()
+        return fila
+
+    fila = asyncio.run(cenario())
+
+    assert (fila.erros, fila.recusados) == (2, 0)
+
+
+def test_criar_relacionamento_pela_fila(cliente, criar_pessoas, monkeypatch):
+    ana, bia = criar_pessoas("Ana", "Bia")
+    monkeypatch.setattr(fila_relacionamentos, "ATIVO", True)
+    monkeypatch.setattr(fila_relacionamentos, "fila", FilaEscrita(fila_relacionamentos._gravar_relacionamentos,
+                                                                  janela=0.001))
+
+    async def cenario():
+        from app.database import database
+
+        criados = await asyncio.gather(
+            fila_relacionamentos.criar_relacionamento(database.grafo, ana, bia),
+            fila_relacionamentos.criar_relacionamento(database.grafo, ana, bia),
+            fila_relacionamentos.criar_relacionamento(database.grafo, bia, ana),
+        )
+        ausente = await fila_relacionamentos.criar_relacionamento(database.grafo, ana, 999)
+        return criados, ausente
+
+    criados, ausente = asyncio.run(cenario())
+
+    assert criados == [True, True, True] and ausente is False
+    assert fila_relacionamentos.fila.stats()["lotes"] == 1
+    assert [amigo["id"] for amigo in cliente.get(f"/pessoas/{ana}/amigos").json()] == [bia]
+    assert cliente.get("/estatisticas/").json()["total_relacionamentos"] == 2
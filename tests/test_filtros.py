@@ -0,0 +1,90 @@
+import pytest
+
+from app import crud, filtros
+
+
+def test_criar_valida_e_normaliza():
+    filtro = filtros.criar(cidade="", interesses=" música, xadrez,música ,", grau_min=0, ordenar="-grau")
+
+    assert filtro.cidade is None
+    assert filtro.interesses == ("música", "xadrez")
+    assert filtro.grau_min is None
+    assert (filtro.campo, filtro.decrescente) == ("grau", True)
+    for parametros in ({"modo": "some"}, {"ordenar": "cidade"}, {"idade_min": 40, "idade_max": 30},
+                       {"interesses": ",".join(f"i{n}" for n in range(filtros.MAX_INTERESSES + 1))}):
+        with pytest.raises(ValueError):
+            filtros.criar(**parametros)
+
+
+def test_mesma_forma_com_valores_diferentes_compartilha_a_query():
+    recife = filtros.criar(cidade="Recife", interesses="música", idade_min=20)
+    natal = filtros.criar(cidade="Natal", interesses="xadrez,cinema", idade_min=65)
+
+    assert recife.forma() == natal.forma()
+    assert crud._query_filtro(recife) is crud._query_filtro(natal)
+    assert filtros.criar(cidade="Recife").forma() != recife.forma()
+
+
+def test_valores_vao_como_parametros():
+    filtro = filtros.criar(cidade="Recife' OR 1=1 //", interesses="música", idade_max=30, grau_min=2)
+
+    query = crud._query_filtro(filtro)
+
+    assert "Recife" not in query and "música" not in query
+    for parametro in ("$cidade", "$interesses", "$idade_max", "$grau_min", "$limite"):
+        assert parametro in query
+    assert "$idade_min" not in query
+    assert filtro.parametros()["cidade"] == "Recife' OR 1=1 //"
+
+
+def test_compilacao_por_forma():
+    so_interesses_all = crud._compilar_filtro(filtros.criar(interesses="a,b", modo="all").forma())
+    assert "MATCH (p:Pessoa)-[:GOSTA_DE]->(i:Interesse)" in so_interesses_all
+    assert "casados = size($interesses)" in so_interesses_all
+
+    # sem filtro nem ordenação por grau, o grau só é contado depois do LIMIT
+    simples = crud._compilar_filtro(filtros.criar().forma()).splitlines()
+    assert simples.index("WITH p ORDER BY p.pessoa_id LIMIT $limite") < simples.index(f"WITH p, {crud.GRAU} AS grau")
+
+    por_grau = crud._compilar_filtro(filtros.criar(ordenar="-grau").forma())
+    assert "ORDER BY grau DESC, p.pessoa_id LIMIT $limite" in por_grau
+
+
+@pytest.fixture
+def rede(cliente, criar_pessoas):
+    ana, = criar_pessoas("Ana", cidade="Recife", interesses=["música", "xadrez"], idade=25)
+    bia, = criar_pessoas("Bia", cidade="Recife", interesses=["música"], idade=35)
+    caio, = criar_pessoas("Caio", cidade="Natal", interesses=["xadrez"], idade=45)
+    for origem, destino in ((bia, ana), (bia, caio), (caio, ana)):
+        cliente.post(f"/pessoas/{origem}/conhece/{destino}")
+    return ana, bia, caio
+
+
+def _ids(cliente, **params):
+    resposta = cliente.get("/pessoas/filtro", params=params)
+    assert resposta.status_code == 200, resposta.text
+    return [p["id"] for p in resposta.json()]
+
+
+def test_filtro_no_grafo_em_memoria(cliente, rede):
+    ana, bia, caio = rede
+
+    assert _ids(cliente, cidade="Recife") == [ana, bia]
+    assert _ids(cliente, interesses="música,xadrez") == [ana, bia, caio]
+    assert _ids(cliente, interesses="música,xadrez", modo="all") == [ana]
+    assert _ids(cliente, idade_min=30, idade_max=45) == [bia, caio]
+    assert _ids(cliente, grau_min=1) == [bia, caio]
+    # empate de grau desfeito por id
+    assert _ids(cliente, ordenar="-grau") == [bia, caio, ana]
+    assert _ids(cliente, ordenar="-grau", limit=1) == [bia]
+    graus = {p["id"]: p["grau"] for p in cliente.get("/pessoas/filtro").json()}
+    assert graus == {ana: 0, bia: 2, caio: 1}
+
+
+def test_filtro_invalido_e_redirecionamento_antigo(cliente, rede):
+    assert cliente.get("/pessoas/filtro", params={"idade_min": 50, "idade_max": 10}).status_code == 400
+    assert cliente.get("/pessoas/filtro", params={"ordenar": "cidade"}).status_code == 422
+
+    resposta = cliente.get("/query-personalizada/", follow_redirects=False)
+    assert resposta.status_code == 307
+    assert resposta.headers["location"].startswith("/pessoas/filtro?")
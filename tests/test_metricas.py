@@ -0,0 +1,63 @@
+import asyncio
+from types import SimpleNamespace
+
+from app import crud, metricas
+
+
+class ResultadoFalso:
+    def __init__(self, linhas):
+        self.linhas = linhas
+
+    async def value(self):
+        return list(self.linhas)
+
+    async def consume(self):
+        return SimpleNamespace(result_available_after=1, result_consumed_after=2, profile=None)
+
+
+class SessaoFalsa:
+    """
+    Imita a sessão do driver: run e execute_read/execute_write com uma transação que só tem run
+    """
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.queries = []
+
+    async def run(self, query, parametros):
+        self.queries.append((query, parametros))
+        return ResultadoFalso(self.linhas)
+
+    async def execute_read(self, funcao):
+        return await funcao(self)
+
+    execute_write = execute_read
+
+
+def _contagem(nome):
+    return metricas.query_duracao.series.get((nome,), [0])[-1]
+
+
+def test_query_leva_o_nome_passado_pelo_crud():
+    db = metricas.SessaoInstrumentada(SessaoFalsa([{"id": 1, "nome": "Ana"}]))
+    antes = _contagem("crud.get_pessoa")
+
+    pessoa = asyncio.run(crud.get_pessoa(db, pessoa_id=1))
+
+    assert pessoa == {"id": 1, "nome": "Ana"}
+    assert _contagem("crud.get_pessoa") == antes + 1
+    assert metricas.query_linhas.valores[("crud.get_pessoa",)] >= 1
+
+
+def test_nomear_query_vale_so_dentro_do_bloco():
+    db = metricas.SessaoInstrumentada(SessaoFalsa([]))
+
+    async def executar():
+        with metricas.nomear_query("teste.dentro"):
+            await (await db.run("RETURN 1")).consume()
+        await (await db.run("RETURN 2")).consume()
+
+    dentro, fora = _contagem("teste.dentro"), _contagem("desconhecida")
+    asyncio.run(executar())
+
+    assert _contagem("teste.dentro") == dentro + 1
+    assert _contagem("desconhecida") == fora + 1
@@ -0,0 +1,72 @@
+from app.paginacao import HEADER_PROXIMO_CURSOR, codificar_cursor, decodificar_cursor
+
+
+def _todas_as_paginas(cliente, url, limit):
+    """
+    Segue X-Next-Cursor até a última página; devolve as páginas
+    """
+    paginas, after = [], None
+    while True:
+        params = {"limit": limit, **({"after": after} if after else {})}
+        resposta = cliente.get(url, params=params)
+        assert resposta.status_code == 200, resposta.text
+        paginas.append(resposta.json())
+        after = resposta.headers.get(HEADER_PROXIMO_CURSOR)
+        if after is None:
+            return paginas
+        assert 'rel="next"' in resposta.headers["link"]
+
+
+def test_cursor_e_opaco_e_reversivel():
+    chave = {"nome": "João", "id": 7}
+    assert decodificar_cursor(codificar_cursor(chave)) == chave
+    assert decodificar_cursor(None) is None
+
+
+def test_cursor_invalido_responde_400(cliente):
+    assert cliente.get("/pessoas/", params={"after": "nao-e-um-cursor"}).status_code == 400
+    # JSON válido que não é a chave de um item
+    assert cliente.get("/pessoas/", params={"after": codificar_cursor([1, 2])}).status_code == 400
+    # chave sem um dos campos ou com tipo errado
+    assert cliente.get("/pessoas/", params={"after": codificar_cursor({"id": "7"})}).status_code == 400
+    for chave in ({"id": 7}, {"nome": 7, "id": 7}):
+        resposta = cliente.get("/pessoas/interesse/xadrez", params={"after": codificar_cursor(chave)})
+        assert resposta.status_code == 400
+
+
+def test_pessoas_em_paginas_sem_repetir_nem_pular(cliente, criar_pessoas):
+    ids = criar_pessoas(*[f"P{i}" for i in range(7)])
+
+    paginas = _todas_as_paginas(cliente, "/pessoas/", limit=3)
+
+    assert [len(p) for p in paginas] == [3, 3, 1]
+    assert [pessoa["id"] for p in paginas for pessoa in p] == ids
+
+
+def test_pessoa_criada_entre_paginas_aparece_no_fim(cliente, criar_pessoas):
+    ids = criar_pessoas("Ana", "Bia", "Caio")
+    primeira = cliente.get("/pessoas/", params={"limit": 2})
+    novo, = criar_pessoas("Duda")
+
+    segunda = cliente.get("/pessoas/", params={"limit": 2, "after": primeira.headers[HEADER_PROXIMO_CURSOR]})
+
+    assert [p["id"] for p in primeira.json() + segunda.json()] == ids + [novo]
+
+
+def test_amigos_em_paginas(cliente, criar_pessoas):
+    ana, *amigos = criar_pessoas("Ana", "Bia", "Caio", "Duda", "Eva")
+    for amigo in reversed(amigos):
+        cliente.post(f"/pessoas/{ana}/conhece/{amigo}")
+
+    paginas = _todas_as_paginas(cliente, f"/pessoas/{ana}/amigos", limit=2)
+
+    assert [amigo["id"] for p in paginas for amigo in p] == amigos
+
+
+def test_interesse_em_paginas_com_nomes_repetidos(cliente, criar_pessoas):
+    # a chave (nome, id) desempata nomes iguais entre páginas
+    ids = criar_pessoas("Ana", "Ana", "Ana", "Bia", interesses=["xadrez"])
+
+    paginas = _todas_as_paginas(cliente, "/pessoas/interesse/xadrez", limit=2)
+
+    assert [pessoa["id"] for p in paginas for pessoa in p] == ids
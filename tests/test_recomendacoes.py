@@ -0,0 +1,26 @@
+import asyncio
+
+from app import recomendacoes
+from app.backends import crud
+from app.database import database
+
+
+def test_invalidacao_durante_o_calculo_nao_guarda_a_lista(cliente, criar_pessoas, monkeypatch):
+    ana, bia, caio = criar_pessoas("Ana", "Bia", "Caio")
+    for origem, destino in ((ana, bia), (bia, caio)):
+        cliente.post(f"/pessoas/{origem}/conhece/{destino}")
+    calcular_original = crud.get_recomendacoes_pontuadas
+
+    async def calcular_e_escrever(**parametros):
+        resultado = await calcular_original(**parametros)
+        # escrita confirmada depois da leitura do banco, antes de a lista entrar no cache
+        await crud.criar_relacionamento(database.grafo, pessoa_id1=ana, pessoa_id2=caio)
+        return resultado
+
+    monkeypatch.setattr(crud, "get_recomendacoes_pontuadas", calcular_e_escrever)
+    desatualizada = asyncio.run(recomendacoes.get_recomendacoes(database.grafo, ana))
+    monkeypatch.setattr(crud, "get_recomendacoes_pontuadas", calcular_original)
+
+    assert [c["id"] for c in desatualizada] == [caio]
+    assert recomendacoes.cache.get(ana) is None
+    assert asyncio.run(recomendacoes.get_recomendacoes(database.grafo, ana)) == []
@@ -0,0 +1,48 @@
+from app import eventos
+
+
+def test_adicionar_aresta_distingue_nova_existente_e_ausente(grafo):
+    a = grafo.adicionar_pessoa("Ana", 30, [], None).pessoa_id
+    b = grafo.adicionar_pessoa("Bia", 30, [], None).pessoa_id
+
+    assert grafo.adicionar_aresta(a, b) is True
+    assert grafo.adicionar_aresta(a, b) is False
+    assert grafo.adicionar_aresta(a, 999) is None
+    assert grafo.total_relacionamentos == 1
+
+
+def test_aresta_repetida_depois_de_compactar(grafo):
+    ids = [grafo.adicionar_pessoa(f"P{n}", 30, [], None).pessoa_id for n in range(5)]
+    for destino in reversed(ids[1:]):
+        grafo.adicionar_aresta(ids[0], destino)
+    grafo.compactar()
+    grafo.adicionar_aresta(ids[2], ids[0])
+
+    # linha do CSR (busca binária) e arestas pendentes
+    assert [grafo.nos[j].pessoa_id for j in grafo.saida(0)] == ids[1:]
+    assert grafo.adicionar_aresta(ids[0], ids[3]) is False
+    assert grafo.adicionar_aresta(ids[2], ids[0]) is False
+    assert grafo.conectados(0, 2) and grafo.conectados(2, 0) and not grafo.conectados(1, 2)
+    assert grafo.total_relacionamentos == 5
+
+
+def test_relacionamento_repetido_nao_publica_nem_conta(cliente, criar_pessoas):
+    ana, bia, caio = criar_pessoas("Ana", "Bia", "Caio")
+    publicados = []
+    registrar = lambda pessoa_id1, pessoa_id2: publicados.append((pessoa_id1, pessoa_id2))  # noqa: E731
+    eventos.assinar(eventos.RELACIONAMENTO_CRIADO, registrar)
+    try:
+        for origem, destino in [(ana, bia), (bia, caio), (ana, caio), (ana, bia)]:
+            assert cliente.post(f"/pessoas/{origem}/conhece/{destino}").status_code == 200
+        assert cliente.post(f"/pessoas/{ana}/conhece/999").status_code == 400
+
+        relatorio = cliente.post("/relacionamentos/bulk", json=[
+            {"pessoa_id1": ana, "pessoa_id2": bia},
+            {"pessoa_id1": caio, "pessoa_id2": ana},
+        ]).json()
+    finally:
+        eventos.cancelar(eventos.RELACIONAMENTO_CRIADO, registrar)
+
+    assert relatorio["escritos"] == 1
+    assert publicados == [(ana, bia), (bia, caio), (ana, caio), (caio, ana)]
+    assert cliente.get("/estatisticas/").json()["total_relacionamentos"] == 4
@@ -0,0 +1,81 @@
+import pytest
+
+from app.snapshot import Colunas, Snapshot, SnapshotInvalido, carregar_grafo
+
+PESSOAS = [
+    {"id": 1, "nome": "Ana", "idade": 30, "interesses": ["xadrez", "música"], "cidade": "Recife"},
+    {"id": 4, "nome": "Bia", "idade": None, "interesses": [], "cidade": None},
+    {"id": 9, "nome": "Çécile", "idade": 41, "interesses": ["música"], "cidade": "Recife"},
+]
+RELACIONAMENTOS = [(1, 4), (1, 9), (9, 4), (4, 1)]
+
+
+@pytest.fixture
+def arquivo(tmp_path):
+    colunas = Colunas()
+    for pessoa in PESSOAS:
+        colunas.adicionar_pessoa(pessoa)
+    for pessoa_id1, pessoa_id2 in RELACIONAMENTOS:
+        colunas.adicionar_relacionamento(pessoa_id1, pessoa_id2)
+    caminho = str(tmp_path / "grafo.snap")
+    colunas.gravar(caminho)
+    return caminho
+
+
+def test_ida_e_volta_preserva_pessoas_e_arestas(arquivo):
+    with Snapshot(arquivo) as snap:
+        assert (snap.n_pessoas, snap.n_arestas) == (3, 4)
+        assert snap.pessoas() == PESSOAS
+        arestas = [(r["pessoa_id1"], r["pessoa_id2"]) for r in snap.relacionamentos()]
+        assert sorted(arestas) == sorted(RELACIONAMENTOS)
+        # lotes da restauração: os intervalos juntos cobrem todas as arestas, na ordem do CSR
+        lotes = [snap.relacionamentos(inicio, inicio + 3) for inicio in range(0, snap.n_arestas, 3)]
+        assert [(r["pessoa_id1"], r["pessoa_id2"]) for lote in lotes for r in lote] == arestas
+        assert snap.pessoas(1, 2) == PESSOAS[1:2]
+
+
+def test_carregar_grafo_monta_saida_e_entrada(arquivo):
+    grafo = carregar_grafo(arquivo)
+
+    ana, bia, cecile = (grafo.indice[pessoa_id] for pessoa_id in (1, 4, 9))
+    assert sorted(grafo.saida(ana)) == sorted([bia, cecile])
+    assert sorted(grafo.entrada(bia)) == sorted([ana, cecile])
+    assert grafo.total_relacionamentos == 4
+    assert grafo.no(9).nome == "Çécile"
+    # o grafo carregado continua aceitando escritas
+    assert grafo.adicionar_aresta(4, 9) is True
+    assert grafo.adicionar_aresta(1, 4) is False
+
+
+def test_pessoas_fora_de_ordem_sao_recusadas():
+    colunas = Colunas()
+    colunas.adicionar_pessoa(PESSOAS[1])
+    with pytest.raises(ValueError):
+        colunas.adicionar_pessoa(PESSOAS[0])
+
+
+def test_byte_corrompido_falha_no_crc(arquivo):
+    with open(arquivo, "r+b") as f:
+        f.seek(-1, 2)
+        ultimo = f.read(1)
+        f.seek(-1, 2)
+        f.write(bytes([ultimo[0] ^ 0xFF]))
+
+    with pytest.raises(SnapshotInvalido, match="checksum"):
+        Snapshot(arquivo)
+    # sem verificar, o arquivo ainda abre (ex.: python -m app.snapshot info)
+    Snapshot(arquivo, verificar=False).close()
+
+
+def test_arquivo_que_nao_e_snapshot_ou_truncado(arquivo, tmp_path):
+    outro = tmp_path / "outro.bin"
+    outro.write_bytes(b"X" * 256)
+    with pytest.raises(SnapshotInvalido, match="não é um snapshot"):
+        Snapshot(str(outro))
+
+    with open(arquivo, "rb") as f:
+        inicio = f.read(40)
+    truncado = tmp_path / "truncado.snap"
+    truncado.write_bytes(inicio[:10])
+    with pytest.raises(SnapshotInvalido, match="truncado"):
+        Snapshot(str(truncado))